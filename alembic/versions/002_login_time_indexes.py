@@ -0,0 +1,30 @@
+"""Index login_time and open sessions
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Period queries filter on [start, end) ranges of login_time
+    op.create_index('ix_work_sessions_login_time', 'work_sessions', ['login_time'])
+    
+    # Open-session lookups (logout_time IS NULL) only need the few open rows
+    op.create_index(
+        'ix_work_sessions_open',
+        'work_sessions',
+        ['login_time'],
+        sqlite_where=sa.text('logout_time IS NULL')
+    )
+
+def downgrade() -> None:
+    op.drop_index('ix_work_sessions_open', table_name='work_sessions')
+    op.drop_index('ix_work_sessions_login_time', table_name='work_sessions')
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""Daily totals rollup
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Create daily_totals table
+    op.create_table(
+        'daily_totals',
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('worked_seconds', sa.Float(), nullable=False),
+        sa.Column('session_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('date')
+    )
+    
+    # Backfill from existing closed sessions (same microsecond arithmetic as
+    # database_operations.SESSION_DURATION_US)
+    op.execute(
+        """
+        INSERT INTO daily_totals (date, worked_seconds, session_count)
+        SELECT date(login_time),
+               SUM((CAST(strftime('%s', substr(logout_time, 1, 19)) AS INTEGER) * 1000000
+                    + CAST(substr(logout_time, 21) AS INTEGER))
+                 - (CAST(strftime('%s', substr(login_time, 1, 19)) AS INTEGER) * 1000000
+                    + CAST(substr(login_time, 21) AS INTEGER))) / 1000000.0,
+               COUNT(*)
+        FROM work_sessions
+        WHERE logout_time IS NOT NULL
+        GROUP BY date(login_time)
+        """
+    )
+
+def downgrade() -> None:
+    op.drop_table('daily_totals')
\ No newline at end of file
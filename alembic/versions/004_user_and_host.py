@@ -0,0 +1,29 @@
+"""Add user and host to work sessions
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Identity of the sessions, for databases merged from many workstations
+    with op.batch_alter_table('work_sessions') as batch_op:
+        batch_op.add_column(sa.Column('user_id', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('host', sa.String(length=255), nullable=True))
+    
+    # Per-user period queries
+    op.create_index('ix_work_sessions_user_login', 'work_sessions', ['user_id', 'login_time'])
+
+def downgrade() -> None:
+    op.drop_index('ix_work_sessions_user_login', table_name='work_sessions')
+    with op.batch_alter_table('work_sessions') as batch_op:
+        batch_op.drop_column('host')
+        batch_op.drop_column('user_id')
\ No newline at end of file
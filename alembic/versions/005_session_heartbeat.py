@@ -0,0 +1,23 @@
+"""Add heartbeat timestamp to work sessions
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    # Last time the monitor saw an open session alive; used to close it after a crash
+    with op.batch_alter_table('work_sessions') as batch_op:
+        batch_op.add_column(sa.Column('last_seen_time', sa.DateTime(), nullable=True))
+
+def downgrade() -> None:
+    with op.batch_alter_table('work_sessions') as batch_op:
+        batch_op.drop_column('last_seen_time')
\ No newline at end of file
@@ -0,0 +1,108 @@
+"""Session interval index and per-day rollup split at midnight
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+# Whole minutes since the epoch, rounded outwards (same as models.SESSION_INTERVAL_DDL)
+LOGIN_MINUTE = "CAST(strftime('%s', substr({row}.login_time, 1, 19)) AS INTEGER) / 60"
+LOGOUT_MINUTE = ("max(" + LOGIN_MINUTE + ", COALESCE((CAST(strftime('%s', substr({row}.logout_time, 1, 19)) AS INTEGER)"
+                 " + 60) / 60, 0))")
+
+def minutes(row):
+    """Minute bound expressions for a row alias"""
+    return LOGIN_MINUTE.format(row=row), LOGOUT_MINUTE.format(row=row)
+
+def upgrade() -> None:
+    # R*Tree over session intervals, kept in sync by triggers
+    op.execute("CREATE VIRTUAL TABLE work_sessions_rtree USING rtree_i32(id, login_minute, logout_minute)")
+    login_minute, logout_minute = minutes('NEW')
+    op.execute(
+        f"""
+        CREATE TRIGGER work_sessions_rtree_insert AFTER INSERT ON work_sessions BEGIN
+            INSERT INTO work_sessions_rtree VALUES (NEW.id, {login_minute}, {logout_minute});
+        END
+        """
+    )
+    op.execute(
+        f"""
+        CREATE TRIGGER work_sessions_rtree_update AFTER UPDATE OF login_time, logout_time ON work_sessions BEGIN
+            UPDATE work_sessions_rtree SET login_minute = {login_minute}, logout_minute = {logout_minute}
+            WHERE id = NEW.id;
+        END
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER work_sessions_rtree_delete AFTER DELETE ON work_sessions BEGIN
+            DELETE FROM work_sessions_rtree WHERE id = OLD.id;
+        END
+        """
+    )
+    login_minute, logout_minute = minutes('work_sessions')
+    op.execute(
+        f"""
+        INSERT INTO work_sessions_rtree (id, login_minute, logout_minute)
+        SELECT id, {login_minute}, {logout_minute} FROM work_sessions
+        """
+    )
+    
+    # Rebuild the rollup with sessions split at midnight; each session still
+    # counts once, on its login date
+    op.execute("DELETE FROM daily_totals")
+    op.execute(
+        """
+        INSERT INTO daily_totals (date, worked_seconds, session_count)
+        WITH RECURSIVE pieces(day, piece_start_us, logout_us, is_first) AS (
+            SELECT substr(login_time, 1, 10),
+                   CAST(strftime('%s', substr(login_time, 1, 19)) AS INTEGER) * 1000000
+                   + CAST(substr(login_time, 21) AS INTEGER),
+                   CAST(strftime('%s', substr(logout_time, 1, 19)) AS INTEGER) * 1000000
+                   + CAST(substr(logout_time, 21) AS INTEGER),
+                   1
+            FROM work_sessions
+            WHERE logout_time IS NOT NULL
+            UNION ALL
+            SELECT date(day, '+1 day'), CAST(strftime('%s', day, '+1 day') AS INTEGER) * 1000000, logout_us, 0
+            FROM pieces
+            WHERE CAST(strftime('%s', day, '+1 day') AS INTEGER) * 1000000 < logout_us
+        )
+        SELECT day,
+               SUM(max(0, min(logout_us, CAST(strftime('%s', day, '+1 day') AS INTEGER) * 1000000)
+                          - piece_start_us)) / 1000000.0,
+               SUM(is_first)
+        FROM pieces
+        GROUP BY day
+        """
+    )
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS work_sessions_rtree_insert")
+    op.execute("DROP TRIGGER IF EXISTS work_sessions_rtree_update")
+    op.execute("DROP TRIGGER IF EXISTS work_sessions_rtree_delete")
+    op.execute("DROP TABLE IF EXISTS work_sessions_rtree")
+    
+    # Back to one rollup row per login date
+    op.execute("DELETE FROM daily_totals")
+    op.execute(
+        """
+        INSERT INTO daily_totals (date, worked_seconds, session_count)
+        SELECT date(login_time),
+               SUM((CAST(strftime('%s', substr(logout_time, 1, 19)) AS INTEGER) * 1000000
+                    + CAST(substr(logout_time, 21) AS INTEGER))
+                 - (CAST(strftime('%s', substr(login_time, 1, 19)) AS INTEGER) * 1000000
+                    + CAST(substr(login_time, 21) AS INTEGER))) / 1000000.0,
+               COUNT(*)
+        FROM work_sessions
+        WHERE logout_time IS NOT NULL
+        GROUP BY date(login_time)
+        """
+    )
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Vectorized period analytics for Work Hours Tracker
+Sessions are loaded in one query as int64 microsecond arrays, split at
+midnight and bucketed by day with one bincount; any day, week, month or
+year total is then two lookups into prefix sums, and breakdowns are single
+array operations. Session counts follow database_operations.period_filter:
+sessions logged in during a period plus those still running at its start.
+"""
+
+from datetime import date as date_type, timedelta
+import numpy as np
+from sqlalchemy import String, select, type_coerce
+from models import WorkSession, get_db_session
+from database_operations import DatabaseOperations, period_filter
+
+DAY_US = 86400 * 1000000
+
+class AnalyticsEngine:
+    """Per-day worked time and session counts, split at midnight"""
+
+    def __init__(self, db_ops=None):
+        self.db_ops = db_ops or DatabaseOperations()
+        self.first_day = 0                               # epoch day number of index 0
+        self.day_us = np.zeros(0, dtype=np.int64)        # worked microseconds per day
+        self.day_counts = np.zeros(0, dtype=np.int64)    # sessions logged in per day
+        self._cumulative_us = np.zeros(1, dtype=np.int64)
+        self._cumulative_counts = np.zeros(1, dtype=np.int64)
+        self._sorted_login = np.zeros(0, dtype=np.int64)
+        self._sorted_cutoff = np.zeros(0, dtype=np.int64)
+
+    def load(self, start=None, end=None, user_id=None):
+        """Load sessions overlapping [start, end) in one query; returns the session count"""
+        # Stored timestamps are fetched as text and parsed by numpy in one call,
+        # much faster than building a datetime per value
+        query = select(type_coerce(WorkSession.login_time, String), type_coerce(WorkSession.logout_time, String))
+        if start is not None and end is not None:
+            query = query.where(period_filter(start, end, user_id))
+        elif user_id is not None:
+            query = query.where(WorkSession.user_id == user_id)
+        session = get_db_session()
+        try:
+            rows = session.execute(query).all()
+        finally:
+            session.close()
+
+        login = np.array([row[0] for row in rows], dtype='datetime64[us]')
+        logout = np.array([row[1] or 'NaT' for row in rows], dtype='datetime64[us]')
+        # Same rule as calculate_session_duration(): open sessions count as zero
+        duration_us = np.where(np.isnat(logout), 0, (logout - login).astype(np.int64))
+        self.set_sessions(login.astype(np.int64), duration_us)
+        return len(rows)
+
+    def set_sessions(self, login_us, duration_us):
+        """Bucket sessions given as epoch-microsecond login times and durations"""
+        login_us = np.asarray(login_us, dtype=np.int64)
+        logout_us = login_us + np.asarray(duration_us, dtype=np.int64)
+        # Naive local times are counted from 1970-01-01 as if they were UTC, so these
+        # day numbers match the stored dates and numpy's datetime64[D] day numbers
+        first_days = login_us // DAY_US
+        last_days = np.maximum(first_days, (logout_us - 1) // DAY_US)
+        if len(first_days):
+            self.first_day = int(first_days.min())
+            # One piece per day each session touches
+            pieces = last_days - first_days + 1
+            owner = np.repeat(np.arange(len(login_us)), pieces)
+            days = first_days[owner] + np.arange(len(owner)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+            piece_us = np.maximum(0, np.minimum(logout_us[owner], (days + 1) * DAY_US)
+                                  - np.maximum(login_us[owner], days * DAY_US))
+            length = int(last_days.max()) - self.first_day + 1
+            # Per-day sums stay far below 2**53, so the float64 weights are exact
+            self.day_us = np.rint(np.bincount(days - self.first_day, weights=piece_us,
+                                              minlength=length)).astype(np.int64)
+            self.day_counts = np.bincount(first_days - self.first_day, minlength=length).astype(np.int64)
+        else:
+            self.first_day = 0
+            self.day_us = np.zeros(0, dtype=np.int64)
+            self.day_counts = np.zeros(0, dtype=np.int64)
+        self._cumulative_us = np.concatenate(([0], np.cumsum(self.day_us)))
+        self._cumulative_counts = np.concatenate(([0], np.cumsum(self.day_counts)))
+        # A session is running at instant t when login < t < logout; with cutoff = logout,
+        # or login + 1 for open and empty sessions, that count is
+        # #(login < t) - #(cutoff <= t), since cutoff <= t implies login < t
+        self._sorted_login = np.sort(login_us)
+        self._sorted_cutoff = np.sort(np.where(logout_us > login_us, logout_us, login_us + 1))
+
+    def running_at(self, instants_us):
+        """Number of sessions that logged in before and logged out after each epoch-microsecond instant"""
+        instants_us = np.asarray(instants_us, dtype=np.int64)
+        return (np.searchsorted(self._sorted_login, instants_us, side='left')
+                - np.searchsorted(self._sorted_cutoff, instants_us, side='right'))
+
+    def _day_index(self, days):
+        """Positions of epoch day numbers in the prefix sums, clamped to the loaded range"""
+        return np.clip(np.asarray(days, dtype=np.int64) - self.first_day, 0, len(self.day_us))
+
+    def bucket_totals(self, boundaries):
+        """Get (worked_seconds, session_counts) arrays for consecutive [boundaries[i], boundaries[i+1]) dates"""
+        days = np.array(boundaries, dtype='datetime64[D]').astype(np.int64)
+        index = self._day_index(days)
+        counts = np.diff(self._cumulative_counts[index]) + self.running_at(days[:-1] * DAY_US)
+        return np.diff(self._cumulative_us[index]) / 1000000, counts
+
+    def get_total(self, start_date, end_date):
+        """Get (worked_seconds, session_count) for sessions overlapping [start_date, end_date)"""
+        seconds, counts = self.bucket_totals([start_date, end_date])
+        return float(seconds[0]), int(counts[0])
+
+    def get_daily_total(self, date=None):
+        """Get (worked_seconds, session_count) for a day"""
+        start, end = self.db_ops.get_day_range(date)
+        return self.get_total(start.date(), end.date())
+
+    def get_weekly_total(self, week_start=None):
+        """Get (worked_seconds, session_count) for a week"""
+        start, end = self.db_ops.get_week_range(week_start)
+        return self.get_total(start.date(), end.date())
+
+    def get_monthly_total(self, year=None, month=None):
+        """Get (worked_seconds, session_count) for a month"""
+        start, end = self.db_ops.get_month_range(year, month)
+        return self.get_total(start.date(), end.date())
+
+    def get_yearly_total(self, year=None):
+        """Get (worked_seconds, session_count) for a year"""
+        start, end = self.db_ops.get_year_range(year)
+        return self.get_total(start.date(), end.date())
+
+    def daily_breakdown(self, start_date, end_date):
+        """Get [(date, worked_seconds, session_count)] for every day in [start_date, end_date)"""
+        days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+        return self._breakdown(days)
+
+    def weekly_breakdown(self, start_date, end_date, week_start_day=None):
+        """Get [(week_start, worked_seconds, session_count)] for weeks overlapping [start_date, end_date)"""
+        if week_start_day is None:
+            week_start_day = self.db_ops.get_week_start_day()
+        first = start_date - timedelta(days=(start_date.weekday() - week_start_day) % 7)
+        weeks = -(-(end_date - first).days // 7)
+        return self._breakdown([first + timedelta(days=7 * offset) for offset in range(weeks + 1)])
+
+    def monthly_breakdown(self, year):
+        """Get [(month_start, worked_seconds, session_count)] for the months of a year"""
+        months = [date_type(year, month, 1) for month in range(1, 13)] + [date_type(year + 1, 1, 1)]
+        return self._breakdown(months)
+
+    def yearly_breakdown(self, first_year, last_year):
+        """Get [(year_start, worked_seconds, session_count)] for first_year..last_year"""
+        return self._breakdown([date_type(year, 1, 1) for year in range(first_year, last_year + 2)])
+
+    def _breakdown(self, boundaries):
+        """Pair each bucket's start date with its totals"""
+        seconds, counts = self.bucket_totals(boundaries)
+        return list(zip(boundaries[:-1], seconds.tolist(), counts.tolist()))
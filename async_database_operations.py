@@ -0,0 +1,179 @@
+"""
+Asyncio data access for Work Hours Tracker
+AsyncDatabaseOperations offers the period getters and totals of
+DatabaseOperations as coroutines, on SQLAlchemy's asyncio extension and
+aiosqlite. Statements, parameters and result building come from
+database_operations, so both classes return the same values. Each query
+holds a pooled connection of its own, so a dashboard or report job can
+fan out many periods with asyncio.gather() or get_period_totals().
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+import models
+from database_operations import (
+    BaseDatabaseOperations, SESSION_COLUMNS, EXPORT_COLUMNS, period_params, page_params, page_parts,
+    sessions_statement, total_statement, rollup_statement, last_login_statement, to_session_records
+)
+
+# Connection pool settings passed to create_async_engine(); concurrent queries beyond
+# pool_size + max_overflow wait for a connection
+ASYNC_POOL_OPTIONS = {
+    'pool_size': 8,
+    'max_overflow': 0,
+    'pool_timeout': 30,
+}
+
+def async_url(url):
+    """The aiosqlite form of a SQLite engine URL"""
+    return url.set(drivername='sqlite+aiosqlite')
+
+class AsyncDatabaseOperations(BaseDatabaseOperations):
+    """Async counterpart of DatabaseOperations, without the period cache
+
+    Pooled connections belong to the event loop that opened them, so create
+    the instance inside the loop and close it before the loop ends:
+
+        async with AsyncDatabaseOperations() as db_ops:
+            totals = await db_ops.get_period_totals(periods)
+    """
+
+    def __init__(self, url=None, **pool_options):
+        # Defaults to the database the synchronous engine points at. aiosqlite file
+        # databases default to NullPool, which would open a connection (and its
+        # thread) per query
+        options = {'poolclass': AsyncAdaptedQueuePool, **ASYNC_POOL_OPTIONS}
+        options.update(pool_options)
+        self.engine = create_async_engine(async_url(models.get_engine().url) if url is None else url, **options)
+        if self.engine.dialect.name == 'sqlite':
+            event.listen(self.engine.sync_engine, 'connect', models._apply_sqlite_pragmas)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close pooled connections"""
+        await self.engine.dispose()
+
+    async def _execute(self, statement, params):
+        """Run a statement on a pooled connection; returns the buffered result"""
+        async with self.engine.connect() as connection:
+            return await connection.execute(statement, params)
+
+    async def get_sessions_in_range(self, start, end, user_id=None):
+        """Get work sessions overlapping [start, end), with durations clipped to it"""
+        rows = await self._execute(
+            sessions_statement(start != datetime.min, user_id is not None),
+            period_params(start, end, user_id)
+        )
+        return to_session_records(rows, start, end)
+
+    async def fetch_page(self, columns, start, end, after=None, limit=200, user_id=None):
+        """Rows of sessions overlapping [start, end) that follow the (login_time, id) key after, in key order"""
+        params = page_params(start, end, after, user_id)
+        rows = []
+        async with self.engine.connect() as connection:
+            for statement in page_parts(columns, start, end, after, user_id):
+                params['page_limit'] = limit - len(rows)
+                rows.extend((await connection.execute(statement, params)).all())
+                if len(rows) >= limit:
+                    break
+        return rows
+
+    async def get_sessions_page(self, start, end, after=None, limit=200, user_id=None):
+        """Get up to limit sessions in [start, end) that follow the (login_time, id) key after"""
+        rows = await self.fetch_page(SESSION_COLUMNS, start, end, after, limit, user_id)
+        return to_session_records(rows, start, end)
+
+    async def get_export_page(self, start, end, after=None, limit=5000, user_id=None):
+        """Like get_sessions_page, but rows also carry user_id and host for exports"""
+        return await self.fetch_page(EXPORT_COLUMNS, start, end, after, limit, user_id)
+
+    async def get_period_report(self, start, end, user_id=None):
+        """Build a PeriodReport for [start, end) from a single query"""
+        return self.build_period_report(start, end, await self.get_sessions_in_range(start, end, user_id))
+
+    async def get_daily_report(self, date=None, user_id=None):
+        """Get the report for a specific day"""
+        return await self.get_period_report(*self.get_day_range(date), user_id=user_id)
+
+    async def get_weekly_report(self, week_start=None, user_id=None):
+        """Get the report for a specific week"""
+        return await self.get_period_report(*self.get_week_range(week_start), user_id=user_id)
+
+    async def get_monthly_report(self, year=None, month=None, user_id=None):
+        """Get the report for a specific month"""
+        return await self.get_period_report(*self.get_month_range(year, month), user_id=user_id)
+
+    async def get_yearly_report(self, year=None, user_id=None):
+        """Get the report for a specific year"""
+        return await self.get_period_report(*self.get_year_range(year), user_id=user_id)
+
+    async def get_daily_sessions(self, date=None, user_id=None):
+        """Get work sessions for a specific day"""
+        return await self.get_sessions_in_range(*self.get_day_range(date), user_id=user_id)
+
+    async def get_weekly_sessions(self, week_start=None, user_id=None):
+        """Get work sessions for a specific week"""
+        return await self.get_sessions_in_range(*self.get_week_range(week_start), user_id=user_id)
+
+    async def get_monthly_sessions(self, year=None, month=None, user_id=None):
+        """Get work sessions for a specific month"""
+        return await self.get_sessions_in_range(*self.get_month_range(year, month), user_id=user_id)
+
+    async def get_yearly_sessions(self, year=None, user_id=None):
+        """Get work sessions for a specific year"""
+        return await self.get_sessions_in_range(*self.get_year_range(year), user_id=user_id)
+
+    async def get_period_total(self, start, end, user_id=None):
+        """Get (total_seconds, session_count) for sessions overlapping [start, end) in one query"""
+        result = await self._execute(
+            total_statement(start != datetime.min, user_id is not None),
+            period_params(start, end, user_id)
+        )
+        total_us, count = result.one()
+        return total_us / 1000000, count
+
+    async def get_period_totals(self, periods, user_id=None):
+        """Get (total_seconds, session_count) for each (start, end) in periods, queried concurrently"""
+        return await asyncio.gather(*(self.get_period_total(start, end, user_id) for start, end in periods))
+
+    async def get_rollup_total(self, start_date, end_date):
+        """Get (worked_seconds, closed_session_count) for [start_date, end_date) from daily_totals"""
+        result = await self._execute(rollup_statement(), {'rollup_start': start_date, 'rollup_end': end_date})
+        worked_seconds, session_count = result.one()
+        return worked_seconds, session_count
+
+    async def format_period_total(self, start, end, user_id=None):
+        """Get formatted total hours for sessions in [start, end)"""
+        if self.uses_rollup(start, end, user_id):
+            total_seconds, _ = await self.get_rollup_total(start.date(), end.date())
+        else:
+            total_seconds, _ = await self.get_period_total(start, end, user_id)
+        return self.format_duration(timedelta(seconds=total_seconds))
+
+    async def get_daily_total_hours(self, date=None, user_id=None):
+        """Get formatted total hours for a day"""
+        return await self.format_period_total(*self.get_day_range(date), user_id=user_id)
+
+    async def get_weekly_total_hours(self, week_start=None, user_id=None):
+        """Get formatted total hours for a week"""
+        return await self.format_period_total(*self.get_week_range(week_start), user_id=user_id)
+
+    async def get_monthly_total_hours(self, year=None, month=None, user_id=None):
+        """Get formatted total hours for a month"""
+        return await self.format_period_total(*self.get_month_range(year, month), user_id=user_id)
+
+    async def get_yearly_total_hours(self, year=None, user_id=None):
+        """Get formatted total hours for a year"""
+        return await self.format_period_total(*self.get_year_range(year), user_id=user_id)
+
+    async def get_last_login_time(self):
+        """Get the last login time"""
+        return (await self._execute(last_login_statement(), {})).scalar()
\ No newline at end of file
@@ -0,0 +1,4 @@
+"""
+Benchmarks for Work Hours Tracker
+Run from the repository root, e.g. python -m benchmarks.engine_bench
+"""
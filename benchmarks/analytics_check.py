@@ -0,0 +1,102 @@
+"""
+Check the vectorized AnalyticsEngine against the Python reference totals.
+
+For every day, week, month and year of each synthetic dataset the engine's
+total must equal calculate_total_duration() over get_sessions_in_range() to
+the microsecond, with the same session count, and the weekly and monthly
+breakdowns must match those totals. The script also times the
+engine (one load plus all lookups) against one get_period_total() query per
+period, and exits non-zero on any mismatch.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import timedelta
+import models
+from database_operations import DatabaseOperations
+from analytics import AnalyticsEngine
+from benchmarks.dataset import DATASET_END, DATASET_YEARS, dataset_path
+
+def periods(db_ops, years):
+    """(label, start_date, end_date) for every day, week, month and year of the dataset"""
+    last = (DATASET_END - timedelta(days=1)).date()
+    first = last - timedelta(days=round(365.25 * years) + 1)
+    seen = set()
+    day = first
+    while day <= last:
+        week_start = day - timedelta(days=(day.weekday() - db_ops.get_week_start_day()) % 7)
+        for label, (start, end) in (
+            ("day", db_ops.get_day_range(day)),
+            ("week", db_ops.get_week_range(week_start)),
+            ("month", db_ops.get_month_range(day.year, day.month)),
+            ("year", db_ops.get_year_range(day.year)),
+        ):
+            if (start, end) not in seen:
+                seen.add((start, end))
+                yield label, start, end
+        day += timedelta(days=1)
+
+def check_dataset(path, years):
+    """Compare every period of one dataset; returns the number of mismatches"""
+    models.configure_engine(f"sqlite:///{path}")
+    try:
+        db_ops = DatabaseOperations(cache=None)
+        all_periods = list(periods(db_ops, years))
+
+        started = time.perf_counter()
+        engine = AnalyticsEngine(db_ops)
+        loaded = engine.load()
+        engine_totals = [engine.get_total(start.date(), end.date()) for _, start, end in all_periods]
+        engine_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for _, start, end in all_periods:
+            db_ops.get_period_total(start, end)
+        sql_time = time.perf_counter() - started
+
+        mismatches = 0
+        expected_totals = {}
+        for (label, start, end), (seconds, count) in zip(all_periods, engine_totals):
+            sessions = db_ops.get_sessions_in_range(start, end)
+            expected = db_ops.calculate_total_duration(sessions, start, end)
+            expected_totals[start.date(), end.date()] = (expected, len(sessions))
+            if timedelta(microseconds=round(seconds * 1000000)) != expected or count != len(sessions):
+                mismatches += 1
+                print(f"FAIL {label} {start:%Y-%m-%d}: engine {seconds} s / {count}, "
+                      f"python {expected.total_seconds()} s / {len(sessions)}")
+
+        # Breakdowns must agree with the per-period reference totals too
+        first_day, last_day = all_periods[0][1].date(), all_periods[-1][2].date()
+        buckets = [(start, start + timedelta(days=7), seconds, count)
+                   for start, seconds, count in engine.weekly_breakdown(first_day, last_day)[1:-1]]
+        for year in range(first_day.year + 1, last_day.year):  # whole years only
+            buckets += [(start, db_ops.get_month_range(year, start.month)[1].date(), seconds, count)
+                        for start, seconds, count in engine.monthly_breakdown(year)]
+        for bucket_start, bucket_end, seconds, count in buckets:
+            expected, expected_count = expected_totals[bucket_start, bucket_end]
+            if timedelta(microseconds=round(seconds * 1000000)) != expected or count != expected_count:
+                mismatches += 1
+                print(f"FAIL breakdown {bucket_start}: engine {seconds} s / {count}")
+    finally:
+        models.dispose_engine()
+
+    print(f"{years:>2}y: {loaded} sessions, {len(all_periods)} periods, {mismatches} mismatches; "
+          f"engine {engine_time * 1000:.1f} ms, per-period SQL {sql_time * 1000:.1f} ms "
+          f"({sql_time / engine_time:.0f}x)")
+    return mismatches
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, nargs="+", default=list(DATASET_YEARS))
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "work_hours_datasets"))
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    mismatches = sum(check_dataset(dataset_path(args.data_dir, years), years) for years in args.years)
+    sys.exit(0 if mismatches == 0 else 1)
+
+if __name__ == "__main__":
+    main()
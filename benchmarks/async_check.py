@@ -0,0 +1,211 @@
+"""
+Check AsyncDatabaseOperations against DatabaseOperations and time period fan-out.
+
+Sessions with boundary cases and two users (see benchmarks.overlap_check)
+are queried through both classes for every day of a range and for random
+windows: sessions, page walks, export pages, reports, totals, the rollup,
+formatted totals and the last login must be identical. The script then
+loads a dashboard's worth of period totals (every day, week and month of a
+dataset's last year) sequentially through DatabaseOperations, on a thread
+pool, and through AsyncDatabaseOperations one at a time and gathered at
+several pool sizes, then does the same for the weekly and monthly
+reports, which spend longer inside SQLite. Concurrent queries only gain
+where there are cores to run them on. Exits non-zero on any mismatch.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import models
+from database_operations import DatabaseOperations
+from async_database_operations import AsyncDatabaseOperations
+from ingest import ingest_sessions
+from benchmarks.common import temporary_database
+from benchmarks.dataset import DATASET_END, dataset_path
+from benchmarks.overlap_check import USERS, generate
+
+def walk_pages(page, limit=7):
+    """Rows from a page getter(after, limit), one small page at a time"""
+    rows, after = [], None
+    while True:
+        rows_page = page(after, limit)
+        rows.extend(rows_page)
+        if len(rows_page) < limit:
+            return rows
+        after = (rows_page[-1].login_time, rows_page[-1].id)
+
+async def walk_pages_async(page, limit=7):
+    """walk_pages() for an async page getter"""
+    rows, after = [], None
+    while True:
+        rows_page = await page(after, limit)
+        rows.extend(rows_page)
+        if len(rows_page) < limit:
+            return rows
+        after = (rows_page[-1].login_time, rows_page[-1].id)
+
+def report_values(report):
+    """Comparable fields of a PeriodReport"""
+    return (report.start, report.end, report.sessions, report.durations, report.total, report.total_hours)
+
+def sync_results(db_ops, start, end, user_id):
+    """Every period result of DatabaseOperations for [start, end)"""
+    return (
+        db_ops.get_sessions_in_range(start, end, user_id),
+        walk_pages(lambda after, limit: db_ops.get_sessions_page(start, end, after, limit, user_id=user_id)),
+        [tuple(row) for row in db_ops.get_export_page(start, end, limit=50, user_id=user_id)],
+        report_values(db_ops.get_period_report(start, end, user_id)),
+        db_ops.get_period_total(start, end, user_id),
+        db_ops.get_rollup_total(start.date(), end.date()),
+        db_ops.format_period_total(start, end, user_id),
+    )
+
+async def async_results(db_ops, start, end, user_id):
+    """sync_results() through AsyncDatabaseOperations"""
+    return (
+        await db_ops.get_sessions_in_range(start, end, user_id),
+        await walk_pages_async(lambda after, limit: db_ops.get_sessions_page(start, end, after, limit,
+                                                                               user_id=user_id)),
+        [tuple(row) for row in await db_ops.get_export_page(start, end, limit=50, user_id=user_id)],
+        report_values(await db_ops.get_period_report(start, end, user_id)),
+        await db_ops.get_period_total(start, end, user_id),
+        await db_ops.get_rollup_total(start.date(), end.date()),
+        await db_ops.format_period_total(start, end, user_id),
+    )
+
+def check(count, days_checked, windows, seed):
+    """Compare both classes over days and random windows; returns the number of mismatches"""
+    start = datetime(2024, 1, 1, 6)
+    ingest_sessions(generate(count, start, seed))
+    db_ops = DatabaseOperations(cache=None)
+    rng = random.Random(seed)
+    cases = [db_ops.get_day_range(start.date() + timedelta(days=offset)) for offset in range(days_checked)]
+    for _ in range(windows):
+        window_start = start + timedelta(minutes=rng.uniform(0, days_checked * 1440))
+        cases.append((window_start, window_start + timedelta(minutes=rng.uniform(1, 5 * 1440))))
+    cases.append((datetime.min, datetime.max))
+
+    async def compare():
+        mismatches = 0
+        async with AsyncDatabaseOperations() as async_ops:
+            for window_start, window_end in cases:
+                for user_id in (None,) + USERS:
+                    expected = sync_results(db_ops, window_start, window_end, user_id)
+                    actual = await async_results(async_ops, window_start, window_end, user_id)
+                    for name, left, right in zip(("sessions", "pages", "export", "report", "total", "rollup",
+                                                  "formatted total"), expected, actual):
+                        if left != right:
+                            mismatches += 1
+                            print(f"FAIL [{window_start}, {window_end}) user={user_id}: {name} differs")
+            # The calendar getters resolve their ranges through the shared base class
+            day = start.date() + timedelta(days=days_checked // 2)
+            pairs = [
+                (db_ops.get_daily_sessions(day), await async_ops.get_daily_sessions(day)),
+                (db_ops.get_weekly_sessions(day), await async_ops.get_weekly_sessions(day)),
+                (db_ops.get_monthly_sessions(day.year, day.month), await async_ops.get_monthly_sessions(day.year, day.month)),
+                (db_ops.get_yearly_sessions(day.year), await async_ops.get_yearly_sessions(day.year)),
+                (report_values(db_ops.get_daily_report(day)), report_values(await async_ops.get_daily_report(day))),
+                (report_values(db_ops.get_monthly_report(day.year, day.month)),
+                 report_values(await async_ops.get_monthly_report(day.year, day.month))),
+                (db_ops.get_weekly_total_hours(day), await async_ops.get_weekly_total_hours(day)),
+                (db_ops.get_yearly_total_hours(day.year), await async_ops.get_yearly_total_hours(day.year)),
+                (db_ops.get_last_login_time(), await async_ops.get_last_login_time()),
+                ([db_ops.get_period_total(*case) for case in cases], await async_ops.get_period_totals(cases)),
+            ]
+            for index, (left, right) in enumerate(pairs):
+                if left != right:
+                    mismatches += 1
+                    print(f"FAIL calendar getter #{index} differs")
+        return mismatches
+
+    mismatches = asyncio.run(compare())
+    print(f"{count} sessions, {len(cases)} windows x {len(USERS) + 1} users: {mismatches} mismatches")
+    return mismatches
+
+def dashboard_periods(db_ops, year):
+    """Every day, week and month of a year, as a dashboard would chart them"""
+    first = datetime(year, 1, 1).date()
+    days = [db_ops.get_day_range(first + timedelta(days=offset)) for offset in range((datetime(year + 1, 1, 1).date() - first).days)]
+    weeks = [db_ops.get_week_range(first + timedelta(days=7 * offset)) for offset in range(52)]
+    months = [db_ops.get_month_range(year, month) for month in range(1, 13)]
+    return days + weeks + months
+
+def time_fanout(path, repeat, pool_sizes, threads):
+    """Print periods per second for each way of loading the dashboard's totals and reports"""
+    models.configure_engine(f"sqlite:///{path}")
+    try:
+        db_ops = DatabaseOperations(cache=None)
+        periods = dashboard_periods(db_ops, (DATASET_END - timedelta(days=1)).year)
+        workloads = [
+            ("period totals", periods, lambda ops, start, end: ops.get_period_total(start, end), lambda total: total),
+            # Whole weeks and months of sessions: more time inside SQLite per query
+            ("period reports", periods[-64:], lambda ops, start, end: ops.get_period_report(start, end),
+             report_values),
+        ]
+        for label, chosen, query, values in workloads:
+            expected = [values(query(db_ops, start, end)) for start, end in chosen]
+
+            def best_of(run):
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    if [values(result) for result in run()] != expected:
+                        raise AssertionError(f"fan-out returned different {label}")
+                    timings.append(time.perf_counter() - started)
+                return min(timings)
+
+            def sequential():
+                return [query(db_ops, start, end) for start, end in chosen]
+
+            def thread_pool():
+                with ThreadPoolExecutor(max_workers=threads) as executor:
+                    return list(executor.map(lambda period: query(db_ops, *period), chosen))
+
+            def run_async(pool_size, concurrent):
+                async def load():
+                    async with AsyncDatabaseOperations(pool_size=pool_size) as async_ops:
+                        if concurrent:
+                            return await asyncio.gather(*(query(async_ops, start, end) for start, end in chosen))
+                        return [await query(async_ops, start, end) for start, end in chosen]
+                return asyncio.run(load())
+
+            cases = [("DatabaseOperations, sequential", sequential),
+                     (f"DatabaseOperations, {threads} threads", thread_pool),
+                     ("AsyncDatabaseOperations, awaited in turn", lambda: run_async(1, False))]
+            cases += [(f"AsyncDatabaseOperations, gather, pool {size}", lambda size=size: run_async(size, True))
+                      for size in pool_sizes]
+            print(f"{len(chosen)} {label} over {os.path.basename(path)} ({os.cpu_count()} CPUs):")
+            for name, run in cases:
+                seconds = best_of(run)
+                print(f"  {name:<42} {seconds * 1000:9.1f} ms {len(chosen) / seconds:9.0f} periods/s")
+    finally:
+        models.dispose_engine()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1500)
+    parser.add_argument("--days", type=int, default=30, help="whole days to check")
+    parser.add_argument("--windows", type=int, default=60, help="random windows to check")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--years", type=int, default=5, help="dataset for the fan-out timings")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "work_hours_datasets"),
+                        help="where generated datasets are cached")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with temporary_database():
+        mismatches = check(args.sessions, args.days, args.windows, args.seed)
+    os.makedirs(args.data_dir, exist_ok=True)
+    time_fanout(dataset_path(args.data_dir, args.years), args.repeat, args.pool_sizes, args.threads)
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Check the period cache against uncached queries and measure its hit rate.
+
+Every cached period query must return what an uncached one returns after
+each kind of write: logins and logouts of the current day, a session that
+crosses midnight into today, journaled writes and a bulk ingest of past
+sessions. Writes of the current day must leave cached past periods in
+place. The script then browses random past days through a small cache,
+prints the hit/miss/eviction counters and the speedup, and exits non-zero
+on any stale result.
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from database_operations import DatabaseOperations
+from query_cache import PeriodCache
+from system_monitor import SystemMonitor
+from event_journal import EventJournal
+from ingest import ingest_sessions
+from benchmarks.common import temporary_database, seed_random_sessions
+
+def periods(db_ops):
+    """(label, start, end) for the current and some past periods"""
+    today = datetime.now().date()
+    last_month = today.replace(day=1) - timedelta(days=1)
+    return [
+        ("today", *db_ops.get_day_range(today)),
+        ("yesterday", *db_ops.get_day_range(today - timedelta(days=1))),
+        ("last week", *db_ops.get_week_range(today - timedelta(days=7 + today.weekday()))),
+        ("this month", *db_ops.get_month_range(today.year, today.month)),
+        ("last month", *db_ops.get_month_range(last_month.year, last_month.month)),
+        ("last year", *db_ops.get_year_range(today.year - 1)),
+    ]
+
+def results(db_ops, start, end):
+    """Comparable results of every cached query for a period"""
+    report = db_ops.get_period_report(start, end)
+    return (
+        [tuple(session) for session in db_ops.get_sessions_in_range(start, end)],
+        [tuple(session) for session in db_ops.get_sessions_page(start, end, limit=50)],
+        db_ops.get_period_total(start, end),
+        db_ops.get_rollup_total(start.date(), end.date()),
+        (report.total, report.durations),
+    )
+
+def compare(cached_ops, plain_ops, step):
+    """Count periods whose cached results differ from uncached ones"""
+    stale = 0
+    for label, start, end in periods(plain_ops):
+        if results(cached_ops, start, end) != results(plain_ops, start, end):
+            stale += 1
+            print(f"STALE after {step}: {label}")
+    return stale
+
+def check_writes(journal_path):
+    """Run every kind of write between comparisons; returns the number of stale results"""
+    cached_ops = DatabaseOperations(cache=PeriodCache())
+    plain_ops = DatabaseOperations(cache=None)
+    cache = cached_ops.cache
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    monitor = SystemMonitor()
+    journaled = SystemMonitor(journal=EventJournal(journal_path))
+    stale = compare(cached_ops, plain_ops, "first read")
+
+    # Current-day writes leave past periods cached
+    past = [(start, end) for label, start, end in periods(plain_ops) if end <= today]
+    with redirect_stdout(io.StringIO()):
+        monitor.log_login(today + timedelta(hours=1))  # also closes the seeded open session
+        monitor.log_logout("Logout", today + timedelta(hours=2))
+    stale += compare(cached_ops, plain_ops, "orphan close and login")
+    before = cache.stats()
+    with redirect_stdout(io.StringIO()):
+        monitor.log_login(today + timedelta(hours=3))
+        monitor.log_logout("Sleep", today + timedelta(hours=4))
+    for start, end in past:
+        results(cached_ops, start, end)
+    after = cache.stats()
+    kept = after['hits'] - before['hits'] == 5 * len(past) and after['stale'] == before['stale']
+    if not kept:
+        stale += 1
+        print(f"FAIL current-day writes dropped past periods: {before} -> {after}")
+    stale += compare(cached_ops, plain_ops, "current-day login/logout")
+
+    # A session crossing midnight changes yesterday
+    with redirect_stdout(io.StringIO()):
+        monitor.log_login(today - timedelta(minutes=30))
+        monitor.log_logout("Logout", today + timedelta(minutes=30))
+    stale += compare(cached_ops, plain_ops, "session crossing midnight")
+
+    # Journaled writes are applied by the flusher
+    with redirect_stdout(io.StringIO()):
+        journaled.log_login(today - timedelta(days=3, hours=2))
+        journaled.log_logout("Shutdown", today - timedelta(days=3))
+        journaled.flusher.flush()
+    stale += compare(cached_ops, plain_ops, "journaled writes")
+    journaled.journal.close()
+
+    # Bulk ingest of last year's sessions
+    login = today.replace(year=today.year - 1, month=6, day=1) + timedelta(hours=9)
+    ingest_sessions([{'login_time': login, 'logout_time': login + timedelta(hours=3), 'logout_type': "Logout"}])
+    stale += compare(cached_ops, plain_ops, "ingest")
+    print(f"write checks: {stale} stale results; counters {cache.stats()}")
+    return stale
+
+def browse(db_ops, days, lookups, seed):
+    """Flip between random past days like the date pickers do; returns seconds taken"""
+    rng = random.Random(seed)
+    today = datetime.now().date()
+    started = time.perf_counter()
+    for _ in range(lookups):
+        # Recent days are looked at far more often than old ones
+        day = today - timedelta(days=1 + min(int(rng.expovariate(1 / 7)), days - 1))
+        db_ops.get_daily_report(day)
+        db_ops.get_weekly_report(day - timedelta(days=day.weekday()))
+        db_ops.get_monthly_total_hours(day.year, day.month)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--lookups", type=int, default=500)
+    parser.add_argument("--max-history", type=int, default=64, help="history entries of the browsing cache")
+    args = parser.parse_args()
+
+    with temporary_database() as path:
+        seed_random_sessions(args.sessions, days=args.days)
+        stale = check_writes(os.path.join(os.path.dirname(path), "cache.journal"))
+
+        plain_time = browse(DatabaseOperations(cache=None), args.days, args.lookups, seed=1)
+        cached_ops = DatabaseOperations(cache=PeriodCache(max_history=args.max_history))
+        cached_time = browse(cached_ops, args.days, args.lookups, seed=1)
+        stats = cached_ops.get_cache_stats()
+        hit_rate = stats['hits'] / max(1, stats['hits'] + stats['misses'])
+        print(f"browsing {args.lookups} past days: uncached {plain_time * 1000:.1f} ms, "
+              f"cached {cached_time * 1000:.1f} ms ({plain_time / cached_time:.1f}x), hit rate {hit_rate:.0%}")
+        print(f"counters: {stats}")
+    sys.exit(1 if stale else 0)
+
+if __name__ == "__main__":
+    main()
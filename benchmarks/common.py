@@ -0,0 +1,62 @@
+"""
+Shared helpers for the benchmark scripts
+"""
+
+import os
+import random
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import models
+from models import Base
+from ingest import ingest_sessions
+
+@contextmanager
+def temporary_database(name="bench.db"):
+    """Point the shared engine at a fresh database with the full schema"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, name)
+        models.configure_engine(f"sqlite:///{path}")
+        try:
+            Base.metadata.create_all(models.get_engine())
+            yield path
+        finally:
+            models.dispose_engine()
+
+class StatementCounter:
+    """Counts SQL statements run by any engine while installed"""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        event.listen(Engine, 'before_cursor_execute', self._count)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(Engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        with self._lock:
+            self.count += 1
+
+def seed_random_sessions(count, days=365, seed=0, open_sessions=1):
+    """Insert count closed sessions spread over the last days, plus open ones,
+    and rebuild the daily_totals rollup"""
+    rng = random.Random(seed)
+    end = datetime.now()
+    start = end - timedelta(days=days)
+    span = (end - start).total_seconds()
+    rows = []
+    for _ in range(count):
+        login = start + timedelta(seconds=rng.uniform(0, span))
+        logout = login + timedelta(seconds=rng.uniform(60, 4 * 3600))
+        rows.append({'login_time': login, 'logout_time': logout,
+                     'logout_type': rng.choice(["Sleep", "Logout", "Shutdown"])})
+    for _ in range(open_sessions):
+        rows.append({'login_time': end - timedelta(minutes=rng.randint(1, 120)), 'logout_time': None})
+    ingest_sessions(rows)
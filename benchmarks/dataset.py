@@ -0,0 +1,98 @@
+"""
+Deterministic synthetic work_hours databases for benchmarking.
+
+A dataset is years of workdays that end at a fixed date. Each day has a
+morning login and many sleep/wake cycles, some days run past midnight, and
+the newest session is left open. The same (years, seed, end) always produces
+the same sessions.
+
+Usage: python -m benchmarks.dataset --years 5 [--seed 0] [--out work_hours_5y.db]
+"""
+
+import argparse
+import os
+import random
+from datetime import datetime, timedelta
+import models
+from models import Base
+from ingest import ingest_sessions
+import daily_totals
+
+# Datasets end here rather than at "now" so repeated runs see identical data
+DATASET_END = datetime(2025, 1, 1)
+DATASET_YEARS = (1, 5, 10)
+
+def generate_sessions(years, seed=0, end=DATASET_END, user_id=None, host=None):
+    """Yield session dicts, oldest first, covering the given number of years before end"""
+    rng = random.Random(seed)
+    day = (end - timedelta(days=round(365.25 * years))).replace(hour=0, minute=0, second=0, microsecond=0)
+    last_logout = None
+    while day < end:
+        weekend = day.weekday() >= 5
+        if rng.random() < (0.15 if weekend else 0.95):
+            now = day + timedelta(hours=rng.uniform(7, 10.5) if not weekend else rng.uniform(10, 14))
+            # Past midnight on roughly one day in twelve
+            day_end = day + timedelta(hours=rng.uniform(24.5, 27) if rng.random() < 0.08
+                                      else rng.uniform(16, 19.5) if not weekend else rng.uniform(13, 17))
+            while now < day_end:
+                logout = min(now + timedelta(minutes=rng.uniform(5, 90)), day_end)
+                last_type = "Sleep" if logout < day_end else rng.choices(("Logout", "Shutdown"), (3, 1))[0]
+                yield {'login_time': now, 'logout_time': logout, 'logout_type': last_type,
+                       'user_id': user_id, 'host': host}
+                last_logout = logout
+                # Asleep or locked for a while before waking again
+                now = logout + timedelta(minutes=rng.uniform(2, 30))
+        day += timedelta(days=1)
+    # Still working when the dataset was taken
+    yield {'login_time': (last_logout or end) + timedelta(hours=1), 'logout_time': None, 'logout_type': None,
+           'user_id': user_id, 'host': host}
+
+def build_dataset(path, years, seed=0, end=DATASET_END, batch_size=20000):
+    """Create path with the schema and a generated dataset; returns the number of sessions"""
+    if os.path.exists(path):
+        os.remove(path)
+    models.configure_engine(f"sqlite:///{path}")
+    try:
+        Base.metadata.create_all(models.get_engine())
+        count = 0
+        batch = []
+        for session in generate_sessions(years, seed, end):
+            batch.append(session)
+            if len(batch) >= batch_size:
+                count += ingest_sessions(batch, rebuild_totals=False)
+                batch = []
+        if batch:
+            count += ingest_sessions(batch, rebuild_totals=False)
+
+        # One rollup rebuild over everything instead of one per batch
+        db_session = models.get_db_session()
+        try:
+            daily_totals.rebuild(db_session)
+            db_session.commit()
+        finally:
+            db_session.close()
+        return count
+    finally:
+        models.dispose_engine()
+
+def dataset_path(directory, years, seed=0):
+    """Path of the cached dataset for (years, seed), built on first use"""
+    path = os.path.join(directory, f"work_hours_{years}y_seed{seed}.db")
+    if not os.path.exists(path):
+        # Built under a temporary name so an interrupted build is never reused
+        build_dataset(path + ".partial", years, seed)
+        os.replace(path + ".partial", path)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic work_hours database")
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="database file (default work_hours_<years>y.db)")
+    args = parser.parse_args()
+    path = args.out or f"work_hours_{args.years}y.db"
+    count = build_dataset(path, args.years, args.seed)
+    print(f"Wrote {count} sessions over {args.years} years to {path}")
+
+if __name__ == "__main__":
+    main()
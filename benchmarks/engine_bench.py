@@ -0,0 +1,74 @@
+"""
+Per-call latency of get_db_session(): a new engine per call versus the
+shared, lazily created engine
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import models
+from models import Base, WorkSession
+
+def legacy_get_db_session(url):
+    """The old get_db_session(): engine and sessionmaker built on every call"""
+    engine = create_engine(url)
+    Session = sessionmaker(bind=engine)
+    return Session()
+
+def seed(url, count):
+    """Create the schema and a handful of sessions to query"""
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    session = Session()
+    start = datetime.now() - timedelta(days=count)
+    for i in range(count):
+        login = start + timedelta(days=i)
+        session.add(WorkSession(login_time=login, logout_time=login + timedelta(hours=8),
+                                logout_type="Logout"))
+    session.commit()
+    session.close()
+    engine.dispose()
+
+def run_query(session):
+    """One typical read: the most recent login"""
+    try:
+        session.query(WorkSession).order_by(WorkSession.login_time.desc()).first()
+    finally:
+        session.close()
+
+def measure(label, factory, iterations):
+    """Time iterations of factory() + run_query() and print per-call latency"""
+    run_query(factory())  # warm up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        run_query(factory())
+    elapsed = time.perf_counter() - started
+    per_call_us = elapsed / iterations * 1e6
+    print(f"{label:<22} {iterations:>6} calls  {per_call_us:10.1f} us/call")
+    return per_call_us
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--sessions", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed(url, args.sessions)
+
+        legacy = measure("new engine per call", lambda: legacy_get_db_session(url), args.iterations)
+
+        models.configure_engine(url)
+        shared = measure("shared engine", models.get_db_session, args.iterations)
+        models.dispose_engine()
+
+    print(f"speedup: {legacy / shared:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Load-test the SystemMonitor write path with a replayed event stream.
+
+Generated (or recorded, --events-file) login/sleep/wake/logout/shutdown
+events are fed through a ReplayEventSource as fast as the monitor accepts
+them. The script reports events/second and end-to-end latency: from the
+event reaching the monitor to its session change being committed and the
+listeners notified. With --journal the events go through the event journal
+and its batched flusher instead of one transaction each.
+"""
+
+import argparse
+import io
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from models import WorkSession, get_db_session
+from system_monitor import SystemMonitor
+from event_journal import EventJournal
+from event_sources import ReplayEventSource, generate_events, read_events
+from benchmarks.common import temporary_database
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=100000, help="number of generated events")
+    parser.add_argument("--events-file", help="replay a JSONL recording instead of generated events")
+    parser.add_argument("--journal", action="store_true", help="write through the event journal")
+    parser.add_argument("--no-fsync", action="store_true", help="do not fsync journal appends")
+    args = parser.parse_args()
+
+    with temporary_database("replay.db") as path:
+        journal = EventJournal(path + ".journal", fsync=not args.no_fsync) if args.journal else None
+        monitor = SystemMonitor(heartbeat_interval=3600, heartbeat_flush_interval=3600, journal=journal)
+
+        received = {}   # event timestamp -> perf_counter when the monitor got it
+        latencies = []
+
+        def on_session_event(event, login_time, logout_time):
+            received_at = received.pop(logout_time if event == "logout" else login_time, None)
+            if received_at is not None:
+                latencies.append(time.perf_counter() - received_at)
+
+        monitor.add_listener(on_session_event)
+        handle_event = monitor.handle_event
+
+        def timed_handle(event):
+            received[event.timestamp] = time.perf_counter()
+            handle_event(event)
+
+        monitor.handle_event = timed_handle
+        if args.events_file:
+            events_file = open(args.events_file, encoding='utf-8')
+            events = read_events(events_file)
+        else:
+            events_file = None
+            events = generate_events(args.events, start=datetime.now())
+        source = ReplayEventSource(events)
+        monitor.event_source = source
+
+        with redirect_stdout(io.StringIO()):  # the monitor logs every session change
+            started = time.perf_counter()
+            monitor.start_monitoring()
+            source.wait()
+            monitor.stop_monitoring()
+            elapsed = time.perf_counter() - started
+        if events_file:
+            events_file.close()
+        if journal:
+            journal.close()
+
+        session = get_db_session()
+        try:
+            sessions = session.query(WorkSession).count()
+        finally:
+            session.close()
+
+    latencies.sort()
+    mode = "journal" + ("" if not args.no_fsync else " (no fsync)") if args.journal else "synchronous"
+    print(f"mode:        {mode}")
+    print(f"events:      {source.delivered} in {elapsed:.2f} s = {source.delivered / elapsed:,.0f} events/s")
+    print(f"sessions:    {sessions}")
+    if latencies:
+        print(f"latency:     p50 {percentile(latencies, 0.5) * 1e3:.3f} ms   "
+              f"p99 {percentile(latencies, 0.99) * 1e3:.3f} ms   max {latencies[-1] * 1e3:.3f} ms")
+    sys.exit(0 if source.delivered and sessions else 1)
+
+if __name__ == "__main__":
+    main()
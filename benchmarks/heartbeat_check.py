@@ -0,0 +1,90 @@
+"""
+Check the crash-recovery bound of the SystemMonitor heartbeat.
+
+A monitor runs with the given intervals and is then abandoned without a
+logout, as after a crash. A second monitor recovers the orphaned session.
+The script reports how much worked time was lost and how many heartbeat
+writes were made. In a merged database the monitor must also leave other
+users' open sessions alone: an open session ingested for another user and
+host must stay open, without a heartbeat, through a login, a heartbeat and
+a logout of both the synchronous and the journaled monitor. It exits
+non-zero if the loss exceeds heartbeat_flush_interval + heartbeat_interval,
+or if another user's session was touched.
+"""
+
+import argparse
+import io
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from models import WorkSession, get_db_session
+from system_monitor import SystemMonitor
+from event_journal import EventJournal
+from ingest import ingest_sessions
+from benchmarks.common import temporary_database
+
+def check_other_users(journaled):
+    """Whether a monitor's login, heartbeat and logout leave another user's open session untouched"""
+    with temporary_database() as path:
+        login = datetime.now() - timedelta(hours=2)
+        ingest_sessions([{'login_time': login, 'logout_time': None, 'user_id': "bob", 'host': "h2"}])
+        journal = EventJournal(path + ".journal") if journaled else None
+        monitor = SystemMonitor(heartbeat_interval=0, heartbeat_flush_interval=0, journal=journal)
+        with redirect_stdout(io.StringIO()):
+            monitor.log_login(login + timedelta(hours=1))
+            monitor.heartbeat(login + timedelta(hours=1, minutes=30))
+            monitor.log_logout("Logout", login + timedelta(hours=2))
+            if monitor.flusher:
+                monitor.flusher.flush()
+        if journal is not None:
+            journal.close()
+        session = get_db_session()
+        try:
+            bob = session.query(WorkSession).filter_by(user_id="bob").one()
+            return bob.logout_time is None and bob.last_seen_time is None
+        finally:
+            session.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--interval", type=float, default=0.05, help="heartbeat_interval in seconds")
+    parser.add_argument("--flush-interval", type=float, default=0.5, help="heartbeat_flush_interval in seconds")
+    parser.add_argument("--run", type=float, default=3.0, help="seconds the first monitor runs before the crash")
+    args = parser.parse_args()
+
+    with temporary_database():
+        monitor = SystemMonitor(args.interval, args.flush_interval)
+        monitor.start_monitoring()
+        time.sleep(args.run)
+
+        # Crash: the thread stops and no logout is ever written
+        monitor.running = False
+        monitor._stop_event.set()
+        monitor.monitoring_thread.join()
+        crashed_at = monitor.last_activity
+
+        SystemMonitor(args.interval, args.flush_interval).log_login()
+
+        session = get_db_session()
+        try:
+            recovered = session.query(WorkSession).order_by(WorkSession.id).first()
+            lost = (crashed_at - recovered.logout_time).total_seconds()
+        finally:
+            session.close()
+
+    bound = args.flush_interval + args.interval
+    ticks = args.run / args.interval
+    print(f"heartbeat ticks:  ~{ticks:.0f}")
+    print(f"heartbeat writes: {monitor.heartbeat_writes}")
+    print(f"time lost:        {lost:.3f} s (bound {bound:.3f} s)")
+    others_ok = True
+    for journaled in (False, True):
+        untouched = check_other_users(journaled)
+        others_ok = others_ok and untouched
+        print(f"{'journaled' if journaled else 'synchronous'} monitor: another user's open session "
+              f"{'untouched' if untouched else 'CLOSED OR STAMPED'}")
+    sys.exit(0 if 0 <= lost <= bound and others_ok else 1)
+
+if __name__ == "__main__":
+    main()
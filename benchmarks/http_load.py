@@ -0,0 +1,223 @@
+"""
+Load-test the local HTTP API and check its conditional requests.
+
+A copy of a synthetic dataset is served by http_api on a free localhost
+port, the way the standalone server runs (watching the file for other
+processes' commits). Client threads, each on one keep-alive connection,
+poll a dashboard's mix of summaries, day/week/month totals and session
+pages without ETags, first with the server's period cache off, so every
+request queries SQLite, then with it on; finally with the ETags they were
+given, so every request should be a 304. Requests/second, p50/p95
+latency and SQL statements per request are printed for each phase. The script
+exits non-zero if:
+- a 200 body differs from DatabaseOperations(cache=None)
+- a 304 poll ran any SQL statement
+- a HEAD request sends a body, or breaks the keep-alive connection it came on
+- a write through ingest_sessions, or a commit by another sqlite3
+  connection, does not turn the next poll into a 200 with new totals.
+Clients and server share one interpreter, so on few cores the numbers are
+a lower bound.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+import models
+from database_operations import DatabaseOperations
+from ingest import ingest_sessions
+from http_api import TotalsApi, start_server
+from query_trace import percentile
+from benchmarks.common import StatementCounter
+from benchmarks.dataset import DATASET_END, dataset_path
+
+def dashboard_paths(days):
+    """What a dashboard polls for each of the last days of the dataset"""
+    paths = []
+    for offset in range(1, days + 1):
+        day = (DATASET_END - timedelta(days=offset)).date().isoformat()
+        paths += [f"/api/summary?date={day}", f"/api/totals/day?date={day}", f"/api/totals/week?date={day}",
+                  f"/api/totals/month?date={day}", f"/api/sessions/day?date={day}&limit=50"]
+    return paths
+
+def get(connection, path, etag=None):
+    """(status, ETag, body) of one GET on a keep-alive connection"""
+    connection.request('GET', path, headers={'If-None-Match': etag} if etag else {})
+    response = connection.getresponse()
+    body = response.read()
+    return response.status, response.getheader('ETag'), body
+
+def run_clients(port, paths, clients, requests, etags=None):
+    """Poll paths from client threads; returns (seconds, latencies, statuses)"""
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    barrier = threading.Barrier(clients + 1)
+
+    def client(index):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        timings = []
+        seen = {}
+        barrier.wait()
+        for number in range(requests):
+            path = paths[(index * 7 + number) % len(paths)]
+            started = time.perf_counter()
+            status, _, _ = get(connection, path, etags.get(path) if etags else None)
+            timings.append(time.perf_counter() - started)
+            seen[status] = seen.get(status, 0) + 1
+        connection.close()
+        with lock:
+            latencies.extend(timings)
+            for status, count in seen.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, sorted(latencies), statuses
+
+def expected_body(db_ops, path):
+    """Body the API should return for path, computed without the cache or HTTP"""
+    url = path.split('?', 1)
+    params = dict(pair.split('=') for pair in url[1].split('&')) if len(url) > 1 else {}
+    resolved = TotalsApi(db_ops).resolve(url[0], {name: [value] for name, value in params.items()})
+    return json.loads(json.dumps(resolved.load()))
+
+def check_bodies(port, paths, db_ops):
+    """Failures among 200 bodies compared with uncached DatabaseOperations results"""
+    failures = []
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    etags = {}
+    for path in paths:
+        status, etag, body = get(connection, path)
+        etags[path] = etag
+        if status != 200 or json.loads(body) != expected_body(db_ops, path):
+            failures.append(f"{path}: status {status} or body differs from DatabaseOperations")
+    connection.close()
+    return failures, etags
+
+def check_head(port, path, etag):
+    """Failures if HEAD differs from GET's headers or leaves bytes on the keep-alive connection"""
+    failures = []
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    _, _, body = get(connection, path)
+    for head_etag, expected_status in ((None, 200), (etag, 304)):
+        connection.request('HEAD', path, headers={'If-None-Match': head_etag} if head_etag else {})
+        response = connection.getresponse()
+        response.read()
+        if response.status != expected_status or response.getheader('ETag') != etag:
+            failures.append(f"HEAD {path}: status {response.status}, expected {expected_status} with its ETag")
+        if expected_status == 200 and response.getheader('Content-Length') != str(len(body)):
+            failures.append(f"HEAD {path}: Content-Length {response.getheader('Content-Length')}, GET sent {len(body)}")
+        # A stray body would be read as the start of the next response
+        try:
+            status, _, after = get(connection, path)
+        except http.client.HTTPException as e:
+            failures.append(f"GET after HEAD {path}: the connection is out of step ({e!r})")
+            break
+        if status != 200 or after != body:
+            failures.append(f"GET after HEAD {path}: status {status}, the connection is out of step")
+    connection.close()
+    return failures
+
+def check_write(port, path, etag, db_ops, label, write):
+    """Failures if a write leaves the old ETag of path current or its body stale"""
+    write()
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    status, new_etag, body = get(connection, path, etag)
+    connection.close()
+    if status != 200 or new_etag == etag:
+        return [f"after {label}: {path} answered {status} with ETag {new_etag}, expected 200 and a new ETag"]
+    if json.loads(body) != expected_body(db_ops, path):
+        return [f"after {label}: {path} returned stale totals"]
+    return []
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, default=1, help="dataset to serve")
+    parser.add_argument("--clients", type=int, default=8, help="client threads, one connection each")
+    parser.add_argument("--requests", type=int, default=500, help="requests per client and phase")
+    parser.add_argument("--days", type=int, default=30, help="days of dashboard paths to poll")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "work_hours_datasets"),
+                        help="where generated datasets are cached")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    source = dataset_path(args.data_dir, args.years)
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "work_hours.db")
+        shutil.copyfile(source, path)
+        models.configure_engine(f"sqlite:///{path}")
+        api = TotalsApi(watch=True)
+        server = start_server(0, api)
+        try:
+            port = server.server_port
+            db_ops = DatabaseOperations(cache=None)
+            paths = dashboard_paths(args.days)
+            found, etags = check_bodies(port, paths, db_ops)
+            failures.extend(found)
+            failures.extend(check_head(port, paths[0], etags[paths[0]]))
+
+            print(f"{len(paths)} paths over {os.path.basename(source)}, {args.clients} clients x "
+                  f"{args.requests} requests ({os.cpu_count()} CPUs):")
+            phases = (("200, uncached", None, db_ops), ("200, period cache", None, api.db_ops),
+                      ("304, If-None-Match", etags, api.db_ops))
+            for label, phase_etags, phase_db_ops in phases:
+                api.db_ops = phase_db_ops
+                with StatementCounter() as counter:
+                    seconds, latencies, statuses = run_clients(port, paths, args.clients, args.requests, phase_etags)
+                total = len(latencies)
+                print(f"  {label:<24} {total / seconds:8.0f} req/s  p50 {percentile(latencies, 50) * 1000:6.2f} ms  "
+                      f"p95 {percentile(latencies, 95) * 1000:6.2f} ms  {counter.count / total:5.2f} statements/req  "
+                      f"statuses {statuses}")
+                expected_status = 304 if phase_etags else 200
+                if statuses != {expected_status: total}:
+                    failures.append(f"{label}: statuses {statuses}, expected only {expected_status}")
+                if phase_etags and counter.count:
+                    failures.append(f"{label}: {counter.count} SQL statements ran for 304 responses")
+
+            polled = paths[0]
+            day = datetime.fromisoformat(polled.split('date=')[1])
+
+            def ingest_write():
+                ingest_sessions([{'login_time': day + timedelta(hours=1), 'logout_time': day + timedelta(hours=2),
+                                  'logout_type': "Logout"}])
+
+            def external_write():
+                # Another process's commit: no write generation bump in this one
+                connection = sqlite3.connect(path)
+                try:
+                    connection.execute("INSERT INTO work_sessions (login_time, logout_time, logout_type) "
+                                       "VALUES (?, ?, 'Logout')",
+                                       ((day + timedelta(hours=3)).strftime('%Y-%m-%d %H:%M:%S.%f'),
+                                        (day + timedelta(hours=4)).strftime('%Y-%m-%d %H:%M:%S.%f')))
+                    connection.commit()
+                finally:
+                    connection.close()
+
+            for label, write in (("ingest_sessions", ingest_write), ("a commit by another connection", external_write)):
+                etag = get(http.client.HTTPConnection('127.0.0.1', port), polled)[1]
+                failures.extend(check_write(port, polled, etag, db_ops, label, write))
+        finally:
+            server.shutdown()
+            server.server_close()
+            models.dispose_engine()
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
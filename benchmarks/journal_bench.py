@@ -0,0 +1,121 @@
+"""
+Compare login/logout latency with and without the event journal.
+
+The synchronous SystemMonitor writes each event to SQLite before returning;
+the journaled one only appends an fsync'd line and leaves the database work
+to the batched flusher. The script then abandons a journaled monitor with
+unapplied entries, as after a crash, and checks that a new monitor replays
+them. Finally a journal is left with a torn last line, as after a crash
+mid-append, and an event appended after reopening must survive the next
+reload. Last, sessions are logged through one journal file, then through a
+new one (as after deleting it or moving it with WORK_HOURS_JOURNAL), then
+through the first again; the new file's sequence numbers restart at 1, so
+none of its sessions may be taken for already applied. It exits non-zero
+if any session is missing after the replay or a switch of journal file,
+or the appended event is lost.
+"""
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from models import WorkSession, get_db_session
+from system_monitor import SystemMonitor
+from event_journal import EventJournal
+from benchmarks.common import temporary_database
+
+def time_events(monitor, cycles):
+    """Return per-call latencies in microseconds for cycles login/logout pairs"""
+    latencies = []
+    with redirect_stdout(io.StringIO()):  # keep the monitor's log lines out of the timings
+        for _ in range(cycles):
+            for call in (monitor.log_login, lambda: monitor.log_logout("Logout")):
+                started = time.perf_counter()
+                call()
+                latencies.append((time.perf_counter() - started) * 1e6)
+    return latencies
+
+def session_count():
+    """Count rows in work_sessions"""
+    session = get_db_session()
+    try:
+        return session.query(WorkSession).count()
+    finally:
+        session.close()
+
+def report(name, latencies):
+    """Print latency percentiles"""
+    latencies = sorted(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{name:<12} median {statistics.median(latencies):9.1f} us   p99 {p99:9.1f} us")
+
+def check_torn_tail(journal_path):
+    """Whether an event appended after a torn last line survives the next reload"""
+    journal = EventJournal(journal_path)
+    journal.append('login', datetime(2025, 1, 6, 9))
+    journal.close()
+    with open(journal_path, 'a', encoding='utf-8') as torn:
+        torn.write('{"seq": 2, "kind": "logo')
+    with redirect_stdout(io.StringIO()):
+        journal = EventJournal(journal_path)
+        seq = journal.append('logout', datetime(2025, 1, 6, 17), logout_type="Logout")
+        journal.close()
+        reloaded = [entry['seq'] for entry in EventJournal(journal_path).pending()]
+    return reloaded == [1, seq]
+
+def check_journal_switch(path, counts=(5, 3, 2)):
+    """(sessions found, expected) after logging counts[i] sessions through alternating journal files"""
+    with redirect_stdout(io.StringIO()):
+        for index, count in enumerate(counts):
+            journal = EventJournal(f"{path}.{'ab'[index % 2]}.journal")
+            monitor = SystemMonitor(journal=journal)
+            time_events(monitor, count)
+            monitor.flusher.flush()
+            journal.close()
+    return session_count(), sum(counts)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cycles", type=int, default=200, help="login/logout pairs per mode")
+    args = parser.parse_args()
+
+    with temporary_database("journal") as path:
+        journal_path = path + ".journal"
+        report("synchronous", time_events(SystemMonitor(), args.cycles))
+
+        journal = EventJournal(journal_path)
+        monitor = SystemMonitor(journal=journal)
+        report("journaled", time_events(monitor, args.cycles))
+        monitor.flusher.flush()
+        print(f"flushed in {monitor.flusher.batches} batches, journal {os.path.getsize(journal_path)} bytes")
+        expected = 2 * args.cycles
+
+        # Crash: events are journaled but the flusher never runs
+        time_events(monitor, args.cycles)
+        journal.close()
+        expected += args.cycles
+        unapplied = len(EventJournal(journal_path).pending())
+
+        recovered = SystemMonitor(journal=EventJournal(journal_path))
+        recovered.start_monitoring()
+        recovered.stop_monitoring()
+        expected += 1
+        found = session_count()
+        recovered.journal.close()
+
+        torn_ok = check_torn_tail(path + ".torn.journal")
+
+    with temporary_database("switch") as path:
+        switched, switch_expected = check_journal_switch(path)
+
+    print(f"replayed {unapplied} entries, sessions {found}/{expected}")
+    print(f"event appended after a torn line: {'kept' if torn_ok else 'LOST'}")
+    print(f"sessions across journal files: {switched}/{switch_expected}")
+    sys.exit(0 if found == expected and torn_ok and switched == switch_expected else 1)
+
+if __name__ == "__main__":
+    main()
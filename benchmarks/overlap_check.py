@@ -0,0 +1,187 @@
+"""
+Check period queries against a brute-force overlap reference and time them.
+
+Sessions are seeded with the awkward cases mixed in: crossing midnight,
+spanning several days, ending or starting exactly on a boundary, zero
+length, and open since an earlier day, for two users. For random windows
+and every day of the range, the sessions, page walks, totals, rollup and
+AnalyticsEngine results must equal a plain Python pass over all sessions
+(a session overlaps [start, end) if it logged in during it or was still
+running at start; its time is clipped to the window). The script then
+times get_period_total() for one day against an unindexed overlap query
+as the table grows, and exits non-zero on any mismatch.
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from models import WorkSession, get_db_session
+from database_operations import DatabaseOperations, CLIPPED_DURATION_US, clip_duration, period_params
+from analytics import AnalyticsEngine
+from ingest import ingest_sessions
+from benchmarks.common import temporary_database
+
+USERS = ("alice", "bob")
+
+def generate(count, start, seed=0):
+    """Session dicts from start on, with boundary cases mixed in"""
+    rng = random.Random(seed)
+    now = start
+    rows = []
+    for _ in range(count):
+        kind = rng.random()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        if kind < 0.1:
+            login, logout = now, midnight                                  # ends exactly at midnight
+        elif kind < 0.2:
+            login = midnight                                               # starts exactly at midnight
+            logout = login + timedelta(minutes=rng.uniform(1, 120))
+        elif kind < 0.3:
+            login = midnight - timedelta(minutes=rng.uniform(1, 120))      # crosses midnight
+            logout = midnight + timedelta(minutes=rng.uniform(1, 120))
+        elif kind < 0.33:
+            login = now
+            logout = now + timedelta(days=rng.uniform(1, 3))               # spans several days
+        elif kind < 0.36:
+            login = logout = now                                           # zero length
+        else:
+            login = now
+            logout = now + timedelta(minutes=rng.uniform(1, 300), microseconds=rng.randrange(1000000))
+        login = max(login, now)
+        logout = max(logout, login)
+        rows.append({'login_time': login, 'logout_time': logout, 'logout_type': "Logout",
+                     'user_id': rng.choice(USERS)})
+        now = logout + timedelta(minutes=rng.uniform(0, 600))
+    # An open session from an earlier day never counts
+    rows.append({'login_time': now, 'logout_time': None, 'user_id': USERS[0]})
+    return rows
+
+def reference(rows, start, end, user_id=None):
+    """(ids in login order, clipped total) by brute force"""
+    matches = [
+        row for row in rows
+        if (user_id is None or row['user_id'] == user_id)
+        and (start <= row['login_time'] < end
+             or (row['logout_time'] is not None and row['login_time'] < start < row['logout_time']))
+    ]
+    total = sum((clip_duration(row['login_time'], row['logout_time'], start, end) for row in matches), timedelta(0))
+    return [row['id'] for row in matches], total
+
+def walk_pages(db_ops, start, end, user_id=None, limit=7):
+    """Ids from get_sessions_page, one small page at a time"""
+    ids, after = [], None
+    while True:
+        page = db_ops.get_sessions_page(start, end, after, limit, user_id=user_id)
+        ids.extend(session.id for session in page)
+        if len(page) < limit:
+            return ids
+        after = (page[-1].login_time, page[-1].id)
+
+def check(count, days_checked, windows, seed):
+    """Compare every path against the reference; returns the number of mismatches"""
+    start = datetime(2024, 1, 1, 6)
+    rows = generate(count, start, seed)
+    ingest_sessions(rows)
+    # Rows are generated and inserted in login order, so ids follow the list
+    session = get_db_session()
+    try:
+        ids = session.execute(select(WorkSession.id).order_by(WorkSession.id)).scalars().all()
+    finally:
+        session.close()
+    for row, session_id in zip(rows, ids):
+        row['id'] = session_id
+
+    db_ops = DatabaseOperations(cache=None)
+    engine = AnalyticsEngine(db_ops)
+    engine.load()
+    rng = random.Random(seed)
+    cases = [db_ops.get_day_range(start.date() + timedelta(days=offset)) for offset in range(days_checked)]
+    for _ in range(windows):
+        window_start = start + timedelta(minutes=rng.uniform(0, days_checked * 1440))
+        cases.append((window_start, window_start + timedelta(minutes=rng.uniform(1, 5 * 1440))))
+
+    mismatches = 0
+    def fail(message):
+        nonlocal mismatches
+        mismatches += 1
+        print(f"FAIL {message}")
+
+    for window_start, window_end in cases:
+        whole_days = window_start.time() == window_end.time() == datetime.min.time()
+        for user_id in (None,) + USERS:
+            expected_ids, expected_total = reference(rows, window_start, window_end, user_id)
+            label = f"[{window_start}, {window_end}) user={user_id}"
+            sessions = db_ops.get_sessions_in_range(window_start, window_end, user_id)
+            if [s.id for s in sessions] != expected_ids:
+                fail(f"{label}: sessions {[s.id for s in sessions]} != {expected_ids}")
+            # duration_seconds is a float, so allow a microsecond per session
+            durations = sum((timedelta(seconds=s.duration_seconds) for s in sessions), timedelta(0))
+            if abs(durations - expected_total) > timedelta(microseconds=len(sessions)):
+                fail(f"{label}: session durations != {expected_total}")
+            if walk_pages(db_ops, window_start, window_end, user_id) != expected_ids:
+                fail(f"{label}: pages differ")
+            total_seconds, session_count = db_ops.get_period_total(window_start, window_end, user_id)
+            if timedelta(seconds=total_seconds) != expected_total or session_count != len(expected_ids):
+                fail(f"{label}: total {total_seconds} / {session_count} != {expected_total} / {len(expected_ids)}")
+            if user_id is None and whole_days:
+                rollup_seconds, _ = db_ops.get_rollup_total(window_start.date(), window_end.date())
+                if abs(rollup_seconds - expected_total.total_seconds()) > 0.001:
+                    fail(f"{label}: rollup {rollup_seconds} != {expected_total}")
+                engine_seconds, engine_count = engine.get_total(window_start.date(), window_end.date())
+                if timedelta(microseconds=round(engine_seconds * 1000000)) != expected_total \
+                        or engine_count != len(expected_ids):
+                    fail(f"{label}: engine {engine_seconds} / {engine_count}")
+    print(f"{count} sessions, {len(cases)} windows x {len(USERS) + 1} users: {mismatches} mismatches")
+    return mismatches
+
+def naive_total(start, end):
+    """get_period_total() with a plain overlap predicate, which no index can bound"""
+    session = get_db_session()
+    try:
+        return session.execute(
+            select(func.sum(CLIPPED_DURATION_US), func.count(WorkSession.id)).where(
+                WorkSession.login_time < end,
+                func.coalesce(WorkSession.logout_time, WorkSession.login_time) >= start
+            ),
+            period_params(start, end)
+        ).one()
+    finally:
+        session.close()
+
+def time_sizes(sizes, repeat):
+    """Print per-day query times as the table grows"""
+    print(f"{'sessions':>9} {'get_period_total':>17} {'naive overlap':>14}")
+    for size in sizes:
+        with temporary_database():
+            ingest_sessions(generate(size, datetime(2000, 1, 1), seed=size), rebuild_totals=False)
+            db_ops = DatabaseOperations(cache=None)
+            day = db_ops.get_day_range(datetime(2000, 1, 1).date() + timedelta(days=size // 8))
+            timings = {}
+            for name, query in (("indexed", lambda: db_ops.get_period_total(*day)), ("naive", lambda: naive_total(*day))):
+                query()
+                started = time.perf_counter()
+                for _ in range(repeat):
+                    query()
+                timings[name] = (time.perf_counter() - started) / repeat * 1000
+            print(f"{size:>9} {timings['indexed']:14.3f} ms {timings['naive']:11.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=3000)
+    parser.add_argument("--days", type=int, default=60, help="whole days to check")
+    parser.add_argument("--windows", type=int, default=200, help="random windows to check")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 400000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with temporary_database():
+        mismatches = check(args.sessions, args.days, args.windows, args.seed)
+    time_sizes(args.sizes, args.repeat)
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Check the opt-in profiler and what it costs.
+
+A child interpreter runs SystemMonitor login/logout cycles against a
+temporary database with WORK_HOURS_PROFILE unset, set to cprofile and set
+to sample, then the same cycles through a journaled monitor, flushing
+each one and building the tray tooltip after it, as the tray app does. Unset, the profiled methods must be the undecorated functions;
+set, each call must leave a readable pstats or folded-stack file, rotated
+down to WORK_HOURS_PROFILE_KEEP per function.
+The cycle times of the three runs are printed, and the script exits
+non-zero if a check fails.
+"""
+
+import argparse
+import json
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+
+CHILD_CODE = """
+import io, json, os, sys, time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from benchmarks.common import temporary_database, seed_random_sessions
+from database_operations import DatabaseOperations
+from event_journal import EventJournal
+from system_monitor import SystemMonitor
+from tray_ticker import TrayTicker
+
+class Tray:
+    title = ""
+
+cycles = int(sys.argv[1])
+with temporary_database():
+    seed_random_sessions(2000, days=60)
+    monitor = SystemMonitor()
+    start = datetime.now() - timedelta(days=cycles)
+    timings = []
+    with redirect_stdout(io.StringIO()):
+        for cycle in range(cycles):
+            login = start + timedelta(days=cycle)
+            started = time.perf_counter()
+            monitor.log_login(login)
+            monitor.log_logout("Logout", login + timedelta(hours=1))
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+
+    journal = EventJournal(os.environ['WORK_HOURS_JOURNAL'])
+    journaled = SystemMonitor(journal=journal)
+    ticker = TrayTicker(Tray(), journaled, DatabaseOperations(cache=None))
+    with redirect_stdout(io.StringIO()):
+        for cycle in range(cycles):
+            login = start + timedelta(days=cycle, hours=3)
+            journaled.log_login(login)
+            journaled.log_logout("Logout", login + timedelta(hours=1))
+            journaled.flusher.flush()
+            ticker.get_tooltip()
+    journal.close()
+methods = (SystemMonitor.log_login, SystemMonitor.log_logout, SystemMonitor._apply_journal, TrayTicker.get_tooltip)
+print(json.dumps({
+    'wrapped': [hasattr(method, '__wrapped__') for method in methods],
+    'median_ms': timings[len(timings) // 2] * 1000,
+}))
+"""
+
+def run_child(mode, cycles, directory, keep):
+    """Run CHILD_CODE with WORK_HOURS_PROFILE=mode; returns its JSON result"""
+    env = dict(os.environ)
+    env.pop('WORK_HOURS_PROFILE', None)
+    if mode:
+        env['WORK_HOURS_PROFILE'] = mode
+    env['WORK_HOURS_PROFILE_DIR'] = directory
+    env['WORK_HOURS_PROFILE_KEEP'] = str(keep)
+    env['WORK_HOURS_PROFILE_INTERVAL_MS'] = "0.5"
+    env['WORK_HOURS_JOURNAL'] = os.path.join(directory, "check.journal")
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.getcwd(), env.get('PYTHONPATH')]))
+    result = subprocess.run([sys.executable, "-c", CHILD_CODE, str(cycles)], env=env,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"child with WORK_HOURS_PROFILE={mode!r} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def check_files(directory, extension, keep):
+    """Failures found in the profile files of one run"""
+    failures = []
+    names = {}
+    for file_name in os.listdir(directory):
+        if file_name.endswith(extension):
+            names.setdefault(file_name.rsplit("-", 3)[0], []).append(file_name)
+    for method in ("SystemMonitor.log_login", "SystemMonitor.log_logout", "SystemMonitor._apply_journal",
+                   "TrayTicker.get_tooltip"):
+        files = names.get(method, [])
+        if len(files) != keep:
+            failures.append(f"{method}: {len(files)} {extension} files kept, expected {keep}")
+        for file_name in files:
+            path = os.path.join(directory, file_name)
+            if extension == '.prof':
+                stats = pstats.Stats(path)
+                if not any(function[2] == method.split(".")[1] for function in stats.stats):
+                    failures.append(f"{file_name}: {method} missing from the profile")
+            else:
+                with open(path, encoding='utf-8') as folded:
+                    for line in folded:
+                        stack, _, count = line.rstrip("\n").rpartition(" ")
+                        if not stack or not count.isdigit():
+                            failures.append(f"{file_name}: malformed line {line!r}")
+                            break
+    return failures, sum(len(files) for files in names.values())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cycles", type=int, default=50, help="login/logout cycles per run")
+    parser.add_argument("--keep", type=int, default=5, help="WORK_HOURS_PROFILE_KEEP for the profiled runs")
+    args = parser.parse_args()
+
+    failures = []
+    for mode, extension in (("", None), ("cprofile", ".prof"), ("sample", ".folded")):
+        with tempfile.TemporaryDirectory() as directory:
+            result = run_child(mode, args.cycles, directory, args.keep)
+            if mode and not all(result['wrapped']):
+                failures.append(f"{mode}: profiled methods are not wrapped")
+            if not mode and any(result['wrapped']):
+                failures.append("profiling disabled but methods are wrapped")
+            count = 0
+            if extension:
+                found, count = check_files(directory, extension, args.keep)
+                failures.extend(f"{mode}: {failure}" for failure in found)
+            print(f"WORK_HOURS_PROFILE={mode or '(unset)':<9} login+logout median {result['median_ms']:7.3f} ms, "
+                  f"{count} profile files kept")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
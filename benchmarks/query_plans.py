@@ -0,0 +1,98 @@
+"""
+Check that the DatabaseOperations period queries are served by an index.
+
+Every statement issued by the period getters is captured and re-run with
+EXPLAIN QUERY PLAN; the script exits non-zero if any of them falls back to
+a full table scan of work_sessions or walks every earlier login through an
+index with only an upper bound on login_time.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from sqlalchemy import event
+import models
+from models import Base, WorkSession, get_db_session
+from database_operations import DatabaseOperations
+
+def seed():
+    """Create the schema with a few sessions, one of them still open"""
+    Base.metadata.create_all(models.get_engine())
+    session = get_db_session()
+    try:
+        start = datetime.now() - timedelta(days=40)
+        for i in range(40):
+            login = start + timedelta(days=i)
+            session.add(WorkSession(login_time=login, logout_time=login + timedelta(hours=8),
+                                    logout_type="Logout"))
+        session.add(WorkSession(login_time=datetime.now()))
+        session.commit()
+    finally:
+        session.close()
+
+def capture_statements(func):
+    """Run func() and return the (sql, parameters) of every SELECT it issued"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    engine = models.get_engine()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+def query_plan(sql, parameters):
+    """Return the EXPLAIN QUERY PLAN detail lines for a statement"""
+    with models.get_engine().connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+    return [row[-1] for row in rows]
+
+def check(name, func):
+    """Print the plan of every work_sessions query issued by func()"""
+    ok = True
+    for sql, parameters in capture_statements(func):
+        if "work_sessions" not in sql:
+            continue
+        plan = query_plan(sql, parameters)
+        uses_index = any("USING INDEX" in line or "USING COVERING INDEX" in line
+                         or "USING INTEGER PRIMARY KEY" in line for line in plan)
+        full_scan = any(line.startswith("SCAN work_sessions ") and "INDEX" not in line for line in plan)
+        open_ended = any("login_time<?)" in line and "login_time>" not in line for line in plan)
+        passed = uses_index and not full_scan and not open_ended
+        ok = ok and passed
+        print(f"{'ok  ' if passed else 'FAIL'} {name}: {' | '.join(plan)}")
+    return ok
+
+def main():
+    db_ops = DatabaseOperations(cache=None)
+    today = datetime.now().date()
+    checks = [
+        ("get_daily_sessions", lambda: db_ops.get_daily_sessions(today)),
+        ("get_weekly_sessions", lambda: db_ops.get_weekly_sessions(today)),
+        ("get_monthly_sessions", lambda: db_ops.get_monthly_sessions(today.year, today.month)),
+        ("get_yearly_sessions", lambda: db_ops.get_yearly_sessions(today.year)),
+        ("get_yearly_sessions (user)", lambda: db_ops.get_yearly_sessions(today.year, user_id="alice")),
+        ("get_sessions_page", lambda: db_ops.get_sessions_page(*db_ops.get_month_range(today.year, today.month))),
+        ("get_sessions_page (user)", lambda: db_ops.get_sessions_page(*db_ops.get_month_range(), user_id="alice")),
+        ("get_period_total", lambda: db_ops.get_period_total(*db_ops.get_week_range())),
+        ("open session lookup", lambda: get_db_session().query(WorkSession).filter_by(logout_time=None).first()),
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        models.configure_engine(f"sqlite:///{os.path.join(tmp, 'plans.db')}")
+        try:
+            seed()
+            results = [check(name, func) for name, func in checks]
+        finally:
+            models.dispose_engine()
+
+    sys.exit(0 if all(results) else 1)
+
+if __name__ == "__main__":
+    main()
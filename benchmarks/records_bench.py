@@ -0,0 +1,63 @@
+"""
+Memory and throughput of reading sessions as ORM objects versus SessionRecords.
+
+Seeds a database (100k sessions by default) and reads the whole range both
+ways, reporting rows/second and the peak Python memory of each read.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime
+from models import WorkSession, get_db_session
+from database_operations import DatabaseOperations
+from benchmarks.common import temporary_database, seed_random_sessions
+
+def read_orm(start, end):
+    """The previous read path: full WorkSession objects"""
+    session = get_db_session()
+    try:
+        return session.query(WorkSession).filter(
+            WorkSession.login_time >= start,
+            WorkSession.login_time < end
+        ).order_by(WorkSession.login_time).all()
+    finally:
+        session.close()
+
+def measure(label, func, repeat):
+    """Report best-of-repeat throughput and the peak memory of one call"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        rows = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        del rows
+
+    gc.collect()
+    tracemalloc.start()
+    rows = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(rows)
+    print(f"{label:<16} {count:>8} rows  {count / best:>12,.0f} rows/s  peak {peak / 1048576:8.1f} MiB")
+    return best, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with temporary_database():
+        seed_random_sessions(args.sessions, days=365 * 3)
+        db_ops = DatabaseOperations(cache=None)
+        start, end = datetime(1970, 1, 1), datetime(9999, 1, 1)
+        orm_time, orm_peak = measure("ORM objects", lambda: read_orm(start, end), args.repeat)
+        rec_time, rec_peak = measure("SessionRecord", lambda: db_ops.get_sessions_in_range(start, end), args.repeat)
+        print(f"speedup {orm_time / rec_time:.1f}x, memory {orm_peak / rec_peak:.1f}x smaller")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Time and check report_cli.py over many synthetic databases.
+
+A few one-year datasets with different seeds are copied into a temporary
+directory tree until it holds --databases files, one folder per employee
+(each a plain work_hours.db). One more template is converted to a
+rollback journal, like databases from older versions or from setup.py,
+so both journal modes are read. report_cli.py then runs as a subprocess over
+the whole tree, and its total wall-clock and time per database are
+printed. Sampled buckets of every template are checked against
+DatabaseOperations.get_period_total, the report must have every database
+and no errors, the databases must be left unmodified, and the CLI must
+not have imported tkinter, pystray or pywin32. Exits non-zero on failure.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date as date_type, datetime, timedelta
+import models
+from database_operations import DatabaseOperations
+from benchmarks.dataset import DATASET_END, dataset_path
+
+GUI_MODULES = ("tkinter", "pystray", "win32api", "win32con", "win32gui", "win32ts", "pywintypes")
+
+IMPORT_CHECK = """
+import json, sys
+import report_cli
+print(json.dumps(sorted(name for name in sys.modules if name.split('.')[0] in sys.argv[1:])))
+"""
+
+def file_digest(path):
+    """SHA-256 of a file's contents"""
+    with open(path, 'rb') as data:
+        return hashlib.sha256(data.read()).hexdigest()
+
+def rollback_journal_copy(source, path):
+    """Copy a dataset and switch the copy from WAL to a rollback (DELETE) journal"""
+    shutil.copyfile(source, path)
+    connection = sqlite3.connect(path)
+    try:
+        mode = connection.execute("PRAGMA journal_mode=DELETE").fetchone()[0]
+    finally:
+        connection.close()
+    if mode != 'delete':
+        raise RuntimeError(f"{path} stayed in {mode} journal mode")
+    return path
+
+def child_env():
+    """Environment that lets a child interpreter import the tracker modules"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.getcwd(), env.get('PYTHONPATH')]))
+    return env
+
+def expected_totals(path, rows, samples, rng):
+    """Failures among sampled report rows of one database, recomputed with DatabaseOperations"""
+    failures = []
+    models.configure_engine(f"sqlite:///{path}")
+    try:
+        db_ops = DatabaseOperations(cache=None)
+        for row in rng.sample(rows, min(samples, len(rows))):
+            start = datetime.combine(date_type.fromisoformat(row['start']), datetime.min.time())
+            end = datetime.combine(date_type.fromisoformat(row['end']), datetime.min.time())
+            seconds, count = db_ops.get_period_total(start, end)
+            if abs(seconds - float(row['worked_seconds'])) > 0.001 or count != int(row['sessions']):
+                failures.append(f"{row['database']} {row['period']} {row['start']}: {row['worked_seconds']} s "
+                                f"in {row['sessions']} sessions reported, {seconds} s in {count} expected")
+    finally:
+        models.dispose_engine()
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--databases", type=int, default=1000)
+    parser.add_argument("--templates", type=int, default=4, help="distinct one-year datasets to copy")
+    parser.add_argument("--workers", type=int, default=None, help="report_cli.py --workers (default one per CPU)")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--samples", type=int, default=200, help="buckets checked per template")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "work_hours_datasets"),
+                        help="where generated datasets are cached")
+    args = parser.parse_args()
+
+    failures = []
+    os.makedirs(args.data_dir, exist_ok=True)
+    templates = [dataset_path(args.data_dir, 1, seed) for seed in range(args.templates)]
+    # The last whole year of the datasets
+    year = (DATASET_END - timedelta(days=1)).year
+
+    with tempfile.TemporaryDirectory() as tmp:
+        templates.append(rollback_journal_copy(templates[0], os.path.join(tmp, "rollback_journal.db")))
+        collected = os.path.join(tmp, "collected")
+        copies = {}
+        for index in range(args.databases):
+            folder = os.path.join(collected, f"employee{index:04d}")
+            os.makedirs(folder)
+            path = os.path.join(folder, "work_hours.db")
+            shutil.copyfile(templates[index % len(templates)], path)
+            copies[path] = index % len(templates)
+        digests = {path: file_digest(path) for path in list(copies)[:len(templates)]}
+
+        output = os.path.join(tmp, f"report.{args.format}")
+        command = [sys.executable, "report_cli.py", collected, "--from", f"{year}-01-01", "--to", f"{year + 1}-01-01",
+                   "--format", args.format, "--output", output]
+        if args.workers:
+            command += ["--workers", str(args.workers)]
+        started = time.perf_counter()
+        result = subprocess.run(command, env=child_env(), capture_output=True, text=True)
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            failures.append(f"report_cli.py exited with {result.returncode}:\n{result.stderr}")
+
+        rows = []
+        if os.path.exists(output):
+            with open(output, encoding='utf-8', newline='') as report:
+                if args.format == 'json':
+                    data = json.load(report)
+                    rows = data['rows']
+                    failures.extend(f"{error['database']}: {error['error']}" for error in data['errors'])
+                else:
+                    rows = list(csv.DictReader(report))
+        reported = {row['database'] for row in rows}
+        if len(reported) != args.databases:
+            failures.append(f"{len(reported)} of {args.databases} databases in the report")
+        per_database = len(rows) // max(len(reported), 1)
+
+        # Before expected_totals(), whose writable engine switches the rollback copy to WAL
+        for path, digest in digests.items():
+            if file_digest(path) != digest:
+                failures.append(f"{path} was modified by the report")
+        rng = random.Random(0)
+        for template in range(len(templates)):
+            path = next(path for path, source in copies.items() if source == template)
+            template_rows = [row for row in rows if row['database'] == path]
+            failures.extend(expected_totals(path, template_rows, args.samples, rng))
+
+    imports = subprocess.run([sys.executable, "-c", IMPORT_CHECK, *{name.split('.')[0] for name in GUI_MODULES}],
+                             env=child_env(), capture_output=True, text=True)
+    if imports.returncode != 0:
+        failures.append(f"importing report_cli failed:\n{imports.stderr}")
+    elif json.loads(imports.stdout):
+        failures.append(f"report_cli imports GUI modules: {', '.join(json.loads(imports.stdout))}")
+
+    print(f"{args.databases} databases ({args.templates} one-year templates, one more as a rollback journal), "
+          f"{len(rows)} rows, {per_database} per database, {args.format}, {args.workers or os.cpu_count()} workers "
+          f"({os.cpu_count()} CPUs):")
+    print(f"  wall-clock {elapsed:8.2f} s  {elapsed / args.databases * 1000:7.1f} ms per database")
+    for line in result.stderr.strip().splitlines()[-1:]:
+        print(f"  report_cli.py: {line}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Check that a session_io export imports back to the same totals.
+
+A database is seeded with random sessions plus awkward ones: crossing
+midnight, ending exactly at midnight, microsecond timestamps, a missing
+logout type, another user and host, and open sessions. It is exported as
+CSV and as JSONL in small keyset batches, and each file is imported into
+a fresh database in small chunks. The imported sessions (without their
+ids) must equal the exported ones, and get_period_total (for everyone
+and per user) and the daily_totals rollup must equal the source
+database's for every day and for the whole range. Exits non-zero on any
+mismatch.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from database_operations import DatabaseOperations
+from ingest import ingest_sessions
+from session_io import WRITERS, export_sessions, import_sessions, iter_sessions
+from benchmarks.common import temporary_database, seed_random_sessions
+
+def edge_sessions(today):
+    """Sessions on the boundaries the rollup and the exporters have to get right"""
+    midnight = datetime.combine(today, datetime.min.time())
+    return [
+        {'login_time': midnight - timedelta(hours=2, microseconds=7), 'logout_time': midnight + timedelta(hours=1),
+         'logout_type': "Sleep"},
+        {'login_time': midnight - timedelta(days=3, hours=1), 'logout_time': midnight - timedelta(days=3)},
+        {'login_time': midnight - timedelta(days=2, hours=5), 'logout_time': midnight - timedelta(days=2, hours=4),
+         'logout_type': "Logout", 'user_id': "bob", 'host': "h2"},
+        {'login_time': midnight - timedelta(days=1, hours=3), 'logout_time': None, 'user_id': "bob", 'host': "h2"},
+    ]
+
+def snapshot(days, today):
+    """Sessions without ids plus period totals and rollup of every day, for the current database"""
+    db_ops = DatabaseOperations(cache=None)
+    sessions = sorted((row.login_time, row.logout_time, row.logout_type, row.user_id, row.host)
+                      for row in iter_sessions(batch_size=97, db_ops=db_ops))
+    first = today - timedelta(days=days)
+    last = today + timedelta(days=2)
+    whole = (datetime.combine(first, datetime.min.time()), datetime.combine(last, datetime.min.time()))
+    totals = {
+        'all': db_ops.get_period_total(*whole),
+        'bob': db_ops.get_period_total(*whole, user_id="bob"),
+        'rollup': db_ops.get_rollup_total(first, last),
+    }
+    day = first
+    while day < last:
+        start = datetime.combine(day, datetime.min.time())
+        totals[day] = (db_ops.get_period_total(start, start + timedelta(days=1)),
+                       db_ops.get_rollup_total(day, day + timedelta(days=1)))
+        day += timedelta(days=1)
+    return sessions, totals
+
+def compare(label, expected, actual):
+    """Mismatches between two snapshots"""
+    failures = []
+    if expected[0] != actual[0]:
+        missing = set(expected[0]) - set(actual[0])
+        extra = set(actual[0]) - set(expected[0])
+        failures.append(f"{label}: sessions differ, {len(missing)} missing and {len(extra)} extra "
+                        f"(e.g. {next(iter(missing or extra))})")
+    for key, value in expected[1].items():
+        if actual[1][key] != value:
+            failures.append(f"{label}: {key} totals {actual[1][key]}, expected {value}")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=3000)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    today = datetime.now().date()
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {fmt: os.path.join(tmp, f"sessions.{fmt}") for fmt in WRITERS}
+        with temporary_database("source.db"):
+            seed_random_sessions(args.sessions, args.days, args.seed)
+            ingest_sessions(edge_sessions(today))
+            expected = snapshot(args.days, today)
+            for fmt, path in paths.items():
+                with open(path, 'w', newline='', encoding='utf-8') as output:
+                    count = export_sessions(output, fmt, batch_size=97)
+                if count != len(expected[0]):
+                    failures.append(f"{fmt}: exported {count} of {len(expected[0])} sessions")
+
+        for fmt, path in paths.items():
+            with temporary_database(f"imported_{fmt}.db"):
+                with open(path, newline='', encoding='utf-8') as lines:
+                    count, rate = import_sessions(lines, fmt, chunk_size=500)
+                failures.extend(compare(fmt, expected, snapshot(args.days, today)))
+            print(f"  {fmt:<6} {count} sessions, {os.path.getsize(path) / 1024:.0f} KiB, {rate:,.0f} rows/s imported")
+
+    # An empty database exports only a CSV header and imports nothing
+    with temporary_database("empty.db"):
+        output = io.StringIO()
+        if export_sessions(output, 'csv') != 0 or import_sessions(io.StringIO(output.getvalue()), 'csv')[0] != 0:
+            failures.append("an empty database did not round-trip to zero sessions")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
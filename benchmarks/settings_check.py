@@ -0,0 +1,116 @@
+"""
+Check the write-through SettingsStore.
+
+On a fresh database the store must give the schema default, and repeated
+get() calls must run no SQL after the first load. set() must write the
+settings row before get() returns the new value without a query, and
+DatabaseOperations.get_week_start_day() must follow it. Every subscribed
+listener must be called once per set() with the typed key and value, a
+failing listener must not stop the others, and an unsubscribed one must
+not be called again. A row written behind the store's back is picked up
+after invalidate(), an unreadable row falls back to the default, and
+pointing models.configure_engine() at another database reloads the
+store. Exits non-zero on any failure.
+"""
+
+import io
+import sys
+from contextlib import redirect_stdout
+from models import Settings, get_db_session
+from database_operations import DatabaseOperations
+from settings_store import SettingsStore
+from benchmarks.common import StatementCounter, temporary_database
+
+def stored_value(key):
+    """Value of a settings row, read without the store"""
+    session = get_db_session()
+    try:
+        setting = session.query(Settings).filter_by(key=key).first()
+        return setting.value if setting else None
+    finally:
+        session.close()
+
+def write_row(key, value):
+    """Write a settings row behind the store's back"""
+    session = get_db_session()
+    try:
+        setting = session.query(Settings).filter_by(key=key).first()
+        if setting:
+            setting.value = value
+        else:
+            session.add(Settings(key=key, value=value))
+        session.commit()
+    finally:
+        session.close()
+
+def main():
+    failures = []
+    store = SettingsStore()
+
+    with temporary_database():
+        if store.get('week_start_day') != 0:
+            failures.append(f"fresh database: week_start_day {store.get('week_start_day')}, expected the default 0")
+        with StatementCounter() as counter:
+            for _ in range(100):
+                store.get('week_start_day')
+        if counter.count:
+            failures.append(f"100 cached get() calls ran {counter.count} SQL statements")
+
+        calls = []
+        failing_calls = []
+
+        def failing(key, value):
+            failing_calls.append((key, value))
+            raise RuntimeError("listener failure")
+
+        store.subscribe(failing)
+        store.subscribe(lambda key, value: calls.append((key, value)))
+        with redirect_stdout(io.StringIO()):
+            store.set('week_start_day', "3")
+        if stored_value('week_start_day') != "3":
+            failures.append(f"set() wrote {stored_value('week_start_day')!r}, expected '3'")
+        with StatementCounter() as counter:
+            value = store.get('week_start_day')
+        if value != 3 or counter.count:
+            failures.append(f"get() after set() returned {value!r} with {counter.count} statements, expected 3 with none")
+        if calls != [('week_start_day', 3)] or failing_calls != [('week_start_day', 3)]:
+            failures.append(f"listeners were called with {failing_calls} and {calls}, expected one ('week_start_day', 3) each")
+
+        store.unsubscribe(failing)
+        store.set('week_start_day', 6)
+        if len(failing_calls) != 1 or calls[-1] != ('week_start_day', 6):
+            failures.append("an unsubscribed listener was called, or a subscribed one was not")
+
+        write_row('week_start_day', "2")
+        if store.get('week_start_day') != 6:
+            failures.append("get() queried the database instead of using the cache")
+        store.invalidate()
+        if store.get('week_start_day') != 2:
+            failures.append(f"after invalidate(): week_start_day {store.get('week_start_day')}, expected 2")
+
+        write_row('week_start_day', "Sunday")
+        store.invalidate()
+        with redirect_stdout(io.StringIO()):
+            value = store.get('week_start_day')
+        if value != 0:
+            failures.append(f"unreadable row: week_start_day {value!r}, expected the default 0")
+
+    with temporary_database("other.db"):
+        write_row('week_start_day', "4")
+        if store.get('week_start_day') != 4:
+            failures.append(f"another database: week_start_day {store.get('week_start_day')}, expected 4")
+
+    # DatabaseOperations goes through the process-wide store
+    with temporary_database():
+        db_ops = DatabaseOperations(cache=None)
+        db_ops.set_week_start_day(5)
+        if db_ops.get_week_start_day() != 5 or stored_value('week_start_day') != "5":
+            failures.append("DatabaseOperations.set_week_start_day() did not write through the store")
+
+    print(f"settings store: {'FAIL' if failures else 'ok'}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Measure cold start: import cost and wall-clock time to the first database write.
+
+Each run starts a fresh interpreter that does what main.py does before the
+tray appears (main.start_monitor()) against a temporary database, while
+this process polls the database until the login row shows up. A separate
+`-X importtime` run breaks the import cost of that path down by top-level
+package, and the GUI stack main.py loads afterwards is timed for comparison.
+The script exits non-zero if the median time to first write exceeds --budget-ms.
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import models
+from models import Base
+
+STARTUP_CODE = "import main, time; main.start_monitor(); time.sleep(60)"
+IMPORT_CODE = "import main; main.start_monitor().stop_monitoring()"
+
+def child_env(tmp):
+    """Environment pointing the child at the temporary database and journal"""
+    env = dict(os.environ)
+    env['WORK_HOURS_DB_URL'] = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+    env['WORK_HOURS_JOURNAL'] = os.path.join(tmp, 'startup.journal')
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.getcwd(), env.get('PYTHONPATH')]))
+    return env
+
+def create_schema(tmp):
+    """Create an empty database like setup.py does"""
+    models.configure_engine(f"sqlite:///{os.path.join(tmp, 'startup.db')}")
+    try:
+        Base.metadata.create_all(models.get_engine())
+    finally:
+        models.dispose_engine()
+
+def time_to_first_write(timeout):
+    """Seconds from spawning the interpreter until its login row is committed"""
+    with tempfile.TemporaryDirectory() as tmp:
+        create_schema(tmp)
+        db = sqlite3.connect(os.path.join(tmp, 'startup.db'))
+        started = time.perf_counter()
+        child = subprocess.Popen([sys.executable, "-c", STARTUP_CODE], env=child_env(tmp),
+                                 stdout=subprocess.DEVNULL)
+        try:
+            while time.perf_counter() - started < timeout:
+                if db.execute("SELECT count(*) FROM work_sessions").fetchone()[0]:
+                    return time.perf_counter() - started
+                time.sleep(0.002)
+            raise TimeoutError("no login written")
+        finally:
+            child.kill()
+            child.wait()
+            db.close()
+
+def import_breakdown(code):
+    """Return ({top-level package: microseconds spent importing its modules}, returncode)
+    from -X importtime"""
+    with tempfile.TemporaryDirectory() as tmp:
+        create_schema(tmp)
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=child_env(tmp),
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    packages = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+    return packages, result.returncode
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0, help="maximum median time to first write")
+    parser.add_argument("--top", type=int, default=10, help="packages to list in the breakdown")
+    args = parser.parse_args()
+
+    packages, _ = import_breakdown(IMPORT_CODE)
+    print("imports before the first write (ms, by top-level package):")
+    for package, us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {package:<28} {us / 1000:8.1f}")
+    print(f"  {'total':<28} {sum(packages.values()) / 1000:8.1f}")
+
+    gui, returncode = import_breakdown("import work_tracker")
+    if returncode == 0:
+        print(f"GUI stack loaded after the login: {sum(gui.values()) / 1000:.1f} ms")
+    else:
+        print("GUI stack loaded after the login: not importable here")
+
+    timings = [time_to_first_write(timeout=30) * 1000 for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(f"time to first write: median {median:.0f} ms, min {min(timings):.0f} ms, "
+          f"max {max(timings):.0f} ms (budget {args.budget_ms:.0f} ms)")
+    sys.exit(0 if median <= args.budget_ms else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Benchmark suite for DatabaseOperations, report building and SystemMonitor writes.
+
+For each synthetic dataset (see benchmarks.dataset) every DatabaseOperations
+getter and total is timed over the dataset's last day, week, month and year;
+the statistics window's report building is reproduced without Tk; and the
+SystemMonitor write paths are timed against a scratch copy of the dataset.
+Results are printed and written as JSON, and --compare prints the change
+against an earlier results file.
+
+Usage: python -m benchmarks.suite [--years 1 5 10] [--repeat 5] [--output results.json] [--compare old.json]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+import sqlalchemy
+import models
+from database_operations import DatabaseOperations
+from query_cache import PeriodCache
+from virtual_list import VirtualSessionList
+from session_io import iter_sessions
+from system_monitor import SystemMonitor
+from event_journal import EventJournal
+from benchmarks.dataset import DATASET_END, DATASET_YEARS, dataset_path
+
+def format_row(db_ops, session, duration=None):
+    """Same values as StatisticsGUI.format_session_row"""
+    login_time = session.login_time.strftime("%Y-%m-%d %H:%M:%S")
+    logout_time = session.logout_time.strftime("%Y-%m-%d %H:%M:%S") if session.logout_time else "Active"
+    if duration is None:
+        duration = db_ops.format_duration(timedelta(seconds=session.duration_seconds))
+    return (login_time, logout_time, session.logout_type or "N/A", duration)
+
+def report_tab(db_ops, report):
+    """Daily and weekly tabs: the whole report formatted as treeview rows"""
+    return [format_row(db_ops, session, duration) for session, duration in zip(report.sessions, report.durations)]
+
+def virtual_tab(db_ops, start, end, visible_rows=25):
+    """Monthly and yearly tabs: StatisticsGUI.build_virtual_list plus the first window"""
+    total_seconds, session_count = db_ops.get_period_total(start, end)
+    virtual_list = VirtualSessionList(
+        lambda after, limit: db_ops.get_sessions_page(start, end, after, limit),
+        session_count,
+        format_row=lambda session: format_row(db_ops, session),
+        visible_rows=visible_rows
+    )
+    return virtual_list.visible(), db_ops.format_duration(timedelta(seconds=total_seconds))
+
+def read_cases(db_ops):
+    """(name, func) pairs that only read the dataset"""
+    day = (DATASET_END - timedelta(days=1)).date()
+    week_start = day - timedelta(days=(day.weekday() - db_ops.get_week_start_day()) % 7)
+    year, month = day.year, day.month
+    month_range = db_ops.get_month_range(year, month)
+    year_range = db_ops.get_year_range(year)
+    year_sessions = db_ops.get_yearly_sessions(year)
+    return [
+        ("get_daily_sessions", lambda: db_ops.get_daily_sessions(day)),
+        ("get_weekly_sessions", lambda: db_ops.get_weekly_sessions(week_start)),
+        ("get_monthly_sessions", lambda: db_ops.get_monthly_sessions(year, month)),
+        ("get_yearly_sessions", lambda: db_ops.get_yearly_sessions(year)),
+        ("get_daily_report", lambda: db_ops.get_daily_report(day)),
+        ("get_weekly_report", lambda: db_ops.get_weekly_report(week_start)),
+        ("get_monthly_report", lambda: db_ops.get_monthly_report(year, month)),
+        ("get_yearly_report", lambda: db_ops.get_yearly_report(year)),
+        ("get_daily_total_hours", lambda: db_ops.get_daily_total_hours(day)),
+        ("get_weekly_total_hours", lambda: db_ops.get_weekly_total_hours(week_start)),
+        ("get_monthly_total_hours", lambda: db_ops.get_monthly_total_hours(year, month)),
+        ("get_yearly_total_hours", lambda: db_ops.get_yearly_total_hours(year)),
+        ("get_period_total (year)", lambda: db_ops.get_period_total(*year_range)),
+        ("get_rollup_total (year)", lambda: db_ops.get_rollup_total(year_range[0].date(), year_range[1].date())),
+        ("calculate_total_duration (year)", lambda: db_ops.calculate_total_duration(year_sessions)),
+        ("get_sessions_page (year)", lambda: db_ops.get_sessions_page(*year_range)),
+        ("get_export_page (year)", lambda: db_ops.get_export_page(*year_range)),
+        ("get_last_login_time", db_ops.get_last_login_time),
+        ("export all sessions", lambda: sum(1 for _ in iter_sessions(db_ops=db_ops))),
+        ("statistics daily tab", lambda: report_tab(db_ops, db_ops.get_daily_report(day))),
+        ("statistics weekly tab", lambda: report_tab(db_ops, db_ops.get_weekly_report(week_start))),
+        ("statistics monthly tab", lambda: virtual_tab(db_ops, *month_range)),
+        ("statistics yearly tab", lambda: virtual_tab(db_ops, *year_range)),
+    ]
+
+def statistics_window(db_ops):
+    """What StatisticsGUI.show() loads: the four tabs for the dataset's last day, week, month and year"""
+    day = (DATASET_END - timedelta(days=1)).date()
+    week_start = day - timedelta(days=(day.weekday() - db_ops.get_week_start_day()) % 7)
+    return (report_tab(db_ops, db_ops.get_daily_report(day)),
+            report_tab(db_ops, db_ops.get_weekly_report(week_start)),
+            virtual_tab(db_ops, *db_ops.get_month_range(day.year, day.month)),
+            virtual_tab(db_ops, *db_ops.get_year_range(day.year)))
+
+def cache_cases(db_ops):
+    """Reopening the statistics window without and with the period cache"""
+    cached_ops = DatabaseOperations(cache=PeriodCache())
+    return [
+        ("statistics window open (uncached)", lambda: statistics_window(db_ops)),
+        ("statistics window reopen (cached)", lambda: statistics_window(cached_ops)),
+    ]
+
+def write_cases(journal_path):
+    """(name, func) pairs that write; run against a scratch copy of the dataset"""
+    monitor = SystemMonitor()
+    journaled = SystemMonitor(journal=EventJournal(journal_path))
+
+    def login_logout(target):
+        target.log_login()
+        target.log_logout("Logout")
+
+    def journaled_cycle():
+        login_logout(journaled)
+        journaled.flusher.flush()
+
+    def heartbeat():
+        if monitor.current_session is None:
+            monitor.log_login()
+        monitor._write_heartbeat(datetime.now())
+
+    return [
+        ("SystemMonitor login+logout", lambda: login_logout(monitor)),
+        ("SystemMonitor journaled login+logout", lambda: login_logout(journaled)),
+        ("SystemMonitor journaled login+logout+flush", journaled_cycle),
+        ("SystemMonitor heartbeat write", heartbeat),
+    ]
+
+def time_case(func, repeat):
+    """Run func once to warm up, then repeat times; returns the timings in ms"""
+    func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def run_dataset(path, label, repeat):
+    """Time every case against the dataset at path; returns result dicts"""
+    results = []
+
+    def record(name, timings):
+        results.append({'dataset': label, 'case': name, 'median_ms': statistics.median(timings),
+                        'min_ms': min(timings), 'max_ms': max(timings), 'runs': len(timings)})
+        print(f"{label:>4} {name:<46} {statistics.median(timings):10.3f} ms")
+
+    models.configure_engine(f"sqlite:///{path}")
+    try:
+        db_ops = DatabaseOperations(cache=None)
+        for name, func in read_cases(db_ops) + cache_cases(db_ops):
+            record(name, time_case(func, repeat))
+    finally:
+        models.dispose_engine()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        scratch = os.path.join(tmp, "scratch.db")
+        shutil.copyfile(path, scratch)
+        models.configure_engine(f"sqlite:///{scratch}")
+        try:
+            with redirect_stdout(io.StringIO()):  # the monitor logs every write
+                timed = [(name, time_case(func, repeat)) for name, func in write_cases(scratch + ".journal")]
+            for name, timings in timed:
+                record(name, timings)
+        finally:
+            models.dispose_engine()
+    return results
+
+def session_count(path):
+    """Number of rows in work_sessions"""
+    with sqlite3.connect(path) as db:
+        return db.execute("SELECT count(*) FROM work_sessions").fetchone()[0]
+
+def compare(results, previous_path):
+    """Print median changes against an earlier results file"""
+    with open(previous_path, encoding='utf-8') as previous_file:
+        previous = {(r['dataset'], r['case']): r['median_ms'] for r in json.load(previous_file)['results']}
+    print(f"\nchange against {previous_path}:")
+    for result in results:
+        before = previous.get((result['dataset'], result['case']))
+        if before:
+            print(f"{result['dataset']:>4} {result['case']:<46} {before:10.3f} -> {result['median_ms']:10.3f} ms "
+                  f"({result['median_ms'] / before:5.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=int, nargs="+", default=list(DATASET_YEARS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "work_hours_datasets"),
+                        help="where generated datasets are cached")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    datasets = {}
+    results = []
+    for years in args.years:
+        path = dataset_path(args.data_dir, years, args.seed)
+        label = f"{years}y"
+        datasets[label] = {'years': years, 'seed': args.seed, 'sessions': session_count(path)}
+        results.extend(run_dataset(path, label, args.repeat))
+
+    report = {
+        'meta': {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'datasets': datasets,
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as output:
+        json.dump(report, output, indent=2)
+    print(f"\nWrote {len(results)} results to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Check that the tray ticker queries only when it reseeds.
+
+Two sessions are closed earlier today and a SystemMonitor logs in. The
+TrayTicker must then refresh the tooltip any number of times without a
+single SQL statement, while its total grows with the open session. A
+logout must reseed it exactly once, with the closed session counted, and
+the next date must reseed it exactly once at midnight, counting a session
+open since the evening before only from midnight. After each reseed the
+ticker must be back to zero statements per refresh. Exits non-zero on
+any failure.
+"""
+
+import argparse
+import io
+import sys
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from database_operations import DatabaseOperations
+from system_monitor import SystemMonitor
+from tray_ticker import TrayTicker
+from ingest import ingest_sessions
+from benchmarks.common import StatementCounter, temporary_database
+
+class Tray:
+    """Stands in for the pystray icon; only its title is set"""
+    title = ""
+
+def check_ticks(ticker, times, expected_seconds, label, failures):
+    """Build the tooltip at each of times; fail on any statement or a total other than expected_seconds(now)"""
+    seeds = ticker.seed_count
+    with StatementCounter() as counter:
+        for now in times:
+            ticker.get_tooltip(now)
+            seconds = ticker.get_daily_seconds(now)
+            if abs(seconds - expected_seconds(now)) > 0.001:
+                failures.append(f"{label} at {now:%H:%M:%S}: {seconds} s, expected {expected_seconds(now)} s")
+                break
+    if counter.count or ticker.seed_count != seeds:
+        failures.append(f"{label}: {len(times)} refreshes ran {counter.count} statements "
+                        f"and {ticker.seed_count - seeds} reseeds, expected none")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=1000, help="refreshes between reseeds")
+    args = parser.parse_args()
+
+    failures = []
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    with temporary_database():
+        ingest_sessions([
+            {'login_time': today + timedelta(hours=8), 'logout_time': today + timedelta(hours=9),
+             'logout_type': "Logout"},
+            {'login_time': today + timedelta(hours=10), 'logout_time': today + timedelta(hours=10, minutes=30),
+             'logout_type': "Sleep"},
+        ])
+        closed = 1.5 * 3600
+        monitor = SystemMonitor()
+        ticker = TrayTicker(Tray(), monitor, DatabaseOperations(cache=None))
+
+        login = today + timedelta(hours=11)
+        with redirect_stdout(io.StringIO()):
+            monitor.log_login(login)
+        ticker.get_daily_seconds(login)
+        seeds = ticker.seed_count
+        ticks = [login + timedelta(seconds=3600 * number / args.ticks) for number in range(args.ticks)]
+        check_ticks(ticker, ticks, lambda now: closed + (now - login).total_seconds(), "open session", failures)
+
+        logout = login + timedelta(hours=1)
+        with redirect_stdout(io.StringIO()):
+            monitor.log_logout("Logout", logout)
+        ticker.get_daily_seconds(logout)
+        if ticker.seed_count != seeds + 1:
+            failures.append(f"logout: {ticker.seed_count - seeds} reseeds, expected 1")
+        seeds = ticker.seed_count
+        ticks = [logout + timedelta(seconds=number) for number in range(args.ticks)]
+        check_ticks(ticker, ticks, lambda now: closed + 3600, "after logout", failures)
+
+        evening = today + timedelta(hours=23)
+        with redirect_stdout(io.StringIO()):
+            monitor.log_login(evening)
+        ticker.get_daily_seconds(evening)
+        seeds = ticker.seed_count
+        ticks = [evening + timedelta(seconds=number) for number in range(args.ticks)]
+        check_ticks(ticker, ticks, lambda now: closed + 3600 + (now - evening).total_seconds(), "evening", failures)
+
+        midnight = today + timedelta(days=1)
+        seconds = ticker.get_daily_seconds(midnight + timedelta(hours=2))
+        if ticker.seed_count != seeds + 1:
+            failures.append(f"midnight: {ticker.seed_count - seeds} reseeds, expected 1")
+        if abs(seconds - 2 * 3600) > 0.001:
+            failures.append(f"02:00 after an evening login: {seconds} s, expected 7200 s counted from midnight")
+        ticks = [midnight + timedelta(hours=2, seconds=number) for number in range(args.ticks)]
+        check_ticks(ticker, ticks, lambda now: (now - midnight).total_seconds(), "after midnight", failures)
+
+    print(f"tray ticker: {ticker.seed_count} reseeds over {4 * args.ticks} refreshes")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
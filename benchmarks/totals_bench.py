@@ -0,0 +1,74 @@
+"""
+SQL aggregate and daily-rollup period totals versus the Python reference path.
+
+For every day, week, month and year in the seeded range the SQL total from
+get_period_total() and the rollup total from get_rollup_total() are checked
+against calculate_total_duration() over the loaded ORM rows; the script exits
+non-zero on any mismatch and prints the time spent by each path.
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+from database_operations import DatabaseOperations
+from benchmarks.common import temporary_database, seed_random_sessions
+
+def periods(db_ops, days):
+    """Yield (label, start, end) for every period touched by the last days"""
+    today = datetime.now().date()
+    first = today - timedelta(days=days)
+    seen = set()
+    for offset in range(days + 1):
+        day = first + timedelta(days=offset)
+        candidates = [
+            ("day", db_ops.get_day_range(day)),
+            ("week", db_ops.get_week_range(day - timedelta(days=day.weekday()))),
+            ("month", db_ops.get_month_range(day.year, day.month)),
+            ("year", db_ops.get_year_range(day.year)),
+        ]
+        for label, period in candidates:
+            if period not in seen:
+                seen.add(period)
+                yield label, period[0], period[1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    with temporary_database():
+        seed_random_sessions(args.sessions, days=args.days)
+        db_ops = DatabaseOperations(cache=None)
+        python_time = sql_time = rollup_time = 0.0
+        mismatches = 0
+        for label, start, end in periods(db_ops, args.days):
+            started = time.perf_counter()
+            expected = db_ops.calculate_total_duration(db_ops.get_sessions_in_range(start, end), start, end)
+            python_time += time.perf_counter() - started
+
+            started = time.perf_counter()
+            total_seconds, _ = db_ops.get_period_total(start, end)
+            sql_time += time.perf_counter() - started
+
+            started = time.perf_counter()
+            rollup_seconds, _ = db_ops.get_rollup_total(start.date(), end.date())
+            rollup_time += time.perf_counter() - started
+
+            if timedelta(seconds=total_seconds) != expected:
+                mismatches += 1
+                print(f"MISMATCH {label} {start:%Y-%m-%d}: python={expected} sql={timedelta(seconds=total_seconds)}")
+            # Rollup rows store float seconds, so allow for rounding
+            if abs(rollup_seconds - expected.total_seconds()) > 0.001:
+                mismatches += 1
+                print(f"MISMATCH {label} {start:%Y-%m-%d}: python={expected} rollup={timedelta(seconds=rollup_seconds)}")
+
+        print(f"python path: {python_time * 1000:9.1f} ms")
+        print(f"sql path:    {sql_time * 1000:9.1f} ms")
+        print(f"rollup path: {rollup_time * 1000:9.1f} ms")
+        print(f"mismatches:  {mismatches}")
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Check VirtualSessionList against a plain list.
+
+Lists of several sizes are checked: empty, a single row, one row either
+side of a page boundary, and a few pages ending in a short last page.
+Login times repeat, so keyset paging has to break ties on id. Each list
+runs random moveto, scroll_to, scroll_by, scroll_pages and
+set_visible_rows calls, with jumps to the very end mixed in. After each
+call the first row, visible(), yview() and random get_rows ranges that
+cross pages and run past the end must equal slices of the plain list. So
+must cached_visible() once fetch_pages/store_pages have loaded the
+missing pages, the way the statistics window loads them. No more than
+max_pages pages may be cached. Exits non-zero on any mismatch.
+"""
+
+import argparse
+import random
+import sys
+from types import SimpleNamespace
+from virtual_list import VirtualSessionList
+
+PLACEHOLDER = ("loading",)
+
+def sessions(count, rng):
+    """count fake sessions ordered by (login_time, id), with repeated login times"""
+    login_time = 0
+    rows = []
+    for index in range(count):
+        login_time += rng.choice((0, 0, 1, 5))
+        rows.append(SimpleNamespace(login_time=login_time, id=index + 1))
+    return rows
+
+def page_fetcher(rows):
+    """fetch_page over rows, keyset paged like DatabaseOperations.get_sessions_page"""
+    def fetch_page(after, limit):
+        start = 0
+        if after is not None:
+            start = next((index for index, session in enumerate(rows)
+                          if (session.login_time, session.id) > after), len(rows))
+        return rows[start:start + limit]
+    return fetch_page
+
+def expected_yview(first, visible_rows, count):
+    """yview() of a plain list"""
+    if count == 0:
+        return 0.0, 1.0
+    return first / count, min(1.0, (first + visible_rows) / count)
+
+def check_list(count, page_size, steps, rng):
+    """Mismatches of one VirtualSessionList of count rows against a plain list"""
+    rows = sessions(count, rng)
+    expected = [(session.login_time, session.id) for session in rows]
+    virtual_list = VirtualSessionList(page_fetcher(rows), count, format_row=lambda s: (s.login_time, s.id),
+                                      page_size=page_size, visible_rows=rng.randint(1, 3 * page_size),
+                                      buffer_rows=rng.randint(0, page_size), max_pages=4)
+    # The asynchronous path the statistics window takes, on its own list; its cache must hold the
+    # widest materialized range, as the window's 200-row pages do
+    loaded = VirtualSessionList(page_fetcher(rows), count, format_row=lambda s: (s.login_time, s.id),
+                                page_size=page_size, visible_rows=virtual_list.visible_rows,
+                                buffer_rows=virtual_list.buffer_rows, max_pages=6)
+    first = 0
+    visible_rows = virtual_list.visible_rows
+    failures = []
+
+    def fail(message):
+        failures.append(f"{count} rows, page size {page_size}: {message}")
+
+    for step in range(steps):
+        max_first = max(0, count - visible_rows)
+        action = rng.choice(("moveto", "moveto_end", "scroll_to", "scroll_by", "scroll_pages", "set_visible_rows"))
+        if action == "moveto":
+            fraction = rng.uniform(-0.1, 1.1)
+            call = ("moveto", str(fraction))
+            first = round(fraction * count)
+        elif action == "moveto_end":
+            call = ("moveto", "1.0")
+            first = count
+        elif action == "scroll_to":
+            first = rng.randint(-5, count + 5)
+            call = ("scroll_to", first)
+        elif action == "scroll_by":
+            amount = rng.randint(-2 * page_size, 2 * page_size)
+            call = ("scroll_by", amount)
+            first += amount
+        elif action == "scroll_pages":
+            amount = rng.randint(-2, 2)
+            call = ("scroll_pages", amount)
+            first += amount * visible_rows
+        else:
+            visible_rows = rng.randint(-2, 3 * page_size)
+            call = ("set_visible_rows", visible_rows)
+            visible_rows = max(1, visible_rows)
+            max_first = max(0, count - visible_rows)
+        first = min(max(0, first), max_first)
+        for model in (virtual_list, loaded):
+            getattr(model, call[0])(call[1])
+
+        label = f"step {step} {call[0]}({call[1]})"
+        if virtual_list.first != first:
+            fail(f"{label}: first {virtual_list.first}, expected {first}")
+            break
+        window = expected[first:first + visible_rows]
+        if virtual_list.visible() != window:
+            fail(f"{label}: visible() differs from rows [{first}, {first + visible_rows})")
+        if virtual_list.yview() != expected_yview(first, visible_rows, count):
+            fail(f"{label}: yview() {virtual_list.yview()}, expected {expected_yview(first, visible_rows, count)}")
+        start = rng.randint(-page_size, count + page_size)
+        stop = start + rng.randint(0, 3 * page_size)
+        if virtual_list.get_rows(start, stop) != expected[max(0, start):max(0, stop)]:
+            fail(f"{label}: get_rows({start}, {stop}) differs")
+        if virtual_list.get_rows(count - page_size, count + 1) != expected[max(0, count - page_size):]:
+            fail(f"{label}: the last page differs")
+        if len(virtual_list._pages) > virtual_list.max_pages:
+            fail(f"{label}: {len(virtual_list._pages)} pages cached, max_pages is {virtual_list.max_pages}")
+
+        shown = loaded.cached_visible(PLACEHOLDER)
+        if any(row != PLACEHOLDER and row != want for row, want in zip(shown, window)) or len(shown) != len(window):
+            fail(f"{label}: cached_visible() shows rows that are not in the window")
+        loaded.store_pages(loaded.fetch_pages(loaded.missing_pages()))
+        if loaded.missing_pages():
+            fail(f"{label}: pages {loaded.missing_pages()} still missing after store_pages")
+        if loaded.cached_visible(PLACEHOLDER) != window:
+            fail(f"{label}: cached_visible() after store_pages differs from rows [{first}, {first + visible_rows})")
+        if failures:
+            break
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--steps", type=int, default=300, help="scroll calls per list")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    page_size = args.page_size
+    counts = [0, 1, page_size - 1, page_size, page_size + 1, 7 * page_size, 7 * page_size + 3]
+    failures = []
+    for count in counts:
+        found = check_list(count, page_size, args.steps, rng)
+        print(f"  {count:5d} rows: {'FAIL' if found else 'ok'}")
+        failures.extend(found)
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Daily totals rollup for Work Hours Tracker
+Keeps one row per calendar day so period totals never scan raw sessions;
+a session that crosses midnight adds its time to each day it covers and
+counts as a session of its login date
+
+Usage: python daily_totals.py rebuild [--from YYYY-MM-DD] [--to YYYY-MM-DD]
+"""
+
+import argparse
+from datetime import datetime, timedelta, date as date_type
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import WorkSession, DailyTotal, get_db_session
+from database_operations import period_filter
+
+def add_closed_session(db_session, login_time, logout_time):
+    """Add a just-closed session to its day; the caller commits"""
+    add_closed_sessions(db_session, [(login_time, logout_time)])
+
+def split_by_day(intervals, start_date=None, end_date=None):
+    """Get {date: (worked timedelta, session_count)} for (login_time, logout_time) pairs,
+    split at midnight and limited to [start_date, end_date) when given"""
+    days = {}
+    for login_time, logout_time in intervals:
+        day = login_time.date()
+        piece_start = login_time
+        session_count = 1
+        while True:
+            midnight = datetime.combine(day + timedelta(days=1), datetime.min.time())
+            piece_end = min(logout_time, midnight)
+            if (start_date is None or day >= start_date) and (end_date is None or day < end_date):
+                worked, count = days.get(day, (timedelta(0), 0))
+                days[day] = (worked + max(piece_end - piece_start, timedelta(0)), count + session_count)
+            if logout_time <= midnight:
+                break
+            day += timedelta(days=1)
+            piece_start = midnight
+            session_count = 0
+    return days
+
+def upsert_days(db_session, days):
+    """Add {date: (worked timedelta, session_count)} to the rollup rows in one statement"""
+    if not days:
+        return
+    statement = sqlite_insert(DailyTotal)
+    statement = statement.on_conflict_do_update(
+        index_elements=[DailyTotal.date],
+        set_={
+            'worked_seconds': DailyTotal.worked_seconds + statement.excluded.worked_seconds,
+            'session_count': DailyTotal.session_count + statement.excluded.session_count,
+        }
+    )
+    db_session.execute(statement, [
+        {'date': day, 'worked_seconds': worked.total_seconds(), 'session_count': session_count}
+        for day, (worked, session_count) in days.items()
+    ])
+
+def add_closed_sessions(db_session, intervals):
+    """Add (login_time, logout_time) pairs to their days in one statement; the caller commits"""
+    upsert_days(db_session, split_by_day(intervals))
+
+def rebuild(db_session, start_date=None, end_date=None):
+    """Recompute rollup rows for [start_date, end_date) from raw sessions; the caller commits"""
+    start = datetime.combine(start_date, datetime.min.time()) if start_date is not None else datetime.min
+    end = datetime.combine(end_date, datetime.min.time()) if end_date is not None else datetime.max
+    delete_conditions = []
+    if start_date is not None:
+        delete_conditions.append(DailyTotal.date >= start_date)
+    if end_date is not None:
+        delete_conditions.append(DailyTotal.date < end_date)
+
+    # Every closed session overlapping the range, including one still running at its start
+    intervals = db_session.execute(
+        select(WorkSession.login_time, WorkSession.logout_time).where(
+            period_filter(start, end),
+            WorkSession.logout_time.isnot(None)
+        )
+    ).all()
+    db_session.query(DailyTotal).filter(*delete_conditions).delete(synchronize_session=False)
+    upsert_days(db_session, split_by_day(intervals, start_date, end_date))
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the daily_totals rollup")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--from", dest="start", type=date_type.fromisoformat, default=None)
+    parser.add_argument("--to", dest="end", type=date_type.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    session = get_db_session()
+    try:
+        rebuild(session, args.start, args.end)
+        session.commit()
+        days = session.query(func.count(DailyTotal.date)).scalar()
+        print(f"Rebuilt daily totals ({days} days)")
+    finally:
+        session.close()
+
+if __name__ == "__main__":
+    main()
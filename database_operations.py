@@ -2,94 +2,257 @@
 Database operations for Work Hours Tracker
 """
 
-from datetime import datetime, timedelta
-from sqlalchemy import func, and_
-from models import WorkSession, Settings, get_db_session
+from datetime import datetime, time, timedelta
+from functools import lru_cache
+from sqlalchemy import and_, bindparam, case, cast, func, or_, select, tuple_, Date, DateTime, Integer
+from models import WorkSession, DailyTotal, SessionRecord, SESSION_INTERVALS, get_db_session
+from settings_store import settings_store
+from query_cache import period_cache, cached_period
+from query_trace import traced
 
-class DatabaseOperations:
-    def __init__(self):
-        pass
-        
-    def get_daily_sessions(self, date=None):
-        """Get work sessions for a specific day"""
+def epoch_microseconds(column):
+    """SQL expression for a stored DateTime as integer microseconds since the epoch"""
+    # SQLite stores 'YYYY-MM-DD HH:MM:SS.ffffff'; whole seconds come from the first
+    # 19 characters (strftime would round the fraction) and microseconds from 21 on
+    whole_seconds = cast(func.strftime('%s', func.substr(column, 1, 19)), Integer)
+    return whole_seconds * 1000000 + cast(func.substr(column, 21), Integer)
+
+EPOCH = datetime(1970, 1, 1)
+
+def to_epoch_microseconds(value):
+    """A naive datetime as integer microseconds since the epoch, as epoch_microseconds() counts them"""
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+# Same rule as calculate_session_duration(): open sessions count as zero
+SESSION_DURATION_US = case(
+    (WorkSession.logout_time.is_(None), 0),
+    else_=epoch_microseconds(WorkSession.logout_time) - epoch_microseconds(WorkSession.login_time)
+)
+
+# Bound parameters of the period clauses and statements below; see period_params().
+# The statements are built once, so each call only binds values instead of
+# rebuilding and re-keying the expression tree
+PERIOD_START = bindparam('period_start', type_=DateTime)
+PERIOD_END = bindparam('period_end', type_=DateTime)
+PERIOD_START_MINUTE = bindparam('period_start_minute', type_=Integer)
+PERIOD_START_US = bindparam('period_start_us', type_=Integer)
+PERIOD_END_US = bindparam('period_end_us', type_=Integer)
+PERIOD_USER = bindparam('period_user')
+PAGE_AFTER_LOGIN = bindparam('after_login_time', type_=DateTime)
+PAGE_AFTER_ID = bindparam('after_id', type_=Integer)
+PAGE_LIMIT = bindparam('page_limit', type_=Integer)
+ROLLUP_START = bindparam('rollup_start', type_=Date)
+ROLLUP_END = bindparam('rollup_end', type_=Date)
+
+def period_params(start, end, user_id=None):
+    """Values for the PERIOD_* parameters of the period [start, end)"""
+    return {
+        'period_start': start,
+        'period_end': end,
+        'period_start_minute': to_epoch_microseconds(start) // 60000000,
+        'period_start_us': to_epoch_microseconds(start),
+        'period_end_us': to_epoch_microseconds(end),
+        'period_user': user_id,
+    }
+
+# Microseconds of a session inside the period; open sessions count as zero
+CLIPPED_DURATION_US = case(
+    (WorkSession.logout_time.is_(None), 0),
+    else_=func.max(0, func.min(epoch_microseconds(WorkSession.logout_time), PERIOD_END_US)
+                   - func.max(epoch_microseconds(WorkSession.login_time), PERIOD_START_US))
+)
+
+# Columns needed to build a SessionRecord, selected without loading ORM objects
+SESSION_COLUMNS = (WorkSession.id, WorkSession.login_time, WorkSession.logout_time, WorkSession.logout_type)
+
+# Export rows also carry who logged in and where
+EXPORT_COLUMNS = (*SESSION_COLUMNS, WorkSession.user_id, WorkSession.host)
+
+def to_session_records(rows, start=None, end=None):
+    """Turn (id, login_time, logout_time, logout_type) rows into SessionRecords,
+    with durations clipped to [start, end) when given"""
+    return [
+        SessionRecord(session_id, login_time, logout_time, logout_type,
+                      clip_duration(login_time, logout_time, start, end).total_seconds())
+        for session_id, login_time, logout_time, logout_type in rows
+    ]
+
+def clip_duration(login_time, logout_time, start=None, end=None):
+    """Duration of the part of a session inside [start, end); open sessions count as zero"""
+    if not logout_time:
+        return timedelta(0)
+    if start is not None and login_time < start:
+        login_time = start
+    if end is not None and logout_time > end:
+        logout_time = end
+    return max(logout_time - login_time, timedelta(0))
+
+def login_clause(by_user=False):
+    """WHERE clause for sessions that logged in during the period"""
+    conditions = [
+        WorkSession.login_time >= PERIOD_START,
+        WorkSession.login_time < PERIOD_END
+    ]
+    if by_user:
+        conditions.append(WorkSession.user_id == PERIOD_USER)
+    return and_(*conditions)
+
+def straddler_clause(by_user=False):
+    """WHERE clause for closed sessions that logged in before the period and were still running at its start"""
+    # The R*Tree finds the few candidate ids in logarithmic time (its minute bounds
+    # are rounded outwards) and the exact comparisons drop the false positives.
+    # likely() marks those as unselective so SQLite looks the candidates up by id
+    # instead of walking every earlier login in an index on login_time
+    candidates = select(SESSION_INTERVALS.c.id).where(
+        SESSION_INTERVALS.c.login_minute <= PERIOD_START_MINUTE,
+        SESSION_INTERVALS.c.logout_minute >= PERIOD_START_MINUTE
+    )
+    conditions = [
+        WorkSession.id.in_(candidates),
+        func.likely(WorkSession.login_time < PERIOD_START),
+        WorkSession.logout_time > PERIOD_START
+    ]
+    if by_user:
+        conditions.append(func.likely(WorkSession.user_id == PERIOD_USER))
+    return and_(*conditions)
+
+@lru_cache(maxsize=None)
+def period_clause(straddlers=True, by_user=False):
+    """WHERE clause for sessions overlapping the period: logged in during it, or still running at its start"""
+    if not straddlers:
+        return login_clause(by_user)
+    return or_(login_clause(by_user), straddler_clause(by_user))
+
+def period_filter(start, end, user_id=None):
+    """WHERE clause for sessions overlapping [start, end), optionally for one user
+
+    A session overlaps if it logged in during the period or was still running at
+    its start, so sessions that cross midnight count towards both days."""
+    # Nothing runs at datetime.min; leaving the straddlers out keeps whole-table
+    # scans on the login_time index
+    clause = period_clause(start != datetime.min, user_id is not None)
+    return clause.params(period_params(start, end, user_id))
+
+@lru_cache(maxsize=None)
+def sessions_statement(straddlers, by_user):
+    """SELECT of SESSION_COLUMNS for the period, in login order"""
+    return select(*SESSION_COLUMNS).where(period_clause(straddlers, by_user)).order_by(WorkSession.login_time)
+
+@lru_cache(maxsize=None)
+def total_statement(straddlers, by_user):
+    """SELECT of (clipped microseconds, session count) for the period"""
+    return select(
+        func.coalesce(func.sum(CLIPPED_DURATION_US), 0),
+        func.count(WorkSession.id)
+    ).where(period_clause(straddlers, by_user))
+
+@lru_cache(maxsize=None)
+def page_statement(columns, straddlers, by_user, keyed):
+    """SELECT of columns for one part of a keyset page, in (login_time, id) order"""
+    statement = select(*columns).where(straddler_clause(by_user) if straddlers else login_clause(by_user))
+    if keyed:
+        statement = statement.where(tuple_(WorkSession.login_time, WorkSession.id)
+                                    > tuple_(PAGE_AFTER_LOGIN, PAGE_AFTER_ID))
+    return statement.order_by(WorkSession.login_time, WorkSession.id).limit(PAGE_LIMIT)
+
+def page_params(start, end, after=None, user_id=None):
+    """Values for the parameters of page_statement(); PAGE_LIMIT is set per part"""
+    params = period_params(start, end, user_id)
+    if after is not None:
+        params['after_login_time'], params['after_id'] = after
+    return params
+
+def page_parts(columns, start, end, after=None, user_id=None):
+    """page_statement()s that make up a page, to run in order until it is full"""
+    # Sessions running at start logged in before every other match, so they are read
+    # first and the rest of the page comes straight off the login_time index
+    return [page_statement(tuple(columns), straddlers, user_id is not None, after is not None)
+            for straddlers in ((True, False) if start != datetime.min else (False,))]
+
+def fetch_page(session, columns, start, end, after=None, limit=200, user_id=None):
+    """Rows of sessions overlapping [start, end) that follow the (login_time, id) key after, in key order"""
+    params = page_params(start, end, after, user_id)
+    rows = []
+    for statement in page_parts(columns, start, end, after, user_id):
+        params['page_limit'] = limit - len(rows)
+        rows.extend(session.execute(statement, params).all())
+        if len(rows) >= limit:
+            break
+    return rows
+
+@lru_cache(maxsize=None)
+def rollup_statement():
+    """SELECT of (worked seconds, closed session count) from daily_totals for [ROLLUP_START, ROLLUP_END)"""
+    return select(
+        func.coalesce(func.sum(DailyTotal.worked_seconds), 0.0),
+        func.coalesce(func.sum(DailyTotal.session_count), 0)
+    ).where(DailyTotal.date >= ROLLUP_START, DailyTotal.date < ROLLUP_END)
+
+@lru_cache(maxsize=None)
+def last_login_statement():
+    """SELECT of the latest login_time"""
+    return select(WorkSession.login_time).order_by(WorkSession.login_time.desc()).limit(1)
+
+class PeriodReport:
+    """Sessions of one period with their total and formatted durations"""
+    def __init__(self, start, end, sessions, durations, total, total_hours):
+        self.start = start
+        self.end = end
+        self.sessions = sessions
+        self.durations = durations  # formatted duration per session
+        self.total = total
+        self.total_hours = total_hours
+
+class BaseDatabaseOperations:
+    """Period ranges, durations and formatting shared by DatabaseOperations and AsyncDatabaseOperations"""
+    
+    def get_day_range(self, date=None):
+        """Get the half-open [start, end) datetime range of a day"""
         if date is None:
             date = datetime.now().date()
-            
-        session = get_db_session()
-        try:
-            sessions = session.query(WorkSession).filter(
-                func.date(WorkSession.login_time) == date
-            ).order_by(WorkSession.login_time).all()
-            return sessions
-        finally:
-            session.close()
-            
-    def get_weekly_sessions(self, week_start=None):
-        """Get work sessions for a specific week"""
+        start = datetime.combine(date, time.min)
+        return start, start + timedelta(days=1)
+        
+    def get_week_range(self, week_start=None):
+        """Get the half-open [start, end) datetime range of a week"""
         if week_start is None:
             today = datetime.now().date()
             week_start_day = self.get_week_start_day()
             days_since_start = (today.weekday() - week_start_day) % 7
             week_start = today - timedelta(days=days_since_start)
-            
-        week_end = week_start + timedelta(days=6)
+        start = datetime.combine(week_start, time.min)
+        return start, start + timedelta(days=7)
         
-        session = get_db_session()
-        try:
-            sessions = session.query(WorkSession).filter(
-                and_(
-                    func.date(WorkSession.login_time) >= week_start,
-                    func.date(WorkSession.login_time) <= week_end
-                )
-            ).order_by(WorkSession.login_time).all()
-            return sessions
-        finally:
-            session.close()
-            
-    def get_monthly_sessions(self, year=None, month=None):
-        """Get work sessions for a specific month"""
+    def get_month_range(self, year=None, month=None):
+        """Get the half-open [start, end) datetime range of a month"""
         if year is None or month is None:
             today = datetime.now()
             year = today.year
             month = today.month
-            
-        session = get_db_session()
-        try:
-            sessions = session.query(WorkSession).filter(
-                and_(
-                    func.extract('year', WorkSession.login_time) == year,
-                    func.extract('month', WorkSession.login_time) == month
-                )
-            ).order_by(WorkSession.login_time).all()
-            return sessions
-        finally:
-            session.close()
-            
-    def get_yearly_sessions(self, year=None):
-        """Get work sessions for a specific year"""
+        start = datetime(year, month, 1)
+        if month == 12:
+            return start, datetime(year + 1, 1, 1)
+        return start, datetime(year, month + 1, 1)
+        
+    def get_year_range(self, year=None):
+        """Get the half-open [start, end) datetime range of a year"""
         if year is None:
             year = datetime.now().year
-            
-        session = get_db_session()
-        try:
-            sessions = session.query(WorkSession).filter(
-                func.extract('year', WorkSession.login_time) == year
-            ).order_by(WorkSession.login_time).all()
-            return sessions
-        finally:
-            session.close()
-            
-    def calculate_session_duration(self, session):
-        """Calculate duration of a work session"""
+        return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+        
+    def calculate_session_duration(self, session, start=None, end=None):
+        """Calculate duration of a work session (WorkSession or SessionRecord), clipped to [start, end) if given"""
         if not session.logout_time:
             return timedelta(0)
-        return session.logout_time - session.login_time
+        if start is None and end is None:
+            return session.logout_time - session.login_time
+        return clip_duration(session.login_time, session.logout_time, start, end)
         
-    def calculate_total_duration(self, sessions):
-        """Calculate total duration from a list of sessions"""
+    def calculate_total_duration(self, sessions, start=None, end=None):
+        """Calculate total duration from a list of sessions, clipped to [start, end) if given"""
         total = timedelta(0)
         for session in sessions:
-            duration = self.calculate_session_duration(session)
+            duration = self.calculate_session_duration(session, start, end)
             total += duration
         return total
         
@@ -107,59 +270,179 @@ class DatabaseOperations:
             return f"{hours}hr {minutes}min"
         else:
             return f"{minutes}min"
-            
-    def get_daily_total_hours(self, date=None):
-        """Get formatted total hours for a day"""
-        sessions = self.get_daily_sessions(date)
-        total_duration = self.calculate_total_duration(sessions)
-        return self.format_duration(total_duration)
         
-    def get_weekly_total_hours(self, week_start=None):
-        """Get formatted total hours for a week"""
-        sessions = self.get_weekly_sessions(week_start)
-        total_duration = self.calculate_total_duration(sessions)
-        return self.format_duration(total_duration)
+    def build_period_report(self, start, end, sessions):
+        """Build a PeriodReport for [start, end) from its sessions"""
+        total = timedelta(0)
+        durations = []
+        for session in sessions:
+            duration = self.calculate_session_duration(session, start, end)
+            total += duration
+            durations.append(self.format_duration(duration))
+        return PeriodReport(start, end, sessions, durations, total, self.format_duration(total))
         
-    def get_monthly_total_hours(self, year=None, month=None):
-        """Get formatted total hours for a month"""
-        sessions = self.get_monthly_sessions(year, month)
-        total_duration = self.calculate_total_duration(sessions)
-        return self.format_duration(total_duration)
+    def uses_rollup(self, start, end, user_id=None):
+        """Whether format_period_total() can read [start, end) from daily_totals"""
+        # Whole days: at most one rollup row per day (the rollup covers all users)
+        return user_id is None and start.time() == time.min and end.time() == time.min
         
-    def get_yearly_total_hours(self, year=None):
-        """Get formatted total hours for a year"""
-        sessions = self.get_yearly_sessions(year)
-        total_duration = self.calculate_total_duration(sessions)
-        return self.format_duration(total_duration)
+    def get_week_start_day(self):
+        """Get week start day setting (0=Monday, 6=Sunday)"""
+        return settings_store.get('week_start_day')
         
-    def get_last_login_time(self):
-        """Get the last login time"""
+    def set_week_start_day(self, day):
+        """Set week start day setting"""
+        settings_store.set('week_start_day', day)
+
+class DatabaseOperations(BaseDatabaseOperations):
+    def __init__(self, cache=period_cache):
+        self.cache = cache  # PeriodCache for the period queries, or None to always query
+        
+    @traced
+    @cached_period
+    def get_sessions_in_range(self, start, end, user_id=None):
+        """Get work sessions overlapping [start, end), with durations clipped to it"""
         session = get_db_session()
         try:
-            last_session = session.query(WorkSession).order_by(WorkSession.login_time.desc()).first()
-            return last_session.login_time if last_session else None
+            rows = session.execute(
+                sessions_statement(start != datetime.min, user_id is not None),
+                period_params(start, end, user_id)
+            )
+            return to_session_records(rows, start, end)
         finally:
             session.close()
-            
-    def get_week_start_day(self):
-        """Get week start day setting (0=Monday, 6=Sunday)"""
+        
+    @traced
+    @cached_period
+    def get_sessions_page(self, start, end, after=None, limit=200, user_id=None):
+        """Get up to limit sessions in [start, end) that follow the (login_time, id) key after"""
         session = get_db_session()
         try:
-            setting = session.query(Settings).filter_by(key='week_start_day').first()
-            return int(setting.value) if setting else 0
+            rows = fetch_page(session, SESSION_COLUMNS, start, end, after, limit, user_id)
+            return to_session_records(rows, start, end)
         finally:
             session.close()
-            
-    def set_week_start_day(self, day):
-        """Set week start day setting"""
+        
+    @traced
+    def get_export_page(self, start, end, after=None, limit=5000, user_id=None):
+        """Like get_sessions_page, but rows also carry user_id and host for exports"""
         session = get_db_session()
         try:
-            setting = session.query(Settings).filter_by(key='week_start_day').first()
-            if setting:
-                setting.value = str(day)
-            else:
-                setting = Settings(key='week_start_day', value=str(day))
-                session.add(setting)
-            session.commit()
+            return fetch_page(session, EXPORT_COLUMNS, start, end, after, limit, user_id)
         finally:
-            session.close()
\ No newline at end of file
+            session.close()
+        
+    @traced
+    @cached_period
+    def get_period_report(self, start, end, user_id=None):
+        """Build a PeriodReport for [start, end) from a single query"""
+        return self.build_period_report(start, end, self.get_sessions_in_range(start, end, user_id))
+        
+    @traced
+    def get_daily_report(self, date=None, user_id=None):
+        """Get the report for a specific day"""
+        return self.get_period_report(*self.get_day_range(date), user_id=user_id)
+        
+    @traced
+    def get_weekly_report(self, week_start=None, user_id=None):
+        """Get the report for a specific week"""
+        return self.get_period_report(*self.get_week_range(week_start), user_id=user_id)
+        
+    @traced
+    def get_monthly_report(self, year=None, month=None, user_id=None):
+        """Get the report for a specific month"""
+        return self.get_period_report(*self.get_month_range(year, month), user_id=user_id)
+        
+    @traced
+    def get_yearly_report(self, year=None, user_id=None):
+        """Get the report for a specific year"""
+        return self.get_period_report(*self.get_year_range(year), user_id=user_id)
+        
+    @traced
+    def get_daily_sessions(self, date=None, user_id=None):
+        """Get work sessions for a specific day"""
+        return self.get_sessions_in_range(*self.get_day_range(date), user_id=user_id)
+        
+    @traced
+    def get_weekly_sessions(self, week_start=None, user_id=None):
+        """Get work sessions for a specific week"""
+        return self.get_sessions_in_range(*self.get_week_range(week_start), user_id=user_id)
+        
+    @traced
+    def get_monthly_sessions(self, year=None, month=None, user_id=None):
+        """Get work sessions for a specific month"""
+        return self.get_sessions_in_range(*self.get_month_range(year, month), user_id=user_id)
+        
+    @traced
+    def get_yearly_sessions(self, year=None, user_id=None):
+        """Get work sessions for a specific year"""
+        return self.get_sessions_in_range(*self.get_year_range(year), user_id=user_id)
+        
+    @traced
+    @cached_period
+    def get_period_total(self, start, end, user_id=None):
+        """Get (total_seconds, session_count) for sessions overlapping [start, end) in one query"""
+        session = get_db_session()
+        try:
+            total_us, count = session.execute(
+                total_statement(start != datetime.min, user_id is not None),
+                period_params(start, end, user_id)
+            ).one()
+            return total_us / 1000000, count
+        finally:
+            session.close()
+        
+    @traced
+    @cached_period
+    def get_rollup_total(self, start_date, end_date):
+        """Get (worked_seconds, closed_session_count) for [start_date, end_date) from daily_totals"""
+        session = get_db_session()
+        try:
+            worked_seconds, session_count = session.execute(
+                rollup_statement(), {'rollup_start': start_date, 'rollup_end': end_date}
+            ).one()
+            return worked_seconds, session_count
+        finally:
+            session.close()
+        
+    @traced
+    def format_period_total(self, start, end, user_id=None):
+        """Get formatted total hours for sessions in [start, end)"""
+        if self.uses_rollup(start, end, user_id):
+            total_seconds, _ = self.get_rollup_total(start.date(), end.date())
+        else:
+            total_seconds, _ = self.get_period_total(start, end, user_id)
+        return self.format_duration(timedelta(seconds=total_seconds))
+        
+    @traced
+    def get_daily_total_hours(self, date=None, user_id=None):
+        """Get formatted total hours for a day"""
+        return self.format_period_total(*self.get_day_range(date), user_id=user_id)
+        
+    @traced
+    def get_weekly_total_hours(self, week_start=None, user_id=None):
+        """Get formatted total hours for a week"""
+        return self.format_period_total(*self.get_week_range(week_start), user_id=user_id)
+        
+    @traced
+    def get_monthly_total_hours(self, year=None, month=None, user_id=None):
+        """Get formatted total hours for a month"""
+        return self.format_period_total(*self.get_month_range(year, month), user_id=user_id)
+        
+    @traced
+    def get_yearly_total_hours(self, year=None, user_id=None):
+        """Get formatted total hours for a year"""
+        return self.format_period_total(*self.get_year_range(year), user_id=user_id)
+        
+    @traced
+    def get_last_login_time(self):
+        """Get the last login time"""
+        session = get_db_session()
+        try:
+            return session.execute(last_login_statement()).scalar()
+        finally:
+            session.close()
+        
+    def get_cache_stats(self):
+        """Get the period cache's hit/miss/eviction counters"""
+        return self.cache.stats() if self.cache is not None else {}
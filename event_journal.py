@@ -0,0 +1,188 @@
+"""
+Append-only event journal for Work Hours Tracker
+Login/logout events are fsync'd to a local file in one small write and
+applied to SQLite later, in batches, by a background flusher
+"""
+
+import json
+import os
+import threading
+import uuid
+from collections import deque
+from itertools import islice
+
+JOURNAL_PATH = os.environ.get('WORK_HOURS_JOURNAL', 'work_hours.journal')
+
+class EventJournal:
+    # Rewrite the file once this many applied entries have piled up in it
+    COMPACT_AFTER = 1000
+
+    def __init__(self, path=JOURNAL_PATH, fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._pending = deque()   # entries not yet applied, in seq order
+        self._base_seq = 0        # everything up to here is applied
+        self._file_entries = 0    # entries currently in the file
+        self.journal_id = None    # random id in the checkpoint lines; sequence numbers belong to it
+        self._load()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if self.journal_id is None:
+            # A new file, or one from before journal ids: name it, so the database checkpoint
+            # of another journal file is not mistaken for this one's
+            self.journal_id = uuid.uuid4().hex
+            self._write_line(self._checkpoint_entry())
+            self._file_entries += 1
+
+    def _load(self):
+        """Read the existing journal, cutting off a torn last line"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as journal:
+            data = journal.read()
+        # A crash mid-append leaves a last line without its newline; the next append
+        # would be glued onto it and lost on the following load, so truncate it now
+        complete = data.rfind(b'\n') + 1
+        if complete < len(data):
+            print(f"Dropping torn journal line: {data[complete:]!r}")
+            with open(self.path, 'r+b') as journal:
+                journal.truncate(complete)
+                if self.fsync:
+                    os.fsync(journal.fileno())
+        for line in data[:complete].decode('utf-8', errors='replace').splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                print(f"Ignoring unreadable journal line: {line!r}")
+                continue
+            self._file_entries += 1
+            if entry['kind'] == 'checkpoint':
+                self._base_seq = max(self._base_seq, entry['seq'])
+                self.journal_id = entry.get('journal', self.journal_id)
+            else:
+                self._pending.append(entry)
+        while self._pending and self._pending[0]['seq'] <= self._base_seq:
+            self._pending.popleft()
+
+    @property
+    def last_seq(self):
+        """Sequence number of the newest entry"""
+        with self._lock:
+            return self._pending[-1]['seq'] if self._pending else self._base_seq
+
+    def append(self, kind, timestamp, **fields):
+        """Durably record an event and return its sequence number"""
+        with self._lock:
+            seq = (self._pending[-1]['seq'] if self._pending else self._base_seq) + 1
+            entry = dict(fields, seq=seq, kind=kind, time=timestamp.isoformat(sep=' '))
+            self._write_line(entry)
+            self._pending.append(entry)
+            self._file_entries += 1
+            return seq
+
+    def _write_line(self, entry):
+        """Durably append one entry to the file"""
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def _checkpoint_entry(self):
+        """Checkpoint line: everything up to _base_seq of this journal is applied"""
+        return {'seq': self._base_seq, 'kind': 'checkpoint', 'journal': self.journal_id}
+
+    def pending(self, limit=None):
+        """Get unapplied entries, oldest first"""
+        with self._lock:
+            return list(islice(self._pending, limit))
+
+    def mark_applied(self, seq):
+        """Drop entries up to seq; compact the file when nothing is pending or it is mostly applied"""
+        with self._lock:
+            while self._pending and self._pending[0]['seq'] <= seq:
+                self._pending.popleft()
+            self._base_seq = max(self._base_seq, seq)
+            # Compaction copies the pending entries, so wait until at least as many applied
+            # ones can be dropped; otherwise a large backlog is rewritten after every batch
+            applied_in_file = self._file_entries - len(self._pending)
+            if not self._pending or applied_in_file >= max(self.COMPACT_AFTER, len(self._pending)):
+                self._compact()
+
+    def _compact(self):
+        """Rewrite the file as a checkpoint plus the pending entries (lock held)"""
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as journal:
+            journal.write(json.dumps(self._checkpoint_entry()) + '\n')
+            for entry in self._pending:
+                journal.write(json.dumps(entry) + '\n')
+            journal.flush()
+            if self.fsync:
+                os.fsync(journal.fileno())
+        self._file.close()
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._file_entries = len(self._pending) + 1
+
+    def close(self):
+        """Close the journal file"""
+        with self._lock:
+            self._file.close()
+
+class JournalFlusher:
+    """Applies journal entries to the database in batched transactions"""
+
+    def __init__(self, journal, apply_batch, interval=1.0, batch_size=500):
+        self.journal = journal
+        self.apply_batch = apply_batch  # apply_batch(entries) commits them and returns the last applied seq
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batches = 0
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def flush(self):
+        """Apply everything pending now; returns the number of entries applied"""
+        applied = 0
+        with self._flush_lock:
+            while True:
+                entries = self.journal.pending(self.batch_size)
+                if not entries:
+                    break
+                last_seq = self.apply_batch(entries)
+                self.journal.mark_applied(last_seq)
+                self.batches += 1
+                applied += len(entries)
+        return applied
+
+    def wake(self):
+        """Ask the background thread to flush soon"""
+        self._wake.set()
+
+    def _run(self):
+        """Flush when woken or every interval until stopped"""
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing event journal: {e}")
+
+    def start(self):
+        """Start the background flusher"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="journal-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background flusher after a final flush"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error flushing event journal: {e}")
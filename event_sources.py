@@ -0,0 +1,196 @@
+"""
+System event sources consumed by SystemMonitor
+A source delivers SystemEvent(kind, timestamp) tuples to a callback from its
+own thread. The Windows backend imports pywin32 only when started; the replay
+source feeds recorded or generated streams on any platform.
+"""
+
+import json
+import random
+import threading
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+# Event kinds and the session change each one causes in SystemMonitor
+LOGIN = 'login'
+LOGOUT = 'logout'
+SLEEP = 'sleep'
+WAKE = 'wake'
+SHUTDOWN = 'shutdown'
+EVENT_KINDS = (LOGIN, LOGOUT, SLEEP, WAKE, SHUTDOWN)
+
+SystemEvent = namedtuple('SystemEvent', ['kind', 'timestamp'])
+
+class EventSource(ABC):
+    """Base class; start() delivers events to callback(event) until stop()"""
+
+    @abstractmethod
+    def start(self, callback):
+        """Start delivering events to callback"""
+
+    @abstractmethod
+    def stop(self):
+        """Stop delivering events"""
+
+class WindowsEventSource(EventSource):
+    """Session lock/unlock, sleep/resume and shutdown notifications from a hidden window"""
+
+    def __init__(self):
+        self._callback = None
+        self._thread = None
+        self._hwnd = None
+        self._ready = threading.Event()
+
+    def start(self, callback):
+        self._callback = callback
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run, name="windows-events", daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+
+    def stop(self):
+        if self._hwnd is not None:
+            import win32con
+            import win32gui
+            win32gui.PostMessage(self._hwnd, win32con.WM_CLOSE, 0, 0)
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    def _emit(self, kind):
+        self._callback(SystemEvent(kind, datetime.now()))
+
+    def _run(self):
+        """Create the message window and pump messages on this thread"""
+        # pywin32 is only needed on Windows, so it is imported here rather than at module level
+        try:
+            import win32api
+            import win32con
+            import win32gui
+            import win32ts
+        except ImportError as e:
+            print(f"Error starting Windows event source: {e}")
+            self._ready.set()
+            return
+
+        def wnd_proc(hwnd, msg, wparam, lparam):
+            if msg == win32con.WM_WTSSESSION_CHANGE:
+                if wparam in (win32ts.WTS_SESSION_LOCK, win32ts.WTS_SESSION_LOGOFF):
+                    self._emit(LOGOUT)
+                elif wparam in (win32ts.WTS_SESSION_UNLOCK, win32ts.WTS_SESSION_LOGON):
+                    self._emit(LOGIN)
+            elif msg == win32con.WM_POWERBROADCAST:
+                if wparam == win32con.PBT_APMSUSPEND:
+                    self._emit(SLEEP)
+                elif wparam in (win32con.PBT_APMRESUMESUSPEND, win32con.PBT_APMRESUMEAUTOMATIC):
+                    self._emit(WAKE)
+                return True
+            elif msg == win32con.WM_ENDSESSION and wparam:
+                self._emit(SHUTDOWN)
+                return 0
+            elif msg == win32con.WM_CLOSE:
+                win32ts.WTSUnRegisterSessionNotification(hwnd)
+                win32gui.DestroyWindow(hwnd)
+                return 0
+            elif msg == win32con.WM_DESTROY:
+                win32gui.PostQuitMessage(0)
+                return 0
+            return win32gui.DefWindowProc(hwnd, msg, wparam, lparam)
+
+        window_class = win32gui.WNDCLASS()
+        window_class.hInstance = win32api.GetModuleHandle(None)
+        window_class.lpszClassName = "WorkHoursTrackerEvents"
+        window_class.lpfnWndProc = wnd_proc
+        try:
+            win32gui.RegisterClass(window_class)
+        except win32gui.error:
+            pass  # already registered by an earlier start()
+        self._hwnd = win32gui.CreateWindow(window_class.lpszClassName, "Work Hours Tracker Events",
+                                           0, 0, 0, 0, 0, 0, 0, window_class.hInstance, None)
+        win32ts.WTSRegisterSessionNotification(self._hwnd, win32ts.NOTIFY_FOR_THIS_SESSION)
+        self._ready.set()
+        win32gui.PumpMessages()
+        self._hwnd = None
+
+class ReplayEventSource(EventSource):
+    """Feeds a recorded or generated event stream, optionally at accelerated speed.
+
+    With speed=None events are delivered back to back; otherwise the gaps
+    between their timestamps are divided by speed.
+    """
+
+    def __init__(self, events, speed=None):
+        self.events = events
+        self.speed = speed
+        self.delivered = 0
+        self.done = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, callback):
+        self._stop.clear()
+        self.done.clear()
+        self._thread = threading.Thread(target=self._run, args=(callback,), name="replay-events", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+
+    def wait(self, timeout=None):
+        """Block until every event has been delivered"""
+        return self.done.wait(timeout)
+
+    def _run(self, callback):
+        previous = None
+        try:
+            for event in self.events:
+                if self._stop.is_set():
+                    break
+                if self.speed and previous is not None:
+                    gap = (event.timestamp - previous).total_seconds() / self.speed
+                    if gap > 0 and self._stop.wait(gap):
+                        break
+                previous = event.timestamp
+                callback(event)
+                self.delivered += 1
+        finally:
+            self.done.set()
+
+def generate_events(count, start=None, seed=0):
+    """Yield count plausible events: workdays of logins broken by sleeps, ending in logout or shutdown"""
+    rng = random.Random(seed)
+    now = start or datetime(2020, 1, 1, 8, 0)
+    emitted = 0
+    state = LOGOUT
+    while emitted < count:
+        if state in (LOGOUT, SHUTDOWN):
+            now += timedelta(hours=rng.uniform(10, 16))
+            state = LOGIN
+        elif state == SLEEP:
+            now += timedelta(minutes=rng.uniform(5, 90))
+            state = WAKE
+        else:
+            now += timedelta(minutes=rng.uniform(20, 240))
+            state = rng.choices((SLEEP, LOGOUT, SHUTDOWN), weights=(6, 3, 1))[0]
+        yield SystemEvent(state, now)
+        emitted += 1
+
+def read_events(lines):
+    """Yield SystemEvents from JSON lines of {"kind": ..., "timestamp": ...}"""
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if record['kind'] not in EVENT_KINDS:
+            raise ValueError(f"Unknown event kind: {record['kind']}")
+        yield SystemEvent(record['kind'], datetime.fromisoformat(record['timestamp']))
+
+def write_events(events, output):
+    """Write events as JSON lines; returns the number written"""
+    count = 0
+    for event in events:
+        output.write(json.dumps({'kind': event.kind, 'timestamp': event.timestamp.isoformat(sep=' ')}) + '\n')
+        count += 1
+    return count
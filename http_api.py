@@ -0,0 +1,338 @@
+"""
+Local read-only HTTP API for Work Hours Tracker
+Serves period totals and session lists as JSON on localhost, for team
+dashboards that poll today's, this week's and this month's hours. Every
+response carries an ETag made of the write generation (see
+models.bump_write_generation) and the resolved period, so a poll with a
+current If-None-Match is answered 304 without touching SQLite. Requests
+run on ThreadingHTTPServer threads, each with its own session from the
+shared engine's pool.
+
+GET endpoints (date=YYYY-MM-DD defaults to today, user= filters by user_id):
+  /api/summary                          today's, this week's and this month's totals
+  /api/totals/<day|week|month|year>     total of the period containing date
+  /api/totals?from=...&to=...           total of any [from, to) range (ISO date or datetime)
+  /api/sessions/<day|week|month|year>   sessions of a period, limit= at a time, after=<next> for the next page
+
+Usage: python http_api.py [--port 8765]
+Set WORK_HOURS_HTTP_PORT to serve from the tray app instead.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import secrets
+import threading
+from collections import namedtuple
+from datetime import date as date_type, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+import models
+from database_operations import DatabaseOperations
+from settings_store import settings_store
+
+HTTP_HOST = '127.0.0.1'
+HTTP_PORT = int(os.environ.get('WORK_HOURS_HTTP_PORT') or 8765)
+PERIODS = ('day', 'week', 'month', 'year')
+PAGE_LIMIT = 200
+MAX_PAGE_LIMIT = 5000
+
+# A request resolved to its periods: key identifies the response body, end is the
+# latest period end (it decides which write generation the ETag uses), load builds the body
+ResolvedRequest = namedtuple('ResolvedRequest', ['key', 'end', 'load'])
+
+class ApiError(Exception):
+    """A request the API rejects, with the HTTP status to answer"""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class DatabaseWatcher:
+    """Bumps the write generation when another process commits to the database file"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._engine = None
+
+    def _file_stamp(self, path):
+        """(mtime, size) of the database and its WAL; commits in WAL mode always change the WAL"""
+        stamp = []
+        for file_path in (path, path + '-wal'):
+            try:
+                stat = os.stat(file_path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def check(self):
+        """Compare the files with the last check, without opening a connection"""
+        engine = models.get_engine()
+        path = engine.url.database
+        if engine.dialect.name != 'sqlite' or not path or path == ':memory:':
+            return
+        stamp = self._file_stamp(path)
+        with self._lock:
+            if engine is not self._engine:
+                self._engine, self._stamp = engine, stamp
+                return
+            if stamp == self._stamp:
+                return
+            self._stamp = stamp
+        # The change could be anywhere, and the week start setting may have moved too
+        models.bump_write_generation()
+        settings_store.invalidate()
+
+class TotalsApi:
+    """Resolves API paths to periods, ETags and JSON bodies"""
+
+    def __init__(self, db_ops=None, watch=False):
+        self.db_ops = db_ops or DatabaseOperations()
+        # Inside the tray app every write bumps the generation itself; a standalone
+        # server only sees other processes' commits through the files
+        self.watcher = DatabaseWatcher() if watch else None
+        # Tells this server's ETags apart from those of an earlier run, whose generations restarted at 0
+        self.instance = secrets.token_hex(4)
+
+    def resolve(self, path, params):
+        """ResolvedRequest for a path and its parse_qs() parameters"""
+        user_id = self._param(params, 'user')
+        parts = [part for part in path.split('/') if part]
+        if parts[:1] != ['api'] or len(parts) < 2:
+            raise ApiError(404, f"unknown path {path}")
+        endpoint, rest = parts[1], parts[2:]
+
+        if endpoint == 'summary' and not rest:
+            today = self._date(params)
+            periods = {name: self.period_range(name, today) for name in ('day', 'week', 'month')}
+            key = ('summary', user_id, tuple(periods.values()))
+            end = max(end for _, end in periods.values())
+            return ResolvedRequest(key, end, lambda: {
+                'today': self.totals_body('day', *periods['day'], user_id),
+                'week': self.totals_body('week', *periods['week'], user_id),
+                'month': self.totals_body('month', *periods['month'], user_id),
+            })
+
+        if endpoint == 'totals' and not rest:
+            start = self._datetime(params, 'from')
+            end = self._datetime(params, 'to')
+            if start is None or end is None or end <= start:
+                raise ApiError(400, "from and to are required, with from before to")
+            return ResolvedRequest(('totals', user_id, start, end), end,
+                                   lambda: self.totals_body('range', start, end, user_id))
+
+        if endpoint == 'totals' and len(rest) == 1 and rest[0] in PERIODS:
+            start, end = self.period_range(rest[0], self._date(params))
+            return ResolvedRequest(('totals', user_id, start, end), end,
+                                   lambda: self.totals_body(rest[0], start, end, user_id))
+
+        if endpoint == 'sessions' and len(rest) == 1 and rest[0] in PERIODS:
+            start, end = self.period_range(rest[0], self._date(params))
+            after = self._after(params)
+            limit = self._limit(params)
+            return ResolvedRequest(('sessions', user_id, start, end, after, limit), end,
+                                   lambda: self.sessions_body(rest[0], start, end, after, limit, user_id))
+
+        raise ApiError(404, f"unknown path {path}")
+
+    def etag(self, resolved):
+        """Strong ETag of a resolved request at the current write generation"""
+        if self.watcher is not None:
+            self.watcher.check()
+        write_generation, history_generation = models.get_write_generations()
+        # Like PeriodCache: periods that ended before today only change with writes reaching back before today
+        if resolved.end <= datetime.combine(datetime.now().date(), datetime.min.time()):
+            generation = f"h{history_generation}"
+        else:
+            generation = f"w{write_generation}"
+        digest = hashlib.blake2b(repr(resolved.key).encode('utf-8'), digest_size=8).hexdigest()
+        return f'"{self.instance}-{generation}-{digest}"'
+
+    def period_range(self, period, day):
+        """[start, end) of the day, week, month or year containing day"""
+        if period == 'day':
+            return self.db_ops.get_day_range(day)
+        if period == 'week':
+            week_start = day - timedelta(days=(day.weekday() - self.db_ops.get_week_start_day()) % 7)
+            return self.db_ops.get_week_range(week_start)
+        if period == 'month':
+            return self.db_ops.get_month_range(day.year, day.month)
+        return self.db_ops.get_year_range(day.year)
+
+    def totals_body(self, period, start, end, user_id=None):
+        """JSON-ready total of [start, end)"""
+        seconds, count = self.db_ops.get_period_total(start, end, user_id)
+        return {
+            'period': period,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'user': user_id,
+            'seconds': seconds,
+            'hours': round(seconds / 3600, 2),
+            'total_hours': self.db_ops.format_duration(timedelta(seconds=seconds)),
+            'sessions': count,
+        }
+
+    def sessions_body(self, period, start, end, after, limit, user_id=None):
+        """JSON-ready page of the sessions overlapping [start, end)"""
+        records = self.db_ops.get_sessions_page(start, end, after, limit, user_id=user_id)
+        next_page = None
+        if len(records) == limit:
+            next_page = f"{records[-1].login_time.isoformat()},{records[-1].id}"
+        return {
+            'period': period,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'user': user_id,
+            'sessions': [{
+                'id': record.id,
+                'login_time': record.login_time.isoformat(),
+                'logout_time': record.logout_time.isoformat() if record.logout_time else None,
+                'logout_type': record.logout_type,
+                'duration_seconds': record.duration_seconds,
+            } for record in records],
+            'next': next_page,
+        }
+
+    def _param(self, params, name):
+        """Last value of a query parameter, or None"""
+        values = params.get(name)
+        return values[-1] if values else None
+
+    def _date(self, params):
+        """The date parameter, defaulting to today"""
+        value = self._param(params, 'date')
+        if value is None:
+            return datetime.now().date()
+        try:
+            return date_type.fromisoformat(value)
+        except ValueError:
+            raise ApiError(400, f"invalid date {value!r}")
+
+    def _datetime(self, params, name):
+        """An ISO date or datetime parameter, or None"""
+        value = self._param(params, name)
+        if value is None:
+            return None
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise ApiError(400, f"invalid {name} {value!r}")
+
+    def _after(self, params):
+        """The (login_time, id) key of the after parameter, or None"""
+        value = self._param(params, 'after')
+        if value is None:
+            return None
+        try:
+            login_time, session_id = value.rsplit(',', 1)
+            return datetime.fromisoformat(login_time), int(session_id)
+        except ValueError:
+            raise ApiError(400, f"invalid after {value!r}")
+
+    def _limit(self, params):
+        """The page size parameter, between 1 and MAX_PAGE_LIMIT"""
+        value = self._param(params, 'limit')
+        if value is None:
+            return PAGE_LIMIT
+        try:
+            limit = int(value)
+        except ValueError:
+            raise ApiError(400, f"invalid limit {value!r}")
+        if not 1 <= limit <= MAX_PAGE_LIMIT:
+            raise ApiError(400, f"limit must be between 1 and {MAX_PAGE_LIMIT}")
+        return limit
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so pollers reuse their connection
+    protocol_version = 'HTTP/1.1'
+    server_version = 'WorkHoursTracker'
+    # Headers and body are separate writes; with Nagle on, a keep-alive client waits
+    # for a delayed ACK (about 40 ms) before the body arrives
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        try:
+            resolved = self.server.api.resolve(url.path, parse_qs(url.query))
+            # Taken before loading: a write that commits meanwhile only costs the next poll a 200
+            etag = self.server.api.etag(resolved)
+            if self._etag_matches(etag):
+                self._send(304, None, etag)
+                return
+            self._send(200, resolved.load(), etag)
+        except ApiError as e:
+            self._send(e.status, {'error': str(e)})
+        except Exception as e:
+            print(f"Error serving {self.path}: {e}")
+            self._send(500, {'error': "internal error"})
+
+    def do_HEAD(self):
+        # The GET response's headers; _send() leaves out the body
+        self.do_GET()
+
+    def do_POST(self):
+        self._send(405, {'error': "the API is read-only; only GET and HEAD are supported"})
+
+    do_PUT = do_DELETE = do_PATCH = do_POST
+
+    def _etag_matches(self, etag):
+        """Whether If-None-Match names etag"""
+        header = self.headers.get('If-None-Match')
+        if not header:
+            return False
+        tags = [tag.strip() for tag in header.split(',')]
+        return '*' in tags or etag in tags or f"W/{etag}" in tags
+
+    def _send(self, status, body, etag=None):
+        """Send a JSON response; no body for 304 or HEAD, though HEAD gets GET's Content-Length"""
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+            # Cached copies must be revalidated, which the ETag makes cheap
+            self.send_header('Cache-Control', 'no-cache')
+        if status == 405:
+            self.send_header('Allow', 'GET, HEAD')
+        if status != 304:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if data and self.command != 'HEAD':
+            self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        """Dashboards poll constantly, so requests are not logged"""
+
+class ApiServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer on localhost answering with a TotalsApi"""
+    daemon_threads = True
+
+    def __init__(self, port=HTTP_PORT, api=None):
+        super().__init__((HTTP_HOST, port), ApiRequestHandler)
+        self.api = api or TotalsApi()
+
+def start_server(port=HTTP_PORT, api=None):
+    """Serve on a daemon thread; stop with server.shutdown() and server.server_close()"""
+    server = ApiServer(port, api)
+    threading.Thread(target=server.serve_forever, name="http-api", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve work hour totals as JSON on localhost")
+    parser.add_argument("--port", type=int, default=HTTP_PORT, help="port on 127.0.0.1 (default $WORK_HOURS_HTTP_PORT or 8765)")
+    args = parser.parse_args()
+
+    server = ApiServer(args.port, TotalsApi(watch=True))
+    print(f"Serving http://{HTTP_HOST}:{server.server_port}/api/summary")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,48 @@
+"""
+Bulk session ingestion for Work Hours Tracker
+Loads sessions collected from many workstations into one database
+"""
+
+from datetime import timedelta
+from sqlalchemy import insert
+from models import WorkSession, get_db_session, bump_write_generation
+import daily_totals
+
+SESSION_FIELDS = ('login_time', 'logout_time', 'logout_type', 'user_id', 'host')
+
+def ingest_sessions(sessions, db_session=None, rebuild_totals=True):
+    """Insert sessions (dicts keyed by SESSION_FIELDS) in one executemany transaction.
+
+    Unless rebuild_totals is False, the daily_totals rows of the affected
+    dates are rebuilt in the same transaction. Returns the number of
+    sessions inserted. A caller passing db_session commits and calls
+    models.bump_write_generation() itself.
+    """
+    rows = [{field: session.get(field) for field in SESSION_FIELDS} for session in sessions]
+    if not rows:
+        return 0
+
+    owns_session = db_session is None
+    if owns_session:
+        db_session = get_db_session()
+    try:
+        db_session.execute(insert(WorkSession), rows)
+
+        closed = [row for row in rows if row['logout_time'] is not None]
+        if rebuild_totals and closed:
+            # Sessions that run past midnight also add to the days after their login
+            first = min(row['login_time'] for row in closed).date()
+            last = max(row['logout_time'] for row in closed).date()
+            daily_totals.rebuild(db_session, first, last + timedelta(days=1))
+
+        if owns_session:
+            db_session.commit()
+            bump_write_generation(min(row['login_time'] for row in rows))
+        return len(rows)
+    except Exception:
+        if owns_session:
+            db_session.rollback()
+        raise
+    finally:
+        if owns_session:
+            db_session.close()
@@ -4,14 +4,22 @@ Main entry point for the application
 """
 
 import sys
-from work_tracker import WorkTracker
+
+def start_monitor():
+    """Record the login; only the journal and database modules are loaded for this"""
+    from system_monitor import create_system_monitor
+    monitor = create_system_monitor()
+    monitor.start_monitoring()
+    return monitor
 
 def main():
     """Main application entry point"""
-    tracker = WorkTracker()
+    # Log the login first so the session starts when the process did,
+    # not after pystray, PIL and the GUI modules have been imported
+    monitor = start_monitor()
     
-    # Start system monitoring (no separate thread)
-    tracker.start_monitoring()
+    from work_tracker import WorkTracker
+    tracker = WorkTracker(monitor)
     
     # Start the system tray
     tracker.start_tray()
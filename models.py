@@ -2,13 +2,40 @@
 Database models for Work Hours Tracker
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, create_engine
+import os
+import threading
+from collections import namedtuple
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, Index, MetaData, Table, DDL, create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
 from datetime import datetime
 
 Base = declarative_base()
 
+# Database location, overridable for headless tools and benchmarks
+DATABASE_URL = os.environ.get('WORK_HOURS_DB_URL', 'sqlite:///work_hours.db')
+
+# Connection pool settings passed to create_engine() for file databases; an in-memory
+# SQLite database gets a SingletonThreadPool, which takes neither overflow nor timeout
+POOL_OPTIONS = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+}
+
+# Pragmas applied once to every new SQLite connection
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,       # milliseconds
+    'cache_size': -20000,       # negative = KiB, so ~20MB
+    'mmap_size': 268435456,     # 256MB
+}
+
+# Pragmas that write to the database file; skipped on read-only connections
+SQLITE_WRITE_PRAGMAS = ('journal_mode',)
+
 class WorkSession(Base):
     __tablename__ = 'work_sessions'
     
@@ -16,6 +43,16 @@ class WorkSession(Base):
     login_time = Column(DateTime, nullable=False)
     logout_time = Column(DateTime, nullable=True)
     logout_type = Column(String(50), nullable=True)  # Sleep, Logout, Shutdown, etc.
+    user_id = Column(String(100), nullable=True)  # Login name of the tracked user
+    host = Column(String(255), nullable=True)  # Workstation the session was recorded on
+    last_seen_time = Column(DateTime, nullable=True)  # Last heartbeat of an open session
+    
+    __table_args__ = (
+        Index('ix_work_sessions_login_time', 'login_time'),
+        Index('ix_work_sessions_user_login', 'user_id', 'login_time'),
+        # Partial index so the open-session lookup never scans closed rows
+        Index('ix_work_sessions_open', 'login_time', sqlite_where=text('logout_time IS NULL')),
+    )
     
     def __repr__(self):
         return f"<WorkSession(login={self.login_time}, logout={self.logout_time}, type={self.logout_type})>"
@@ -30,8 +67,142 @@ class Settings(Base):
     def __repr__(self):
         return f"<Settings(key={self.key}, value={self.value})>"
 
+class DailyTotal(Base):
+    __tablename__ = 'daily_totals'
+    
+    # Rollup of closed sessions per login date, maintained by SystemMonitor
+    date = Column(Date, primary_key=True)
+    worked_seconds = Column(Float, nullable=False, default=0.0)
+    session_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<DailyTotal(date={self.date}, seconds={self.worked_seconds}, sessions={self.session_count})>"
+
+# R*Tree over session intervals for overlap queries (see database_operations.period_filter).
+# Bounds are whole minutes since the epoch, rounded outwards, so a lookup returns a
+# superset that the caller filters exactly; an open session is its login minute.
+# It is kept in sync with work_sessions by triggers and is not part of Base.metadata.
+SESSION_INTERVALS = Table(
+    'work_sessions_rtree', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('login_minute', Integer),
+    Column('logout_minute', Integer),
+)
+
+_LOGIN_MINUTE = "CAST(strftime('%s', substr(NEW.login_time, 1, 19)) AS INTEGER) / 60"
+_LOGOUT_MINUTE = ("max({login}, COALESCE((CAST(strftime('%s', substr(NEW.logout_time, 1, 19)) AS INTEGER) + 60) / 60, 0))"
+                  .format(login=_LOGIN_MINUTE))
+
+SESSION_INTERVAL_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS work_sessions_rtree USING rtree_i32(id, login_minute, logout_minute)",
+    f"""CREATE TRIGGER IF NOT EXISTS work_sessions_rtree_insert AFTER INSERT ON work_sessions BEGIN
+        INSERT INTO work_sessions_rtree VALUES (NEW.id, {_LOGIN_MINUTE}, {_LOGOUT_MINUTE});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS work_sessions_rtree_update AFTER UPDATE OF login_time, logout_time ON work_sessions BEGIN
+        UPDATE work_sessions_rtree SET login_minute = {_LOGIN_MINUTE}, logout_minute = {_LOGOUT_MINUTE} WHERE id = NEW.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS work_sessions_rtree_delete AFTER DELETE ON work_sessions BEGIN
+        DELETE FROM work_sessions_rtree WHERE id = OLD.id;
+    END""",
+)
+
+for _statement in SESSION_INTERVAL_DDL:
+    # DDL() applies %-formatting, so strftime's '%s' is escaped
+    event.listen(WorkSession.__table__, 'after_create',
+                 DDL(_statement.replace('%', '%%')).execute_if(dialect='sqlite'))
+event.listen(WorkSession.__table__, 'after_drop',
+             DDL("DROP TABLE IF EXISTS work_sessions_rtree").execute_if(dialect='sqlite'))
+
+# Read-only session row returned by DatabaseOperations; WorkSession is only used for writes
+SessionRecord = namedtuple('SessionRecord', ['id', 'login_time', 'logout_time', 'logout_type', 'duration_seconds'])
+
+_engine = None
+_engine_lock = threading.RLock()
+Session = scoped_session(sessionmaker())
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS to a freshly opened connection"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+def _apply_read_only_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS except SQLITE_WRITE_PRAGMAS, which fail on a read-only non-WAL database"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            if name not in SQLITE_WRITE_PRAGMAS:
+                cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+def _is_file_database(url):
+    """Whether url names an on-disk database rather than an in-memory SQLite one"""
+    url = make_url(url)
+    if url.get_backend_name() != 'sqlite':
+        return True
+    return bool(url.database) and url.database != ':memory:' and url.query.get('mode') != 'memory'
+
+def configure_engine(url=None, read_only=False, **pool_options):
+    """Replace the process-wide engine, e.g. to point at another database;
+    pass read_only=True for a mode=ro SQLite URL, so its journal mode is left alone"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            Session.remove()
+            _engine.dispose()
+        url = url or DATABASE_URL
+        options = dict(POOL_OPTIONS) if _is_file_database(url) else {}
+        options.update(pool_options)
+        _engine = create_engine(url, **options)
+        if _engine.dialect.name == 'sqlite':
+            event.listen(_engine, 'connect', _apply_read_only_pragmas if read_only else _apply_sqlite_pragmas)
+        Session.configure(bind=_engine)
+        return _engine
+
+def get_engine():
+    """Get the process-wide engine, creating it on first use"""
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                return configure_engine()
+    return _engine
+
+def dispose_engine():
+    """Close pooled connections and drop the process-wide engine"""
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            Session.remove()
+            _engine.dispose()
+            _engine = None
+
+# Write generations: bumped after every committed change to work sessions, so caches
+# of query results can tell they are stale without subscribing to every writer. The
+# history generation only moves when a change reaches back before today, so results
+# for closed past periods survive the logins and logouts of the current day.
+_generation_lock = threading.Lock()
+_write_generation = 0
+_history_generation = 0
+
+def bump_write_generation(earliest=None):
+    """Record a committed change to work sessions; earliest is the oldest time it affects, or None if unknown"""
+    global _write_generation, _history_generation
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    with _generation_lock:
+        _write_generation += 1
+        if earliest is None or earliest < today:
+            _history_generation += 1
+
+def get_write_generations():
+    """Get (write_generation, history_generation)"""
+    with _generation_lock:
+        return _write_generation, _history_generation
+
 def get_db_session():
     """Get database session"""
-    engine = create_engine('sqlite:///work_hours.db')
-    Session = sessionmaker(bind=engine)
-    return Session()
\ No newline at end of file
+    get_engine()
+    return Session()
@@ -0,0 +1,134 @@
+"""
+Opt-in profiling for Work Hours Tracker
+Set WORK_HOURS_PROFILE to profile the statistics refresh, the tray tooltip
+and the monitor's login/logout writes, including the journal flusher's
+batches. Every call of a profiled function
+writes one file to WORK_HOURS_PROFILE_DIR, keeping the newest
+WORK_HOURS_PROFILE_KEEP files per function:
+- cprofile: a pstats .prof file (python -m pstats, snakeviz, flameprof)
+- sample: a .folded file of the calling thread's stacks sampled every
+  WORK_HOURS_PROFILE_INTERVAL_MS, one "root;...;leaf count" line per stack
+  (flamegraph.pl, speedscope)
+Unset, profiled() returns the function itself, so profiled code runs as if
+undecorated; the profilers are only imported when enabled.
+"""
+
+import functools
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+
+PROFILE_MODE = os.environ.get('WORK_HOURS_PROFILE', '').strip().lower()
+PROFILE_DIR = os.environ.get('WORK_HOURS_PROFILE_DIR', 'profiles')
+PROFILE_KEEP = int(os.environ.get('WORK_HOURS_PROFILE_KEEP', '20'))
+PROFILE_INTERVAL_MS = float(os.environ.get('WORK_HOURS_PROFILE_INTERVAL_MS', '5'))
+
+# WORK_HOURS_PROFILE value -> file extension; '1' means cprofile
+PROFILE_MODES = {'1': '.prof', 'cprofile': '.prof', 'sample': '.folded'}
+
+# Calls of profiled functions running on each thread; nested calls are part of the outer profile
+_active = threading.local()
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer thread"""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()   # "root;...;leaf" -> samples
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        """Start sampling"""
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the timer thread"""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        """Timer thread: count the sampled thread's current stack every interval"""
+        # A busy thread only releases the GIL every sys.getswitchinterval() (5 ms by
+        # default), so shorter intervals do not give more samples
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+    def dump(self, path):
+        """Write the stacks in collapsed (folded) form"""
+        with open(path, 'w', encoding='utf-8') as output:
+            for stack, count in self.stacks.most_common():
+                output.write(f"{stack} {count}\n")
+
+def profile_path(name, extension, directory=None):
+    """Path of a new profile file for name"""
+    safe_name = re.sub(r'[^\w.-]', '_', name)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    return os.path.join(directory or PROFILE_DIR, f"{safe_name}-{stamp}{extension}")
+
+def rotate(name, extension, keep=None, directory=None):
+    """Delete all but the newest keep profile files of name"""
+    directory = directory or PROFILE_DIR
+    keep = PROFILE_KEEP if keep is None else keep
+    prefix = re.sub(r'[^\w.-]', '_', name) + "-"
+    # The timestamp in the name sorts oldest first
+    files = sorted(f for f in os.listdir(directory) if f.startswith(prefix) and f.endswith(extension))
+    for old in files[:max(0, len(files) - keep)]:
+        os.remove(os.path.join(directory, old))
+
+def run_profiled(name, func, args, kwargs):
+    """Call func under the configured profiler and write its profile file"""
+    extension = PROFILE_MODES[PROFILE_MODE]
+    if extension == '.prof':
+        import cProfile
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler is active (Python 3.12+ allows one at a time)
+            return func(*args, **kwargs)
+        stop = profiler.disable
+    else:
+        profiler = StackSampler(threading.get_ident(), PROFILE_INTERVAL_MS / 1000)
+        profiler.start()
+        stop = profiler.stop
+
+    _active.depth = 1
+    try:
+        return func(*args, **kwargs)
+    finally:
+        stop()
+        _active.depth = 0
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            if extension == '.prof':
+                profiler.dump_stats(profile_path(name, extension))
+            else:
+                profiler.dump(profile_path(name, extension))
+            rotate(name, extension)
+        except OSError as e:
+            print(f"Error writing profile for {name}: {e}")
+
+def profiled(func, name=None):
+    """Profile every call of func when WORK_HOURS_PROFILE is set; otherwise return func unchanged"""
+    if PROFILE_MODE not in PROFILE_MODES:
+        return func
+    name = name or func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if getattr(_active, 'depth', 0):
+            return func(*args, **kwargs)
+        return run_profiled(name, func, args, kwargs)
+    return wrapper
\ No newline at end of file
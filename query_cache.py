@@ -0,0 +1,98 @@
+"""
+Period query cache for Work Hours Tracker
+LRU cache of DatabaseOperations results stamped with the write generation
+they were read at (see models.bump_write_generation). Results for periods
+that ended before today are only dropped by writes that reach back before
+today, and get a larger share of the cache than the current period.
+"""
+
+import functools
+import threading
+from collections import OrderedDict
+from datetime import datetime
+import models
+
+class PeriodCache:
+    def __init__(self, max_current=32, max_history=256):
+        self.max_current = max_current   # entries for periods that have not ended yet
+        self.max_history = max_history   # entries for periods that ended before today
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0               # dropped to make room
+        self.stale = 0                   # dropped because a write changed the generation
+        self._lock = threading.Lock()
+        self._current = OrderedDict()    # key -> (write_generation, value), least recently used first
+        self._history = OrderedDict()    # key -> (history_generation, value), least recently used first
+        self._engine = None
+
+    def get(self, key, end, load):
+        """Get the result cached under key, calling load() on a miss; end is the period's exclusive end"""
+        # Read the generations before loading: a write that commits while load() runs
+        # bumps them afterwards, so the entry is reloaded on its next use
+        write_generation, history_generation = models.get_write_generations()
+        with self._lock:
+            # Start over after models.configure_engine() points at another database
+            if self._engine is not models.get_engine():
+                self._current.clear()
+                self._history.clear()
+                self._engine = models.get_engine()
+            for entries, generation in ((self._history, history_generation), (self._current, write_generation)):
+                entry = entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] == generation:
+                    entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del entries[key]
+                self.stale += 1
+            self.misses += 1
+
+        value = load()
+
+        if not isinstance(end, datetime):
+            end = datetime.combine(end, datetime.min.time())
+        closed = end <= datetime.combine(datetime.now().date(), datetime.min.time())
+        with self._lock:
+            if closed:
+                entries, generation, limit = self._history, history_generation, self.max_history
+            else:
+                entries, generation, limit = self._current, write_generation, self.max_current
+            entries[key] = (generation, value)
+            entries.move_to_end(key)
+            while len(entries) > limit:
+                entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def stats(self):
+        """Get the hit/miss/eviction counters and the number of entries held"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'stale': self.stale,
+                'current_entries': len(self._current),
+                'history_entries': len(self._history),
+            }
+
+    def clear(self):
+        """Drop every entry; the counters are kept"""
+        with self._lock:
+            self._current.clear()
+            self._history.clear()
+
+def cached_period(method):
+    """Serve a DatabaseOperations method(start, end, ...) through its PeriodCache, keyed by
+    the method name and arguments; the cached result is shared, so callers must not modify it"""
+    @functools.wraps(method)
+    def wrapper(self, start, end, *args, **kwargs):
+        if self.cache is None:
+            return method(self, start, end, *args, **kwargs)
+        key = (method.__name__, start, end, args, tuple(sorted(kwargs.items())))
+        return self.cache.get(key, end, lambda: method(self, start, end, *args, **kwargs))
+    return wrapper
+
+# Process-wide cache shared by every DatabaseOperations, so results outlive the windows that read them
+period_cache = PeriodCache()
\ No newline at end of file
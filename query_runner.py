@@ -0,0 +1,98 @@
+"""
+Background query runner for the Tk windows
+Runs DatabaseOperations calls on a worker thread and hands the results back
+to the Tk main loop through window.after
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+class QueryRunner:
+    POLL_INTERVAL_MS = 30
+
+    def __init__(self, window, max_workers=2):
+        self.window = window
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-query")
+        self.timings = {}           # key -> seconds taken by the last delivered request
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._latest = {}           # key -> id of the newest request for that key
+        self._futures = {}          # key -> future of the newest request
+        self._next_id = 0
+        self._pending = 0
+        self._polling = False
+
+    def submit(self, key, func, on_result, on_error=None):
+        """Run func() off the Tk thread; a newer request with the same key supersedes this one"""
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            self._latest[key] = request_id
+            previous = self._futures.get(key)
+            if previous is not None and previous.cancel():
+                self._pending -= 1
+            self._pending += 1
+            self._futures[key] = self.executor.submit(
+                self._run, key, request_id, func, on_result, on_error
+            )
+        self._schedule_poll()
+        return request_id
+
+    def is_current(self, key, request_id):
+        """Whether request_id is still the newest request for key"""
+        with self._lock:
+            return self._latest.get(key) == request_id
+
+    def shutdown(self):
+        """Stop the worker threads, dropping queued requests"""
+        with self._lock:
+            self._latest.clear()
+            self._pending = 0
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, key, request_id, func, on_result, on_error):
+        """Worker side: skip superseded requests, run the rest and queue the outcome"""
+        if not self.is_current(key, request_id):
+            self._results.put((key, request_id, None, None, None))
+            return
+        started = time.perf_counter()
+        try:
+            outcome, callback = func(), on_result
+        except Exception as e:
+            print(f"Error running {key} query: {e}")
+            outcome, callback = e, on_error
+        self._results.put((key, request_id, callback, outcome, time.perf_counter() - started))
+
+    def _schedule_poll(self):
+        """Start polling the result queue from the Tk thread if not already polling"""
+        if not self._polling:
+            self._polling = True
+            self.window.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self):
+        """Tk side: deliver finished results that have not been superseded"""
+        while True:
+            try:
+                key, request_id, callback, outcome, elapsed = self._results.get_nowait()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._pending -= 1
+            if not self.is_current(key, request_id):
+                continue  # superseded while queued or running
+            self.timings[key] = elapsed
+            if callback is None:
+                continue
+            try:
+                callback(outcome)
+            except Exception as e:
+                print(f"Error delivering {key} query result: {e}")
+
+        with self._lock:
+            keep_polling = self._pending > 0
+        if keep_polling:
+            self.window.after(self.POLL_INTERVAL_MS, self._poll)
+        else:
+            self._polling = False
@@ -0,0 +1,289 @@
+"""
+Query tracing for Work Hours Tracker
+While enabled, SQLAlchemy engine events time the execute of every
+statement and tag it with the traced method that ran it. Each traced method
+keeps the rows its calls returned and their recent latencies for
+p50/p95/p99; those latencies also cover fetching the rows, which is where
+SQLite does most of a query's work. Recent statements are kept in a ring
+buffer, and calls slower than the threshold go to the slow-query log
+together with the statements they ran.
+Disabled, no events are registered and traced methods only check a flag.
+
+Usage: python query_trace.py dump [--date 2024-12-31] [--runs 5] [--slow-ms 50]
+"""
+
+import argparse
+import contextvars
+import functools
+import math
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import date as date_type, datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Defaults, overridable like WORK_HOURS_DB_URL
+TRACE_ENABLED = os.environ.get('WORK_HOURS_TRACE', '0') not in ('', '0')
+SLOW_QUERY_MS = float(os.environ.get('WORK_HOURS_SLOW_QUERY_MS', '100'))
+SLOW_QUERY_LOG = os.environ.get('WORK_HOURS_SLOW_QUERY_LOG', 'work_hours_slow_queries.log')
+
+StatementTrace = namedtuple('StatementTrace', ['started', 'method', 'statement', 'seconds', 'rows'])
+CallTrace = namedtuple('CallTrace', ['started', 'method', 'seconds', 'rows', 'statements'])
+
+# Traced method running in the current thread or task, for tagging its statements
+current_method = contextvars.ContextVar('current_method', default=None)
+# StatementTraces of the traced call running in the current thread or task
+current_call = contextvars.ContextVar('current_call', default=None)
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)]
+
+class QueryTracer:
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS, log_path=SLOW_QUERY_LOG,
+                 recent_size=500, slow_size=200, samples_per_method=1000):
+        self.enabled = False
+        self.slow_query_ms = slow_query_ms
+        self.log_path = log_path            # slow statements are appended here too; None keeps them in memory
+        self.recent = deque(maxlen=recent_size)   # StatementTraces, oldest first
+        self.slow = deque(maxlen=slow_size)       # CallTraces at or above slow_query_ms
+        self.samples_per_method = samples_per_method
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._methods = {}                  # method -> [calls, statements, rows returned, recent call seconds]
+
+    def enable(self):
+        """Register the engine events; applies to every engine, including later ones"""
+        with self._lock:
+            if not self.enabled:
+                event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+                event.listen(Engine, 'handle_error', self._handle_error)
+                self.enabled = True
+
+    def disable(self):
+        """Remove the engine events; collected traces are kept"""
+        with self._lock:
+            if self.enabled:
+                event.remove(Engine, 'before_cursor_execute', self._before_cursor_execute)
+                event.remove(Engine, 'after_cursor_execute', self._after_cursor_execute)
+                event.remove(Engine, 'handle_error', self._handle_error)
+                self.enabled = False
+
+    def clear(self):
+        """Drop collected traces and method latencies"""
+        with self._lock:
+            self.recent.clear()
+            self.slow.clear()
+            self._methods.clear()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        """Engine event: note when the statement started"""
+        conn.info.setdefault('query_trace_started', []).append((context, time.perf_counter()))
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        """Engine event: record the statement with the rows it changed (-1 for queries)"""
+        started = self._pop_started(conn, context)
+        if started is None:
+            return  # enabled while the statement ran
+        seconds = time.perf_counter() - started
+        self.record_statement(StatementTrace(datetime.now() - timedelta(seconds=seconds), current_method.get(),
+                                             statement, seconds, cursor.rowcount))
+
+    def _handle_error(self, exception_context):
+        """Engine event: forget the start time of a statement that raised"""
+        if exception_context.connection is not None:
+            self._pop_started(exception_context.connection, exception_context.execution_context)
+
+    @staticmethod
+    def _pop_started(conn, context):
+        """Remove and return the start time noted for context on conn, or None"""
+        started = conn.info.get('query_trace_started', [])
+        for index in range(len(started) - 1, -1, -1):
+            if started[index][0] is context:
+                return started.pop(index)[1]
+        return None
+
+    def record_statement(self, trace):
+        """Add a statement to the ring buffer and to the traced call that ran it"""
+        with self._lock:
+            self.recent.append(trace)
+            if trace.method is not None:
+                self._method_stats(trace.method)[1] += 1
+        statements = current_call.get()
+        if statements is not None:
+            statements.append(trace)
+        elif trace.seconds * 1000 >= self.slow_query_ms:
+            # Run outside any traced method, so the statement is judged on its own
+            self.record_slow(CallTrace(trace.started, None, trace.seconds, max(trace.rows, 0), [trace]))
+
+    def record_call(self, method, seconds, rows=0, statements=(), outermost=True):
+        """Add the latency and rows returned of one traced method call; log it with its statements if slow"""
+        with self._lock:
+            stats = self._method_stats(method)
+            stats[0] += 1
+            stats[2] += rows
+            stats[3].append(seconds)
+        # A nested call is part of its caller, which is at least as slow and is logged instead
+        if outermost and seconds * 1000 >= self.slow_query_ms:
+            self.record_slow(CallTrace(datetime.now() - timedelta(seconds=seconds), method, seconds, rows,
+                                       list(statements)))
+
+    def record_slow(self, call):
+        """Keep a slow call and append it to the slow-query log"""
+        with self._lock:
+            self.slow.append(call)
+        if self.log_path:
+            try:
+                with self._log_lock, open(self.log_path, 'a', encoding='utf-8') as log:
+                    log.write(self.format_call(call) + "\n")
+            except OSError as e:
+                print(f"Error writing slow-query log: {e}")
+
+    def _method_stats(self, method):
+        """[calls, statements, rows returned, recent call seconds] of a method; call with the lock held"""
+        stats = self._methods.get(method)
+        if stats is None:
+            stats = self._methods[method] = [0, 0, 0, deque(maxlen=self.samples_per_method)]
+        return stats
+
+    def method_stats(self):
+        """Get per-method call counts, statements, rows returned and p50/p95/p99/max latency in ms, slowest p95 first"""
+        with self._lock:
+            snapshot = [(method, calls, statements, rows, sorted(samples))
+                        for method, (calls, statements, rows, samples) in self._methods.items()]
+        results = [{
+            'method': method,
+            'calls': calls,
+            'statements': statements,
+            'rows': rows,
+            'p50_ms': percentile(samples, 50) * 1000,
+            'p95_ms': percentile(samples, 95) * 1000,
+            'p99_ms': percentile(samples, 99) * 1000,
+            'max_ms': samples[-1] * 1000 if samples else 0.0,
+        } for method, calls, statements, rows, samples in snapshot]
+        return sorted(results, key=lambda result: result['p95_ms'], reverse=True)
+
+    def format_statement(self, trace, width=None):
+        """One line for a traced statement, with the SQL cut to width characters if given"""
+        statement = ' '.join(trace.statement.split())
+        if width is not None and len(statement) > width:
+            statement = statement[:width - 3] + "..."
+        rows = trace.rows if trace.rows >= 0 else '-'
+        return (f"{trace.started:%Y-%m-%d %H:%M:%S} {trace.seconds * 1000:9.2f} ms {rows:>7} rows "
+                f"{trace.method or '-'}: {statement}")
+
+    def format_call(self, call, width=None):
+        """A slow call's line, followed by one indented line per statement it ran"""
+        lines = [f"{call.started:%Y-%m-%d %H:%M:%S} {call.seconds * 1000:9.2f} ms {call.rows:>7} rows "
+                 f"{call.method or '-'}: {len(call.statements)} statements"]
+        lines.extend("    " + self.format_statement(trace, width) for trace in call.statements)
+        return "\n".join(lines)
+
+    def format_report(self, slowest=10, width=160):
+        """Text report: per-method latencies, then the slowest recent statements"""
+        lines = [f"{'method':<46} {'calls':>6} {'stmts':>6} {'rows':>8} {'p50 ms':>9} {'p95 ms':>9} "
+                 f"{'p99 ms':>9} {'max ms':>9}"]
+        for stats in self.method_stats():
+            lines.append(f"{stats['method']:<46} {stats['calls']:>6} {stats['statements']:>6} {stats['rows']:>8} "
+                         f"{stats['p50_ms']:9.2f} {stats['p95_ms']:9.2f} {stats['p99_ms']:9.2f} "
+                         f"{stats['max_ms']:9.2f}")
+        with self._lock:
+            recent_count, slow_count = len(self.recent), len(self.slow)
+            recent = sorted(self.recent, key=lambda trace: trace.seconds, reverse=True)[:slowest]
+        lines.append(f"\nslowest of the last {recent_count} statements "
+                     f"({slow_count} calls at or above {self.slow_query_ms:g} ms):")
+        lines.extend(self.format_statement(trace, width) for trace in recent)
+        return "\n".join(lines)
+
+def result_rows(result):
+    """Rows a traced method returned: a list's length, a report's sessions, 0 for None, else 1"""
+    if result is None:
+        return 0
+    if isinstance(result, list):
+        return len(result)
+    sessions = getattr(result, 'sessions', None)
+    if isinstance(sessions, list):
+        return len(sessions)
+    return 1
+
+def traced(method):
+    """Record a method's call latency and rows returned, and tag the statements it runs with its qualified name"""
+    name = method.__qualname__
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if not query_tracer.enabled:
+            return method(*args, **kwargs)
+        caller_statements = current_call.get()
+        statements = []
+        method_token = current_method.set(name)
+        call_token = current_call.set(statements)
+        started = time.perf_counter()
+        result = None
+        try:
+            result = method(*args, **kwargs)
+            return result
+        finally:
+            seconds = time.perf_counter() - started
+            current_call.reset(call_token)
+            current_method.reset(method_token)
+            if caller_statements is not None:
+                caller_statements.extend(statements)
+            query_tracer.record_call(name, seconds, result_rows(result), statements,
+                                     outermost=caller_statements is None)
+    return wrapper
+
+# Process-wide tracer; WORK_HOURS_TRACE=1 turns it on at startup
+query_tracer = QueryTracer()
+if TRACE_ENABLED:
+    query_tracer.enable()
+
+def dump(day, runs):
+    """Load what the tray and the statistics window load for day, runs times, uncached and traced"""
+    from database_operations import DatabaseOperations
+    db_ops = DatabaseOperations(cache=None)
+    week_start = day - timedelta(days=(day.weekday() - db_ops.get_week_start_day()) % 7)
+    month_range = db_ops.get_month_range(day.year, day.month)
+    year_range = db_ops.get_year_range(day.year)
+    for _ in range(runs):
+        db_ops.get_rollup_total(day, day + timedelta(days=1))
+        db_ops.get_last_login_time()
+        db_ops.get_daily_report(day)
+        db_ops.get_weekly_report(week_start)
+        for start, end in (month_range, year_range):
+            db_ops.get_period_total(start, end)
+            db_ops.get_sessions_page(start, end, limit=50)
+        db_ops.get_monthly_total_hours(day.year, day.month)
+
+def main():
+    parser = argparse.ArgumentParser(description="Trace the tray and statistics queries against the database")
+    parser.add_argument("command", choices=["dump"])
+    parser.add_argument("--date", type=date_type.fromisoformat, default=None, help="day to load (default today)")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--slow-ms", type=float, default=None, help="slow-query threshold (default $WORK_HOURS_SLOW_QUERY_MS)")
+    parser.add_argument("--log-lines", type=int, default=20, help="lines of the slow-query log to show")
+    args = parser.parse_args()
+
+    # Run as a script this module is __main__, while DatabaseOperations reports to the imported one
+    from query_trace import query_tracer, dump
+    if args.slow_ms is not None:
+        query_tracer.slow_query_ms = args.slow_ms
+    # Only the application's own slow statements belong in its log
+    log_path, query_tracer.log_path = query_tracer.log_path, None
+    query_tracer.enable()
+    dump(args.date or datetime.now().date(), args.runs)
+    print(query_tracer.format_report())
+
+    if os.path.exists(log_path):
+        with open(log_path, encoding='utf-8') as log:
+            tail = deque(log, maxlen=args.log_lines)
+        print(f"\nlast {len(tail)} lines of {log_path}:")
+        print("".join(tail), end="")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+Headless report over many Work Hours Tracker databases
+Summarizes daily, weekly, monthly and yearly totals of every database
+found in the given directories, globs or files, one database per task on
+a process pool, and merges them into one JSON or CSV report. Only the
+database modules are imported, so it runs without tkinter, pystray or
+pywin32, e.g. on a payroll server.
+
+Usage: python report_cli.py collected/ --from 2025-01-01 --to 2026-01-01 [--format csv] [--output report.csv]
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date as date_type, datetime, timedelta
+import models
+from database_operations import DatabaseOperations
+from analytics import AnalyticsEngine
+
+PERIODS = ('day', 'week', 'month', 'year')
+REPORT_FIELDS = ['employee', 'database', 'period', 'start', 'end', 'sessions', 'worked_seconds',
+                 'worked_hours', 'total_hours']
+
+def find_databases(sources):
+    """Database files under the given directories, matching the given globs, or named directly"""
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            paths.update(glob.glob(os.path.join(source, '**', '*.db'), recursive=True))
+        elif os.path.isfile(source):
+            paths.add(source)
+        else:
+            paths.update(path for path in glob.glob(source, recursive=True) if os.path.isfile(path))
+    return sorted(paths)
+
+def employee_name(path):
+    """Report label of a database: its file name, or its folder for a plain work_hours.db"""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if stem == 'work_hours':
+        return os.path.basename(os.path.dirname(os.path.abspath(path)))
+    return stem
+
+def period_buckets(engine, period, start_date, end_date, week_start_day):
+    """[(bucket_start, worked_seconds, session_count)] for buckets of period overlapping [start_date, end_date)"""
+    if period == 'day':
+        return engine.daily_breakdown(start_date, end_date)
+    if period == 'week':
+        return engine.weekly_breakdown(start_date, end_date, week_start_day)
+    last_year = (end_date - timedelta(days=1)).year
+    if period == 'month':
+        months = []
+        for year in range(start_date.year, last_year + 1):
+            months.extend(engine.monthly_breakdown(year))
+        return [month for month in months
+                if month[0] < end_date and next_month(month[0]) > start_date]
+    return engine.yearly_breakdown(start_date.year, last_year)
+
+def next_month(month_start):
+    """First day of the month after month_start"""
+    if month_start.month == 12:
+        return date_type(month_start.year + 1, 1, 1)
+    return date_type(month_start.year, month_start.month + 1, 1)
+
+def bucket_end(period, bucket_start):
+    """Exclusive end date of a bucket"""
+    if period == 'day':
+        return bucket_start + timedelta(days=1)
+    if period == 'week':
+        return bucket_start + timedelta(days=7)
+    if period == 'month':
+        return next_month(bucket_start)
+    return date_type(bucket_start.year + 1, 1, 1)
+
+def summarize_database(path, start_date, end_date, periods, week_start_day=None):
+    """Report rows for one database; runs in a pool worker"""
+    # Opened read-only, so collected files are never modified, whatever their journal mode
+    models.configure_engine(f"sqlite:///file:{os.path.abspath(path)}?mode=ro&uri=true", read_only=True)
+    try:
+        db_ops = DatabaseOperations(cache=None)
+        if week_start_day is None:
+            week_start_day = db_ops.get_week_start_day()
+        # Every session in one query; totals follow DatabaseOperations.get_period_total
+        engine = AnalyticsEngine(db_ops)
+        engine.load()
+        employee = employee_name(path)
+        rows = []
+        for period in periods:
+            for bucket_start, worked_seconds, session_count in period_buckets(
+                    engine, period, start_date, end_date, week_start_day):
+                rows.append({
+                    'employee': employee,
+                    'database': path,
+                    'period': period,
+                    'start': bucket_start.isoformat(),
+                    'end': bucket_end(period, bucket_start).isoformat(),
+                    'sessions': session_count,
+                    'worked_seconds': round(worked_seconds, 3),
+                    'worked_hours': round(worked_seconds / 3600, 2),
+                    'total_hours': db_ops.format_duration(timedelta(seconds=worked_seconds)),
+                })
+        return rows
+    finally:
+        models.dispose_engine()
+
+def build_report(paths, start_date, end_date, periods=PERIODS, workers=None, week_start_day=None):
+    """Summarize every database on a process pool; returns (rows, errors) in path order"""
+    rows = []
+    errors = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(summarize_database, path, start_date, end_date, periods, week_start_day)
+                   for path in paths]
+        for path, future in zip(paths, futures):
+            try:
+                rows.extend(future.result())
+            except Exception as e:
+                print(f"Error summarizing {path}: {e}", file=sys.stderr)
+                errors.append({'database': path, 'error': str(e)})
+    return rows, errors
+
+def write_report(rows, errors, output, report_format, meta):
+    """Write the merged report as JSON (with metadata and errors) or CSV (rows only)"""
+    if report_format == 'json':
+        json.dump({'meta': meta, 'errors': errors, 'rows': rows}, output, indent=2)
+        output.write("\n")
+    else:
+        writer = csv.DictWriter(output, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def main():
+    today = datetime.now().date()
+    parser = argparse.ArgumentParser(description="Merge period totals of many work_hours databases into one report")
+    parser.add_argument("sources", nargs="+", help="directories (searched for *.db), globs or database files")
+    parser.add_argument("--from", dest="start", type=date_type.fromisoformat, default=date_type(today.year, 1, 1))
+    parser.add_argument("--to", dest="end", type=date_type.fromisoformat, default=today + timedelta(days=1),
+                        help="exclusive end date (default tomorrow)")
+    parser.add_argument("--periods", nargs="+", choices=PERIODS, default=list(PERIODS))
+    parser.add_argument("--week-start", type=int, choices=range(7), default=None,
+                        help="0=Monday .. 6=Sunday (default each database's own setting)")
+    parser.add_argument("--format", choices=["json", "csv"], default="json")
+    parser.add_argument("--output", default=None, help="report file (default stdout)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default one per CPU)")
+    args = parser.parse_args()
+
+    paths = find_databases(args.sources)
+    if not paths:
+        parser.error("no databases found")
+    started = time.perf_counter()
+    rows, errors = build_report(paths, args.start, args.end, args.periods, args.workers, args.week_start)
+    elapsed = time.perf_counter() - started
+
+    meta = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'from': args.start.isoformat(),
+        'to': args.end.isoformat(),
+        'periods': args.periods,
+        'databases': len(paths),
+        'seconds': round(elapsed, 3),
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as output:
+            write_report(rows, errors, output, args.format, meta)
+    else:
+        write_report(rows, errors, sys.stdout, args.format, meta)
+    print(f"Summarized {len(paths) - len(errors)} of {len(paths)} databases into {len(rows)} rows "
+          f"in {elapsed:.2f} s", file=sys.stderr)
+    sys.exit(1 if errors else 0)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,191 @@
+"""
+Streaming export and import of work sessions
+Exports stream rows in fixed-size keyset batches and imports load chunked
+transactions, so memory stays flat however large the database or file is.
+Headless: needs neither tkinter nor pystray.
+
+Usage:
+    python session_io.py export sessions.csv [--format csv|jsonl] [--from DATE] [--to DATE]
+    python session_io.py import sessions.jsonl [--format csv|jsonl]
+"""
+
+import argparse
+import csv
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from models import get_db_session, bump_write_generation
+from database_operations import DatabaseOperations
+from ingest import ingest_sessions
+import daily_totals
+
+FIELDS = ('id', 'login_time', 'logout_time', 'logout_type', 'user_id', 'host')
+IMPORT_FIELDS = ('login_time', 'logout_time', 'logout_type', 'user_id', 'host')
+
+def iter_sessions(start=None, end=None, batch_size=5000, db_ops=None):
+    """Yield export rows for [start, end) one keyset batch at a time"""
+    db_ops = db_ops or DatabaseOperations()
+    start = start or datetime.min
+    end = end or datetime.max
+    after = None
+    while True:
+        batch = db_ops.get_export_page(start, end, after, batch_size)
+        for row in batch:
+            yield row
+        if len(batch) < batch_size:
+            return
+        after = (batch[-1].login_time, batch[-1].id)
+
+class _LineBuffer:
+    """Minimal file-like target so csv.writer output can be yielded line by line"""
+    def __init__(self):
+        self._parts = []
+
+    def write(self, text):
+        self._parts.append(text)
+
+    def take(self):
+        text = ''.join(self._parts)
+        self._parts.clear()
+        return text
+
+def _format_time(value):
+    """Format a datetime like SQLite stores it; empty for open sessions"""
+    return value.isoformat(sep=' ') if value is not None else ''
+
+def iter_csv(rows):
+    """Yield CSV lines for rows, header first"""
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELDS)
+    yield buffer.take()
+    for row in rows:
+        writer.writerow((row.id, _format_time(row.login_time), _format_time(row.logout_time),
+                         row.logout_type or '', row.user_id or '', row.host or ''))
+        yield buffer.take()
+
+def iter_jsonl(rows):
+    """Yield one JSON document per line for rows"""
+    for row in rows:
+        yield json.dumps({
+            'id': row.id,
+            'login_time': _format_time(row.login_time),
+            'logout_time': _format_time(row.logout_time) or None,
+            'logout_type': row.logout_type,
+            'user_id': row.user_id,
+            'host': row.host,
+        }) + '\n'
+
+WRITERS = {'csv': iter_csv, 'jsonl': iter_jsonl}
+
+def export_sessions(output, fmt='csv', start=None, end=None, batch_size=5000):
+    """Stream sessions to a text file object; returns the number of rows written"""
+    count = 0
+
+    def counted(rows):
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    for line in WRITERS[fmt](counted(iter_sessions(start, end, batch_size))):
+        output.write(line)
+    return count
+
+def _parse_time(value):
+    """Parse an exported timestamp; empty values mean an open session"""
+    return datetime.fromisoformat(value) if value else None
+
+def read_csv(lines):
+    """Yield session dicts from CSV lines"""
+    for record in csv.DictReader(lines):
+        yield {
+            'login_time': _parse_time(record['login_time']),
+            'logout_time': _parse_time(record.get('logout_time')),
+            'logout_type': record.get('logout_type') or None,
+            'user_id': record.get('user_id') or None,
+            'host': record.get('host') or None,
+        }
+
+def read_jsonl(lines):
+    """Yield session dicts from JSON lines"""
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        session = {field: record.get(field) for field in IMPORT_FIELDS}
+        session['login_time'] = _parse_time(session['login_time'])
+        session['logout_time'] = _parse_time(session['logout_time'])
+        yield session
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl}
+
+def import_sessions(lines, fmt='csv', chunk_size=10000):
+    """Load sessions in chunk_size transactions; returns (rows, rows_per_second).
+
+    Exported ids are not reused, so imported sessions get fresh ids.
+    """
+    started = time.perf_counter()
+    total = 0
+    first_date = last_date = None
+    chunk = []
+    for session in READERS[fmt](lines):
+        chunk.append(session)
+        if session['logout_time'] is not None:
+            # Sessions that run past midnight also add to the days after their login
+            login_date, logout_date = session['login_time'].date(), session['logout_time'].date()
+            first_date = login_date if first_date is None else min(first_date, login_date)
+            last_date = logout_date if last_date is None else max(last_date, logout_date)
+        if len(chunk) >= chunk_size:
+            total += ingest_sessions(chunk, rebuild_totals=False)
+            chunk = []
+    if chunk:
+        total += ingest_sessions(chunk, rebuild_totals=False)
+
+    # One rollup rebuild over the imported dates instead of one per chunk
+    if first_date is not None:
+        db_session = get_db_session()
+        try:
+            daily_totals.rebuild(db_session, first_date, last_date + timedelta(days=1))
+            db_session.commit()
+        finally:
+            db_session.close()
+        bump_write_generation(datetime.combine(first_date, datetime.min.time()))
+    elapsed = time.perf_counter() - started
+    return total, (total / elapsed if elapsed > 0 else 0.0)
+
+def _guess_format(path, fmt):
+    """Use the explicit format, or pick one from the file extension"""
+    if fmt:
+        return fmt
+    return 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import work sessions")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path", help="file to write or read, '-' for stdout/stdin")
+    parser.add_argument("--format", choices=sorted(WRITERS), default=None)
+    parser.add_argument("--from", dest="start", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--to", dest="end", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    fmt = _guess_format(args.path, args.format)
+
+    if args.command == "export":
+        if args.path == '-':
+            count = export_sessions(sys.stdout, fmt, args.start, args.end, args.batch_size)
+        else:
+            with open(args.path, 'w', newline='', encoding='utf-8') as output:
+                count = export_sessions(output, fmt, args.start, args.end, args.batch_size)
+        print(f"Exported {count} sessions", file=sys.stderr)
+    else:
+        if args.path == '-':
+            count, rate = import_sessions(sys.stdin, fmt, args.batch_size)
+        else:
+            with open(args.path, newline='', encoding='utf-8') as lines:
+                count, rate = import_sessions(lines, fmt, args.batch_size)
+        print(f"Imported {count} sessions ({rate:,.0f} rows/s)", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@ Allows configuration of application settings
 import tkinter as tk
 from tkinter import ttk, messagebox
 from database_operations import DatabaseOperations
+from query_runner import QueryRunner
+from query_trace import query_tracer
 
 class SettingsGUI:
     def __init__(self):
@@ -17,8 +19,12 @@ class SettingsGUI:
         """Create the settings window"""
         self.window = tk.Toplevel()
         self.window.title("Settings")
-        self.window.geometry("400x300")
+        self.window.geometry("640x620")
         self.window.resizable(False, False)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        # Settings are read and written on a worker thread
+        self.query_runner = QueryRunner(self.window)
         
         # Main frame
         main_frame = ttk.Frame(self.window)
@@ -38,10 +44,7 @@ class SettingsGUI:
         )
         week_combo.pack(pady=5, anchor=tk.W)
         
-        # Load current setting
-        current_day = self.db_ops.get_week_start_day()
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        self.week_start_var.set(days[current_day])
+        # Current setting is loaded by show()
         
         # Database info
         db_frame = ttk.LabelFrame(main_frame, text="Database Information", padding=10)
@@ -50,6 +53,8 @@ class SettingsGUI:
         ttk.Label(db_frame, text="Database file: work_hours.db").pack(anchor=tk.W)
         ttk.Label(db_frame, text="Using SQLite with Alembic versioning").pack(anchor=tk.W)
         
+        self.create_diagnostics(main_frame)
+        
         # Buttons frame
         buttons_frame = ttk.Frame(main_frame)
         buttons_frame.pack(fill=tk.X)
@@ -60,6 +65,75 @@ class SettingsGUI:
         # Hide window initially
         self.window.withdraw()
         
+    def create_diagnostics(self, parent):
+        """Query tracing controls and per-method latencies"""
+        diagnostics_frame = ttk.LabelFrame(parent, text="Diagnostics", padding=10)
+        diagnostics_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 20))
+        
+        controls_frame = ttk.Frame(diagnostics_frame)
+        controls_frame.pack(fill=tk.X)
+        
+        self.tracing_var = tk.BooleanVar(value=query_tracer.enabled)
+        ttk.Checkbutton(controls_frame, text="Trace queries", variable=self.tracing_var,
+                        command=self.toggle_tracing).pack(side=tk.LEFT)
+        
+        ttk.Label(controls_frame, text="Slow query threshold (ms):").pack(side=tk.LEFT, padx=(20, 5))
+        self.slow_ms_var = tk.StringVar(value=f"{query_tracer.slow_query_ms:g}")
+        slow_spinbox = ttk.Spinbox(controls_frame, from_=1, to=10000, increment=10,
+                                   textvariable=self.slow_ms_var, width=7, command=self.set_slow_threshold)
+        slow_spinbox.pack(side=tk.LEFT)
+        slow_spinbox.bind('<Return>', lambda event: self.set_slow_threshold())
+        
+        ttk.Button(controls_frame, text="Clear", command=self.clear_diagnostics).pack(side=tk.RIGHT, padx=(5, 0))
+        ttk.Button(controls_frame, text="Refresh", command=self.refresh_diagnostics).pack(side=tk.RIGHT)
+        
+        columns = ("method", "calls", "p50", "p95", "p99")
+        self.diagnostics_tree = ttk.Treeview(diagnostics_frame, columns=columns, show="headings", height=8)
+        for column, heading, width in zip(columns, ("Method", "Calls", "p50 ms", "p95 ms", "p99 ms"),
+                                          (300, 60, 70, 70, 70)):
+            self.diagnostics_tree.heading(column, text=heading)
+            self.diagnostics_tree.column(column, width=width, anchor=tk.W if column == "method" else tk.E)
+        self.diagnostics_tree.pack(fill=tk.BOTH, expand=True, pady=5)
+        
+        self.slow_label = ttk.Label(diagnostics_frame, text="")
+        self.slow_label.pack(anchor=tk.W)
+        
+    def toggle_tracing(self):
+        """Turn query tracing on or off"""
+        if self.tracing_var.get():
+            query_tracer.enable()
+        else:
+            query_tracer.disable()
+        self.refresh_diagnostics()
+        
+    def set_slow_threshold(self):
+        """Apply the slow query threshold from the spinbox"""
+        try:
+            query_tracer.slow_query_ms = float(self.slow_ms_var.get())
+        except ValueError:
+            messagebox.showerror("Error", f"Invalid slow query threshold: {self.slow_ms_var.get()}")
+            self.slow_ms_var.set(f"{query_tracer.slow_query_ms:g}")
+        self.refresh_diagnostics()
+        
+    def clear_diagnostics(self):
+        """Drop the collected traces"""
+        query_tracer.clear()
+        self.refresh_diagnostics()
+        
+    def refresh_diagnostics(self):
+        """Show the tracer's per-method latencies; they are in memory, so no query is needed"""
+        for item in self.diagnostics_tree.get_children():
+            self.diagnostics_tree.delete(item)
+        for stats in query_tracer.method_stats():
+            self.diagnostics_tree.insert("", tk.END, values=(
+                stats['method'], stats['calls'],
+                f"{stats['p50_ms']:.1f}", f"{stats['p95_ms']:.1f}", f"{stats['p99_ms']:.1f}"
+            ))
+        status = "on" if query_tracer.enabled else "off"
+        log = f", logged to {query_tracer.log_path}" if query_tracer.log_path else ""
+        self.slow_label.config(text=f"Tracing {status}; {len(query_tracer.slow)} slow calls "
+                                    f"(at or above {query_tracer.slow_query_ms:g} ms){log}")
+        
     def save_settings(self):
         """Save settings to database"""
         try:
@@ -67,22 +141,42 @@ class SettingsGUI:
             days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
             selected_day = self.week_start_var.get()
             day_index = days.index(selected_day)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save settings: {str(e)}")
+            return
             
-            # Save to database
-            self.db_ops.set_week_start_day(day_index)
-            
+        def on_saved(result):
             messagebox.showinfo("Settings", "Settings saved successfully!")
             self.window.withdraw()
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to save settings: {str(e)}")
+        def on_error(error):
+            messagebox.showerror("Error", f"Failed to save settings: {str(error)}")
+            
+        # Save to database
+        self.query_runner.submit("save", lambda: self.db_ops.set_week_start_day(day_index), on_saved, on_error)
+        
+    def load_settings(self):
+        """Load current settings off the Tk thread"""
+        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        
+        def on_loaded(current_day):
+            self.week_start_var.set(days[current_day])
+            
+        def on_error(error):
+            messagebox.showerror("Error", f"Failed to load settings: {str(error)}")
             
+        self.query_runner.submit("load", self.db_ops.get_week_start_day, on_loaded, on_error)
+        
+    def close(self):
+        """Close the settings window and stop its query worker"""
+        self.query_runner.shutdown()
+        self.window.destroy()
+        
     def show(self):
         """Show the settings window"""
         # Refresh current settings
-        current_day = self.db_ops.get_week_start_day()
-        days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-        self.week_start_var.set(days[current_day])
+        self.load_settings()
+        self.refresh_diagnostics()
         
         self.window.deiconify()
         self.window.lift()
\ No newline at end of file
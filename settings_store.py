@@ -0,0 +1,92 @@
+"""
+In-memory settings store for Work Hours Tracker
+Typed, write-through cache over the key/value settings table
+"""
+
+import threading
+import models
+from models import Settings, get_db_session
+
+class SettingsStore:
+    # key -> (type, default); the settings table stays the source of truth
+    SCHEMA = {
+        'week_start_day': (int, 0),  # 0=Monday, 6=Sunday
+    }
+
+    def __init__(self):
+        self._values = None
+        self._engine = None
+        self._lock = threading.RLock()
+        self._listeners = []
+
+    def load(self):
+        """Read every setting from the database into memory"""
+        session = get_db_session()
+        try:
+            rows = {setting.key: setting.value for setting in session.query(Settings).all()}
+        finally:
+            session.close()
+
+        values = {}
+        for key, (value_type, default) in self.SCHEMA.items():
+            try:
+                values[key] = value_type(rows[key]) if key in rows else default
+            except ValueError:
+                print(f"Invalid value for setting {key}: {rows[key]!r}")
+                values[key] = default
+        with self._lock:
+            self._values = values
+            self._engine = models.get_engine()
+
+    def get(self, key):
+        """Get a typed setting, loading the store on first use"""
+        with self._lock:
+            # Reload after models.configure_engine() points at another database
+            if self._values is None or self._engine is not models.get_engine():
+                self.load()
+            return self._values[key]
+
+    def set(self, key, value):
+        """Write a setting to the database, then update the cache and notify listeners"""
+        value_type, _ = self.SCHEMA[key]
+        value = value_type(value)
+        with self._lock:
+            session = get_db_session()
+            try:
+                setting = session.query(Settings).filter_by(key=key).first()
+                if setting:
+                    setting.value = str(value)
+                else:
+                    setting = Settings(key=key, value=str(value))
+                    session.add(setting)
+                session.commit()
+            finally:
+                session.close()
+            if self._values is not None:
+                self._values[key] = value
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(key, value)
+            except Exception as e:
+                print(f"Error notifying settings listener: {e}")
+
+    def invalidate(self):
+        """Drop the cached values so the next get() reloads them"""
+        with self._lock:
+            self._values = None
+
+    def subscribe(self, listener):
+        """Call listener(key, value) after every change; it runs on the writer's thread"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        """Stop notifying listener"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+# Process-wide store shared by the tray, the windows and DatabaseOperations
+settings_store = SettingsStore()
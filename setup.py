@@ -29,7 +29,7 @@ def check_dependencies():
     print("Checking dependencies...")
     
     required_packages = [
-        'pystray', 'Pillow', 'psutil', 'sqlalchemy', 'alembic', 'pywin32'
+        'pystray', 'Pillow', 'sqlalchemy', 'alembic', 'pywin32', 'numpy', 'aiosqlite'
     ]
     
     missing_packages = []
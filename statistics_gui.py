@@ -8,11 +8,20 @@ from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
 from datetime import datetime, timedelta
 from database_operations import DatabaseOperations
+from virtual_list import VirtualSessionList
+from query_runner import QueryRunner
+from query_trace import traced
+from profiling import profiled
+from settings_store import settings_store
+
+# Shown in a virtual treeview until the QueryRunner has loaded the row's page
+LOADING_ROW = ("Loading...", "", "", "")
 
 class StatisticsGUI:
     def __init__(self):
         self.db_ops = DatabaseOperations()
         self.window = None
+        self.virtual_lists = {}  # tree -> VirtualSessionList for the monthly and yearly tabs
         self.create_window()
         
     def create_window(self):
@@ -21,6 +30,13 @@ class StatisticsGUI:
         self.window.title("Work Hours Statistics")
         self.window.geometry("800x600")
         self.window.resizable(True, True)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        
+        # Queries run on a worker thread so the window stays responsive
+        self.query_runner = QueryRunner(self.window)
+        
+        # Re-bucket the weekly tab when the week start day changes
+        settings_store.subscribe(self.on_setting_changed)
         
         # Create notebook for tabs
         self.notebook = ttk.Notebook(self.window)
@@ -33,9 +49,13 @@ class StatisticsGUI:
         self.create_yearly_tab()
         
         # Refresh button
-        refresh_btn = ttk.Button(self.window, text="Refresh", command=self.refresh_all_tabs)
+        refresh_btn = ttk.Button(self.window, text="Refresh", command=self.reload_all_tabs)
         refresh_btn.pack(pady=5)
         
+        # Loading state and timing of the last request
+        self.status_label = ttk.Label(self.window, text="")
+        self.status_label.pack(pady=(0, 5))
+        
         # Hide window initially
         self.window.withdraw()
         
@@ -124,8 +144,8 @@ class StatisticsGUI:
         self.monthly_total_label = ttk.Label(monthly_frame, text="Monthly Worked: 0hr 0min", font=("Arial", 12, "bold"))
         self.monthly_total_label.pack(pady=5)
         
-        # Treeview for data
-        self.monthly_tree = self.create_treeview(monthly_frame)
+        # Virtualized treeview for data
+        self.monthly_tree = self.create_virtual_treeview(monthly_frame)
         
     def create_yearly_tab(self):
         """Create yearly statistics tab"""
@@ -149,8 +169,8 @@ class StatisticsGUI:
         self.yearly_total_label = ttk.Label(yearly_frame, text="Yearly Worked: 0hr 0min", font=("Arial", 12, "bold"))
         self.yearly_total_label.pack(pady=5)
         
-        # Treeview for data
-        self.yearly_tree = self.create_treeview(yearly_frame)
+        # Virtualized treeview for data
+        self.yearly_tree = self.create_virtual_treeview(yearly_frame)
         
     def create_treeview(self, parent):
         """Create a treeview widget for displaying data"""
@@ -206,66 +226,226 @@ class StatisticsGUI:
         
         return tree
         
-    def populate_treeview(self, tree, sessions, total_label, total_hours):
-        """Populate treeview with session data"""
+    def create_virtual_treeview(self, parent):
+        """Create a treeview that only holds the rows currently in view"""
+        frame = ttk.Frame(parent)
+        frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        columns = ("Login", "Logout", "Type", "Duration")
+        tree = ttk.Treeview(frame, columns=columns, show="headings", height=15)
+        
+        tree.heading("Login", text="Login Time")
+        tree.heading("Logout", text="Logout Time")
+        tree.heading("Type", text="Logout Type")
+        tree.heading("Duration", text="Duration")
+        
+        tree.column("Login", width=150)
+        tree.column("Logout", width=150)
+        tree.column("Type", width=100)
+        tree.column("Duration", width=100)
+        
+        # The scrollbar tracks the VirtualSessionList, not the widget contents
+        v_scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL)
+        
+        def on_v_scroll(action, amount, unit=None):
+            virtual_list = self.virtual_lists.get(tree)
+            if virtual_list is None:
+                return
+            if action == "moveto":
+                virtual_list.moveto(amount)
+            elif unit == "pages":
+                virtual_list.scroll_pages(int(amount))
+            else:
+                virtual_list.scroll_by(int(amount))
+            self.render_virtual_treeview(tree)
+            
+        def on_mouse_wheel(event):
+            if event.num == 4 or event.delta > 0:
+                on_v_scroll("scroll", -3, "units")
+            else:
+                on_v_scroll("scroll", 3, "units")
+            return "break"
+            
+        def on_tree_configure(event=None):
+            virtual_list = self.virtual_lists.get(tree)
+            if virtual_list is None:
+                return
+            row_height = ttk.Style().lookup("Treeview", "rowheight") or 20
+            header_height = 25
+            virtual_list.set_visible_rows((tree.winfo_height() - header_height) // int(row_height))
+            self.render_virtual_treeview(tree)
+            
+        v_scrollbar.config(command=on_v_scroll)
+        tree.v_scrollbar = v_scrollbar
+        
+        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        tree.bind('<Configure>', on_tree_configure)
+        tree.bind('<MouseWheel>', on_mouse_wheel)
+        tree.bind('<Button-4>', on_mouse_wheel)
+        tree.bind('<Button-5>', on_mouse_wheel)
+        
+        return tree
+        
+    def format_session_row(self, session, duration=None):
+        """Format a session as treeview values"""
+        login_time = session.login_time.strftime("%Y-%m-%d %H:%M:%S")
+        logout_time = session.logout_time.strftime("%Y-%m-%d %H:%M:%S") if session.logout_time else "Active"
+        logout_type = session.logout_type or "N/A"
+        if duration is None:
+            # SessionRecords carry their duration clipped to the period being shown
+            duration = self.db_ops.format_duration(timedelta(seconds=session.duration_seconds))
+        return (login_time, logout_time, logout_type, duration)
+        
+    def populate_treeview(self, tree, report, total_label):
+        """Populate treeview with a PeriodReport"""
         # Clear existing data
         for item in tree.get_children():
             tree.delete(item)
             
         # Add sessions
-        for session in sessions:
-            login_time = session.login_time.strftime("%Y-%m-%d %H:%M:%S")
-            logout_time = session.logout_time.strftime("%Y-%m-%d %H:%M:%S") if session.logout_time else "Active"
-            logout_type = session.logout_type or "N/A"
-            duration = self.db_ops.format_duration(self.db_ops.calculate_session_duration(session))
-            
-            tree.insert("", tk.END, values=(login_time, logout_time, logout_type, duration))
+        for session, duration in zip(report.sessions, report.durations):
+            tree.insert("", tk.END, values=self.format_session_row(session, duration))
             
         # Update total label
+        total_label.config(text=f"{total_label.cget('text').split(':')[0]}: {report.total_hours}")
+        
+    @traced
+    def build_virtual_list(self, start, end, visible_rows):
+        """Query the total and first page for [start, end); safe to run off the Tk thread"""
+        total_seconds, session_count = self.db_ops.get_period_total(start, end)
+        virtual_list = VirtualSessionList(
+            lambda after, limit: self.db_ops.get_sessions_page(start, end, after, limit),
+            session_count,
+            format_row=self.format_session_row,
+            visible_rows=visible_rows
+        )
+        virtual_list.visible()  # prefetch the first window
+        return virtual_list, self.db_ops.format_duration(timedelta(seconds=total_seconds))
+        
+    def populate_virtual_treeview(self, tree, virtual_list, total_label, total_hours):
+        """Attach a VirtualSessionList to a virtual treeview"""
+        self.virtual_lists[tree] = virtual_list
+        self.render_virtual_treeview(tree)
         total_label.config(text=f"{total_label.cget('text').split(':')[0]}: {total_hours}")
         
+    def get_visible_rows(self, tree):
+        """Number of rows a virtual treeview currently shows"""
+        virtual_list = self.virtual_lists.get(tree)
+        return virtual_list.visible_rows if virtual_list else int(tree.cget("height"))
+        
+    def run_query(self, key, total_label, query, on_result):
+        """Run query off the Tk thread, showing a loading state until on_result gets its result"""
+        # The query runs on a worker thread and on_result on the Tk thread, so each gets its own profile
+        query = profiled(query, f"StatisticsGUI.{key}_query")
+        on_result = profiled(on_result, f"StatisticsGUI.{key}_render")
+        label_prefix = total_label.cget('text').split(':')[0]
+        total_label.config(text=f"{label_prefix}: Loading...")
+        self.status_label.config(text=f"Loading {key} data...")
+        
+        def on_done(result):
+            on_result(result)
+            elapsed_ms = self.query_runner.timings[key] * 1000
+            self.status_label.config(text=f"{key.capitalize()} data loaded in {elapsed_ms:.0f} ms")
+            
+        def on_error(error):
+            total_label.config(text=f"{label_prefix}: -")
+            self.status_label.config(text="")
+            messagebox.showerror("Error", f"Failed to load {key} data: {str(error)}")
+            
+        self.query_runner.submit(key, query, on_done, on_error)
+        
+    def render_virtual_treeview(self, tree):
+        """Show the visible window of a virtual treeview, reusing existing items"""
+        virtual_list = self.virtual_lists[tree]
+        # Rows of pages still loading show as placeholders; nothing is queried on the Tk thread
+        rows = virtual_list.cached_visible(LOADING_ROW)
+        items = tree.get_children()
+        for item, values in zip(items, rows):
+            tree.item(item, values=values)
+        for values in rows[len(items):]:
+            tree.insert("", tk.END, values=values)
+        if len(items) > len(rows):
+            tree.delete(*items[len(rows):])
+        tree.v_scrollbar.set(*virtual_list.yview())
+        pages = virtual_list.missing_pages()
+        if pages:
+            # A newer scroll position supersedes pages still queued for an older one
+            self.query_runner.submit(
+                ("pages", tree),
+                lambda: virtual_list.fetch_pages(pages),
+                lambda fetched: self.store_virtual_pages(tree, virtual_list, fetched)
+            )
+            
+    def store_virtual_pages(self, tree, virtual_list, fetched):
+        """Cache pages loaded by the QueryRunner and show them if the list is still displayed"""
+        virtual_list.store_pages(fetched)
+        if self.virtual_lists.get(tree) is virtual_list:
+            self.render_virtual_treeview(tree)
+        
+    @profiled
     def load_daily_data(self):
         """Load daily data"""
         try:
             date = self.daily_date_picker.get_date()
-            sessions = self.db_ops.get_daily_sessions(date)
-            total_hours = self.db_ops.get_daily_total_hours(date)
-            self.populate_treeview(self.daily_tree, sessions, self.daily_total_label, total_hours)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load daily data: {str(e)}")
+            return
+        self.run_query(
+            "daily", self.daily_total_label,
+            lambda: self.db_ops.get_daily_report(date),
+            lambda report: self.populate_treeview(self.daily_tree, report, self.daily_total_label)
+        )
             
+    @profiled
     def load_weekly_data(self):
         """Load weekly data"""
         try:
             week_start = self.weekly_date_picker.get_date()
-            sessions = self.db_ops.get_weekly_sessions(week_start)
-            total_hours = self.db_ops.get_weekly_total_hours(week_start)
-            self.populate_treeview(self.weekly_tree, sessions, self.weekly_total_label, total_hours)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load weekly data: {str(e)}")
+            return
+        self.run_query(
+            "weekly", self.weekly_total_label,
+            lambda: self.db_ops.get_weekly_report(week_start),
+            lambda report: self.populate_treeview(self.weekly_tree, report, self.weekly_total_label)
+        )
             
+    @profiled
     def load_monthly_data(self):
         """Load monthly data"""
         try:
             year = int(self.monthly_year_var.get())
             month_text = self.monthly_month_var.get()
             month = int(month_text.split(" - ")[0])  # Extract month number from "1 - January" format
-            sessions = self.db_ops.get_monthly_sessions(year, month)
-            total_hours = self.db_ops.get_monthly_total_hours(year, month)
-            self.populate_treeview(self.monthly_tree, sessions, self.monthly_total_label, total_hours)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load monthly data: {str(e)}")
+            return
+        start, end = self.db_ops.get_month_range(year, month)
+        visible_rows = self.get_visible_rows(self.monthly_tree)
+        self.run_query(
+            "monthly", self.monthly_total_label,
+            lambda: self.build_virtual_list(start, end, visible_rows),
+            lambda result: self.populate_virtual_treeview(self.monthly_tree, result[0], self.monthly_total_label, result[1])
+        )
             
+    @profiled
     def load_yearly_data(self):
         """Load yearly data"""
         try:
             year = int(self.yearly_year_var.get())
-            sessions = self.db_ops.get_yearly_sessions(year)
-            total_hours = self.db_ops.get_yearly_total_hours(year)
-            self.populate_treeview(self.yearly_tree, sessions, self.yearly_total_label, total_hours)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load yearly data: {str(e)}")
+            return
+        start, end = self.db_ops.get_year_range(year)
+        visible_rows = self.get_visible_rows(self.yearly_tree)
+        self.run_query(
+            "yearly", self.yearly_total_label,
+            lambda: self.build_virtual_list(start, end, visible_rows),
+            lambda result: self.populate_virtual_treeview(self.yearly_tree, result[0], self.yearly_total_label, result[1])
+        )
             
+    @profiled
     def refresh_all_tabs(self):
         """Refresh all tabs with current data"""
         self.load_daily_data()
@@ -273,6 +453,32 @@ class StatisticsGUI:
         self.load_monthly_data()
         self.load_yearly_data()
         
+    def reload_all_tabs(self):
+        """Refresh all tabs from the database, bypassing cached results"""
+        # The cache follows this process's writes; this also picks up other processes' ones
+        if self.db_ops.cache is not None:
+            self.db_ops.cache.clear()
+        self.refresh_all_tabs()
+        
+    def on_setting_changed(self, key, value):
+        """Settings listener; may run on another thread, so hand over to Tk"""
+        if key == 'week_start_day':
+            self.window.after(0, self.rebucket_weeks, value)
+            
+    def rebucket_weeks(self, week_start_day):
+        """Move the weekly picker to the start of its week under the new start day"""
+        selected = self.weekly_date_picker.get_date()
+        days_since_start = (selected.weekday() - week_start_day) % 7
+        self.weekly_date_picker.set_date(selected - timedelta(days=days_since_start))
+        if self.window.winfo_viewable():
+            self.load_weekly_data()
+            
+    def close(self):
+        """Close the statistics window and stop its query worker"""
+        settings_store.unsubscribe(self.on_setting_changed)
+        self.query_runner.shutdown()
+        self.window.destroy()
+        
     def show(self):
         """Show the statistics window"""
         self.window.deiconify()
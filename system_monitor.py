@@ -1,113 +1,334 @@
 """
-System event monitoring for Windows
-Monitors login, logout, sleep, shutdown events
+System event monitoring
+Turns login, logout, sleep, wake and shutdown events from an event source
+into work sessions
 """
 
+import getpass
+import socket
 import threading
 import time
-import win32api
-import win32con
-import win32gui
-import psutil
-from datetime import datetime
-from models import WorkSession, get_db_session
+from datetime import datetime, timedelta
+from sqlalchemy import and_, insert, select, update
+from models import WorkSession, Settings, get_db_session, bump_write_generation
+from event_journal import EventJournal, JournalFlusher, JOURNAL_PATH
+from event_sources import LOGIN, WAKE, SLEEP, SHUTDOWN, WindowsEventSource
+import daily_totals
+from profiling import profiled
+
+# Seconds between heartbeat ticks of the monitoring thread
+HEARTBEAT_INTERVAL = 30
+# Seconds between heartbeat writes; also the most worked time a crash can lose
+HEARTBEAT_FLUSH_INTERVAL = 300
+# Seconds between batched applications of the event journal
+JOURNAL_FLUSH_INTERVAL = 1.0
+# Settings key holding '<journal id>:<last sequence number applied>'; a bare number is
+# from before journal ids and is taken to belong to whichever journal is open
+JOURNAL_APPLIED_KEY = 'journal_applied_seq'
 
 class SystemMonitor:
-    def __init__(self):
+    def __init__(self, heartbeat_interval=HEARTBEAT_INTERVAL, heartbeat_flush_interval=HEARTBEAT_FLUSH_INTERVAL,
+                 journal=None, journal_flush_interval=JOURNAL_FLUSH_INTERVAL, event_source=None):
+        if heartbeat_flush_interval < heartbeat_interval:
+            raise ValueError("heartbeat_flush_interval must be at least heartbeat_interval")
         self.running = False
         self.current_session = None
         self.last_activity = datetime.now()
         self.monitoring_thread = None
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_flush_interval = heartbeat_flush_interval
+        self.heartbeat_writes = 0
+        self._last_heartbeat_write = None
+        self._stop_event = threading.Event()
+        self.listeners = []  # callback(event, login_time, logout_time) after each commit
+        self.user_id = getpass.getuser()
+        self.host = socket.gethostname()
+        self.event_source = event_source
+        self.events_handled = 0
+        self._event_lock = threading.Lock()
+        
+        # With an EventJournal, login/logout only append to it and a flusher applies them
+        self.journal = journal
+        self.flusher = None
+        if journal is not None:
+            self.flusher = JournalFlusher(journal, self._apply_journal, journal_flush_interval)
         
     def start_monitoring(self):
         """Start system monitoring"""
         self.running = True
+        if self.flusher:
+            # Replay events a previous run journaled but never applied
+            replayed = self.flusher.flush()
+            if replayed:
+                print(f"Replayed {replayed} journaled events")
+            self.flusher.start()
         self.log_login()
-        # No background thread - just log the initial login
+        if self.flusher:
+            self.flusher.wake()  # get the login into the database without waiting an interval
+        if self.event_source:
+            self.event_source.start(self.handle_event)
+        
+        # Heartbeat thread so a crash loses at most heartbeat_flush_interval
+        self._stop_event.clear()
+        self.monitoring_thread = threading.Thread(target=self._monitor_events, name="heartbeat", daemon=True)
+        self.monitoring_thread.start()
         
     def stop_monitoring(self):
         """Stop system monitoring"""
         self.running = False
+        self._stop_event.set()
+        if self.event_source:
+            self.event_source.stop()
+        if self.monitoring_thread and self.monitoring_thread is not threading.current_thread():
+            self.monitoring_thread.join(timeout=5)
         self.log_logout("Manual Stop")
+        if self.flusher:
+            self.flusher.stop()
         
-    def log_login(self):
+    def add_listener(self, callback):
+        """Call callback(event, login_time, logout_time) after a session opens or closes"""
+        self.listeners.append(callback)
+        
+    def _notify(self, event, login_time, logout_time=None):
+        """Bump the write generation and notify listeners; they run on the thread that did the write"""
+        # Every committed session change comes through here, so query caches are
+        # invalidated from the login time on (heartbeats change nothing they hold)
+        bump_write_generation(login_time)
+        for callback in list(self.listeners):
+            try:
+                callback(event, login_time, logout_time)
+            except Exception as e:
+                print(f"Error notifying session listener: {e}")
+            
+    def handle_event(self, event):
+        """Apply a SystemEvent from the event source"""
+        with self._event_lock:
+            if event.kind in (LOGIN, WAKE):
+                if self.current_session is None:
+                    self.log_login(event.timestamp)
+            elif event.kind == SLEEP:
+                self.log_logout("Sleep", event.timestamp)
+            elif event.kind == SHUTDOWN:
+                self.log_logout("Shutdown", event.timestamp)
+            else:
+                self.log_logout("Logout", event.timestamp)
+            self.events_handled += 1
+            
+    @profiled
+    def log_login(self, now=None):
         """Log user login event"""
+        now = now or datetime.now()
+        if self.journal is not None:
+            self._journal_login(now)
+            return
+            
         session = get_db_session()
         try:
             # Close any open session first
-            self._close_open_session(session, "System Restart")
+            self._close_open_session(session, "System Restart", now)
             
-            # Create new session
-            self.current_session = WorkSession(login_time=datetime.now())
+            # Create new session; the login itself counts as the first heartbeat
+            self.current_session = WorkSession(login_time=now, last_seen_time=now,
+                                               user_id=self.user_id, host=self.host)
+            self.last_activity = now
+            self._last_heartbeat_write = now
             session.add(self.current_session)
             session.commit()
             print(f"Logged login at {self.current_session.login_time}")
+            self._notify("login", self.current_session.login_time)
         except Exception as e:
             print(f"Error logging login: {e}")
         finally:
             session.close()
             
-    def log_logout(self, logout_type="Logout"):
+    @profiled
+    def log_logout(self, logout_type="Logout", now=None):
         """Log user logout event"""
         if not self.current_session:
             return
+        now = now or datetime.now()
+        if self.journal is not None:
+            self._journal_logout(logout_type, now)
+            return
             
         session = get_db_session()
         try:
             # Update current session
             db_session = session.query(WorkSession).filter_by(id=self.current_session.id).first()
             if db_session:
-                db_session.logout_time = datetime.now()
+                db_session.logout_time = now
                 db_session.logout_type = logout_type
+                daily_totals.add_closed_session(session, db_session.login_time, db_session.logout_time)
                 session.commit()
                 print(f"Logged logout at {db_session.logout_time} - Type: {logout_type}")
+                self._notify("logout", db_session.login_time, db_session.logout_time)
         except Exception as e:
             print(f"Error logging logout: {e}")
         finally:
             session.close()
             self.current_session = None
             
-    def _close_open_session(self, db_session, logout_type="System Restart"):
+    def _close_open_session(self, db_session, logout_type="System Restart", now=None):
         """Close any open work session"""
         try:
-            open_session = db_session.query(WorkSession).filter_by(logout_time=None).first()
+            open_session = db_session.query(WorkSession).filter(self._own_open_session()).first()
             if open_session:
-                open_session.logout_time = datetime.now()
-                open_session.logout_type = logout_type
+                if self.current_session is not None and open_session.id == self.current_session.id:
+                    logout_time = now or datetime.now()
+                else:
+                    logout_time = self._orphan_logout_time(open_session)
+                login_time = self._close_session_row(db_session, open_session, logout_time, logout_type)
                 db_session.commit()
+                self._notify("logout", login_time, logout_time)
         except Exception as e:
+            db_session.rollback()
             print(f"Error closing open session: {e}")
             
+    def _own_open_session(self):
+        """Filter for open sessions of this user on this host; merged databases hold other users' too"""
+        return and_(WorkSession.logout_time.is_(None), WorkSession.user_id == self.user_id,
+                    WorkSession.host == self.host)
+        
+    def _orphan_logout_time(self, open_session):
+        """Orphaned by a crash or power loss: the session was last known alive at its heartbeat"""
+        return open_session.last_seen_time or open_session.login_time
+        
+    def _close_session_row(self, db_session, open_session, logout_time, logout_type):
+        """Close a session row and add it to the daily rollup; the caller commits"""
+        login_time = open_session.login_time
+        open_session.logout_time = logout_time
+        open_session.logout_type = logout_type
+        daily_totals.add_closed_session(db_session, login_time, logout_time)
+        return login_time
+        
+    def _journal_login(self, now):
+        """Record a login in the journal; the flusher writes it to the database"""
+        if self.current_session is not None:
+            # Still open in this process: end it now rather than at its last heartbeat
+            self.journal.append('logout', now, logout_type="System Restart")
+        self.journal.append('login', now, user_id=self.user_id, host=self.host)
+        self.current_session = WorkSession(login_time=now, last_seen_time=now,
+                                           user_id=self.user_id, host=self.host)
+        self.last_activity = now
+        self._last_heartbeat_write = now
+        print(f"Logged login at {now}")
+        
+    def _journal_logout(self, logout_type, now):
+        """Record a logout in the journal; the flusher writes it to the database"""
+        self.journal.append('logout', now, logout_type=logout_type)
+        self.current_session = None
+        print(f"Logged logout at {now} - Type: {logout_type}")
+        
+    @profiled
+    def _apply_journal(self, entries):
+        """Apply journal entries to work_sessions in one transaction; returns the last seq"""
+        notifications = []
+        session = get_db_session()
+        try:
+            checkpoint = session.query(Settings).filter_by(key=JOURNAL_APPLIED_KEY).first()
+            if checkpoint is None:
+                checkpoint = Settings(key=JOURNAL_APPLIED_KEY, value='0')
+                session.add(checkpoint)
+            journal_id, _, applied_seq = checkpoint.value.rpartition(':')
+            applied_seq = int(applied_seq)
+            if journal_id and journal_id != self.journal.journal_id:
+                applied_seq = 0  # written by another journal file, whose sequence numbers were its own
+            
+            # The open session is tracked in memory and new sessions are inserted with one
+            # executemany, so a batch costs a query, at most one UPDATE and one INSERT
+            open_session = session.execute(
+                select(WorkSession.id, WorkSession.login_time, WorkSession.last_seen_time)
+                .where(self._own_open_session()).limit(1)
+            ).first()
+            open_session = open_session._asdict() if open_session else None
+            existing = open_session
+            new_sessions = []
+            closed = []
+            for entry in entries:
+                if entry['seq'] <= applied_seq:
+                    continue  # committed before the journal was compacted
+                event_time = datetime.fromisoformat(entry['time'])
+                if entry['kind'] == 'login':
+                    if open_session is not None:
+                        logout_time = min(open_session['last_seen_time'] or open_session['login_time'], event_time)
+                        open_session.update(logout_time=logout_time, logout_type="System Restart")
+                        closed.append((open_session['login_time'], logout_time))
+                        notifications.append(("logout", open_session['login_time'], logout_time))
+                    open_session = {'login_time': event_time, 'last_seen_time': event_time,
+                                    'logout_time': None, 'logout_type': None,
+                                    'user_id': entry.get('user_id'), 'host': entry.get('host')}
+                    new_sessions.append(open_session)
+                    notifications.append(("login", event_time, None))
+                elif entry['kind'] == 'logout' and open_session is not None:
+                    open_session.update(logout_time=event_time, logout_type=entry.get('logout_type'))
+                    closed.append((open_session['login_time'], event_time))
+                    notifications.append(("logout", open_session['login_time'], event_time))
+                    open_session = None
+                applied_seq = entry['seq']
+                
+            if existing is not None and 'logout_time' in existing:
+                session.execute(
+                    update(WorkSession).where(WorkSession.id == existing['id'])
+                    .values(logout_time=existing['logout_time'], logout_type=existing['logout_type'])
+                )
+            if new_sessions:
+                session.execute(insert(WorkSession), new_sessions)
+            daily_totals.add_closed_sessions(session, closed)
+            checkpoint.value = f"{self.journal.journal_id}:{applied_seq}"
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+            
+        for notification in notifications:
+            self._notify(*notification)
+        return entries[-1]['seq']
+            
+    def heartbeat(self, now=None):
+        """Note that the session is alive; write it out at most every heartbeat_flush_interval"""
+        now = now or datetime.now()
+        self.last_activity = now
+        if self.current_session is None:
+            return False
+        if (self._last_heartbeat_write is not None
+                and now - self._last_heartbeat_write < timedelta(seconds=self.heartbeat_flush_interval)):
+            return False  # coalesced into a later write
+        self._write_heartbeat(now)
+        return True
+        
+    def _write_heartbeat(self, now):
+        """Stamp the open session with a last-seen time"""
+        if self.flusher:
+            # The open session must be this run's login, not a not-yet-closed orphan
+            self.flusher.flush()
+        session = get_db_session()
+        try:
+            session.execute(
+                update(WorkSession).where(self._own_open_session()).values(last_seen_time=now)
+            )
+            session.commit()
+            self._last_heartbeat_write = now
+            self.heartbeat_writes += 1
+        except Exception as e:
+            session.rollback()
+            print(f"Error writing heartbeat: {e}")
+        finally:
+            session.close()
+            
     def _monitor_events(self):
         """Monitor system events in background"""
         while self.running:
             try:
-                # Basic monitoring - simplified to avoid threading issues
-                time.sleep(30)  # Check every 30 seconds
+                if self._stop_event.wait(self.heartbeat_interval):
+                    break
+                self.heartbeat()
                 
             except Exception as e:
                 print(f"Error in system monitoring: {e}")
                 time.sleep(60)
-                
-    def _is_system_shutting_down(self):
-        """Check if system is shutting down"""
-        try:
-            # This is a simplified check - in a real implementation,
-            # you'd use Windows Event Log or WMI events
-            return False
-        except:
-            return False
-            
-    def _is_system_sleeping(self):
-        """Check if system is going to sleep"""
-        try:
-            # Monitor power state changes
-            # This is simplified - real implementation would use Windows API
-            return False
-        except:
-            return False
-            
-    def _wait_for_wake_up(self):
-        """Wait for system to wake up from sleep"""
-        # This would monitor for system wake events
-        pass
\ No newline at end of file
+
+def create_system_monitor():
+    """Build the monitor the tray application runs: journaled, fed by Windows events"""
+    return SystemMonitor(journal=EventJournal(JOURNAL_PATH), event_source=WindowsEventSource())
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+Live tray tooltip for Work Hours Tracker
+Seeds today's closed-session total once, then advances it in memory from the
+open session so refreshing the tooltip costs no queries
+"""
+
+import threading
+from datetime import datetime, timedelta
+from query_trace import traced
+from profiling import profiled
+
+class TrayTicker:
+    def __init__(self, tray_icon, system_monitor, db_ops, interval=30):
+        self.tray_icon = tray_icon
+        self.system_monitor = system_monitor
+        self.db_ops = db_ops
+        self.interval = interval
+        self.seed_count = 0
+        self._closed_seconds = 0.0
+        self._last_login = None
+        self._seed_date = None
+        self._needs_seed = threading.Event()
+        self._needs_seed.set()
+        self._stop = threading.Event()
+        self._thread = None
+        system_monitor.add_listener(self.on_session_event)
+
+    @traced
+    def seed(self, today=None):
+        """Read today's closed total and the last login from the database"""
+        today = today or datetime.now().date()
+        self._closed_seconds, _ = self.db_ops.get_rollup_total(today, today + timedelta(days=1))
+        self._last_login = self.db_ops.get_last_login_time()
+        self._seed_date = today
+        self.seed_count += 1
+        self._needs_seed.clear()
+
+    def on_session_event(self, event, login_time, logout_time):
+        """SystemMonitor listener: a closed session changes the seeded total"""
+        if event == "logout":
+            self._needs_seed.set()
+        else:
+            self._last_login = login_time
+        self.refresh()
+
+    def get_daily_seconds(self, now=None):
+        """Today's worked seconds: seeded closed total plus the open session so far"""
+        now = now or datetime.now()
+        if self._needs_seed.is_set() or self._seed_date != now.date():
+            self.seed(now.date())  # first use, a closed session, or midnight
+
+        total = self._closed_seconds
+        current = self.system_monitor.current_session
+        if current is not None:
+            # Like the rollup, a session open since before midnight counts from midnight
+            today_start = datetime.combine(now.date(), datetime.min.time())
+            total += max(0.0, (now - max(current.login_time, today_start)).total_seconds())
+        return total
+
+    @profiled
+    def get_tooltip(self, now=None):
+        """Get tooltip text for tray icon"""
+        now = now or datetime.now()
+        daily_hours = self.db_ops.format_duration(timedelta(seconds=self.get_daily_seconds(now)))
+
+        tooltip = f"Daily Hours: {daily_hours}"
+        last_login = self._last_login
+        if last_login:
+            if last_login.date() == now.date():
+                tooltip += f"\nLast Login: {last_login.strftime('%H:%M')}"
+            else:
+                tooltip += f"\nLast Login: {last_login.strftime('%m/%d %H:%M')}"
+        return tooltip
+
+    def refresh(self):
+        """Push the current tooltip to the tray icon"""
+        try:
+            self.tray_icon.title = self.get_tooltip()
+        except Exception as e:
+            print(f"Error refreshing tray tooltip: {e}")
+
+    def _run(self):
+        """Refresh every interval seconds until stopped"""
+        while not self._stop.wait(self.interval):
+            self.refresh()
+
+    def start(self):
+        """Start refreshing the tooltip in a background thread"""
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tray-ticker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the refresh thread"""
+        self._stop.set()
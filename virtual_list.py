@@ -0,0 +1,174 @@
+"""
+Virtualized session list for Work Hours Tracker
+Windowing and keyset paging model behind the monthly and yearly tabs. It has
+no Tk dependency, so scrolling can be driven and checked without a display.
+Pages load either synchronously (get_rows, visible) or, for the Tk thread,
+through fetch_pages on a worker and store_pages back on the caller's thread.
+"""
+
+import threading
+from collections import OrderedDict
+
+class VirtualSessionList:
+    def __init__(self, fetch_page, row_count, format_row=None, page_size=200,
+                 visible_rows=15, buffer_rows=10, max_pages=8):
+        self.fetch_page = fetch_page      # fetch_page(after, limit) -> sessions ordered by (login_time, id)
+        self.row_count = row_count
+        self.format_row = format_row or (lambda session: session)
+        self.page_size = page_size
+        self.visible_rows = visible_rows
+        self.buffer_rows = buffer_rows
+        self.max_pages = max_pages
+        self.first = 0
+        self.queries = 0
+        self._pages = OrderedDict()       # page number -> formatted rows, least recently used first
+        self._page_keys = {0: None}       # page number -> (login_time, id) the page starts after
+        self._keys_lock = threading.Lock()  # _page_keys is read by fetch_pages on a worker thread
+
+    def _store_page(self, page, rows):
+        """Cache a page, evicting the least recently used ones beyond max_pages"""
+        self._pages[page] = rows
+        self._pages.move_to_end(page)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+    def _nearest_key(self, page):
+        """(page number, keyset position) of the nearest known page start at or before page"""
+        with self._keys_lock:
+            known = max(p for p in self._page_keys if p <= page)
+            return known, self._page_keys[known]
+
+    def _walk(self, first, last):
+        """Fetch pages from the nearest known one before first up to last; yields (page, rows, next page's key or None)"""
+        known, key = self._nearest_key(first)
+        while known <= last:
+            sessions = self.fetch_page(key, self.page_size)
+            key = (sessions[-1].login_time, sessions[-1].id) if len(sessions) == self.page_size else None
+            yield known, [self.format_row(session) for session in sessions], key
+            if key is None:
+                break
+            known += 1
+
+    def _learn_key(self, page, key):
+        """Remember where page starts"""
+        with self._keys_lock:
+            self._page_keys[page] = key
+
+    def _load_page(self, page):
+        """Get a page, walking forward from the nearest known keyset position"""
+        if page in self._pages:
+            self._pages.move_to_end(page)
+            return self._pages[page]
+
+        for number, rows, key in self._walk(page, page):
+            self.queries += 1
+            self._store_page(number, rows)
+            if key is not None:
+                self._learn_key(number + 1, key)
+        return self._pages.get(page, [])
+
+    def missing_pages(self):
+        """Pages of the materialized range that are not cached yet"""
+        start, stop = self.materialized_range()
+        if start >= stop:
+            return []
+        missing = []
+        for page in range(start // self.page_size, (stop - 1) // self.page_size + 1):
+            if page in self._pages:
+                self._pages.move_to_end(page)  # kept while the missing ones are stored
+            else:
+                missing.append(page)
+        return missing
+
+    def fetch_pages(self, pages):
+        """Fetch pages without touching the cache, so it can run on a worker thread; returns what store_pages takes"""
+        wanted = set(pages)
+        walked = []
+        if wanted:
+            # Pages passed on the way only contribute their keyset position
+            walked = [(number, rows if number in wanted else None, key)
+                      for number, rows, key in self._walk(min(wanted), max(wanted))]
+        reached = {number for number, _, _ in walked}
+        # Pages past the last session are stored empty, so they are not requested again
+        return len(walked), walked + [(page, [], None) for page in wanted - reached]
+
+    def store_pages(self, fetched):
+        """Cache the result of fetch_pages; call it on the thread that renders"""
+        queries, pages = fetched
+        for number, rows, key in pages:
+            if key is not None:
+                self._learn_key(number + 1, key)
+            if rows is not None:
+                self._store_page(number, rows)
+        self.queries += queries
+
+    def cached_visible(self, placeholder):
+        """Get the visible window from cached pages only, with placeholder for rows not loaded yet"""
+        rows = []
+        for index in range(self.first, min(self.row_count, self.first + self.visible_rows)):
+            page, offset = divmod(index, self.page_size)
+            page_rows = self._pages.get(page)
+            rows.append(page_rows[offset] if page_rows is not None and offset < len(page_rows) else placeholder)
+        return rows
+
+    def get_rows(self, start, stop):
+        """Get formatted rows [start, stop), loading only the pages they span"""
+        start = max(0, start)
+        stop = min(self.row_count, stop)
+        rows = []
+        index = start
+        while index < stop:
+            page, offset = divmod(index, self.page_size)
+            page_rows = self._load_page(page)
+            if offset >= len(page_rows):
+                break
+            chunk = page_rows[offset:offset + (stop - index)]
+            rows.extend(chunk)
+            index += len(chunk)
+        return rows
+
+    def max_first(self):
+        """Largest first row that still fills the window"""
+        return max(0, self.row_count - self.visible_rows)
+
+    def scroll_to(self, first):
+        """Scroll so that row first is at the top"""
+        self.first = min(max(0, int(first)), self.max_first())
+
+    def scroll_by(self, rows):
+        """Scroll by a number of rows (negative scrolls up)"""
+        self.scroll_to(self.first + rows)
+
+    def scroll_pages(self, pages):
+        """Scroll by whole windows"""
+        self.scroll_by(pages * self.visible_rows)
+
+    def moveto(self, fraction):
+        """Scroll to a scrollbar fraction in [0, 1]"""
+        self.scroll_to(round(float(fraction) * self.row_count))
+
+    def set_visible_rows(self, visible_rows):
+        """Resize the window, keeping the top row where it is"""
+        self.visible_rows = max(1, visible_rows)
+        self.scroll_to(self.first)
+
+    def materialized_range(self):
+        """Rows [start, stop) kept loaded: the visible window plus the buffer"""
+        start = max(0, self.first - self.buffer_rows)
+        stop = min(self.row_count, self.first + self.visible_rows + self.buffer_rows)
+        return start, stop
+
+    def visible(self):
+        """Get the formatted rows of the visible window, prefetching the buffer"""
+        start, stop = self.materialized_range()
+        rows = self.get_rows(start, stop)
+        offset = self.first - start
+        return rows[offset:offset + self.visible_rows]
+
+    def yview(self):
+        """Scrollbar position as a (top, bottom) fraction pair"""
+        if self.row_count == 0:
+            return 0.0, 1.0
+        top = self.first / self.row_count
+        bottom = min(1.0, (self.first + self.visible_rows) / self.row_count)
+        return top, bottom
@@ -2,22 +2,31 @@
 Main Work Tracker class that combines system monitoring and tray functionality
 """
 
+import os
 import pystray
 from PIL import Image, ImageDraw
 import threading
-from datetime import datetime, timedelta
-from system_monitor import SystemMonitor
-from statistics_gui import StatisticsGUI
-from settings_gui import SettingsGUI
+from system_monitor import create_system_monitor
 from database_operations import DatabaseOperations
+from settings_store import settings_store
+from tray_ticker import TrayTicker
 
 class WorkTracker:
-    def __init__(self):
-        self.system_monitor = SystemMonitor()
+    def __init__(self, system_monitor=None):
+        # main.py passes in a monitor that already recorded the login
+        self.system_monitor = system_monitor or create_system_monitor()
         self.db_ops = DatabaseOperations()
         self.tray_icon = None
+        self.tray_ticker = None
         self.stats_gui = None
         self.settings_gui = None
+        self.http_server = None
+        
+        # Settings are read once here and kept in memory afterwards
+        try:
+            settings_store.load()
+        except Exception as e:
+            print(f"Error loading settings: {e}")
         
     def create_tray_icon(self):
         """Create system tray icon"""
@@ -29,32 +38,18 @@ class WorkTracker:
         
         return image
         
-    def get_tray_tooltip(self):
-        """Get tooltip text for tray icon"""
-        try:
-            daily_hours = self.db_ops.get_daily_total_hours()
-            last_login = self.db_ops.get_last_login_time()
-            
-            tooltip = f"Daily Hours: {daily_hours}"
-            if last_login:
-                if last_login.date() == datetime.now().date():
-                    tooltip += f"\nLast Login: {last_login.strftime('%H:%M')}"
-                else:
-                    tooltip += f"\nLast Login: {last_login.strftime('%m/%d %H:%M')}"
-                    
-            return tooltip
-        except Exception as e:
-            return "Work Hours Tracker"
-            
     def show_statistics(self, icon, item):
         """Show statistics window"""
         if self.stats_gui is None or not self.stats_gui.window.winfo_exists():
+            # tkinter and tkcalendar are only loaded once a window is opened
+            from statistics_gui import StatisticsGUI
             self.stats_gui = StatisticsGUI()
         self.stats_gui.show()
         
     def show_settings(self, icon, item):
         """Show settings window"""
         if self.settings_gui is None or not self.settings_gui.window.winfo_exists():
+            from settings_gui import SettingsGUI
             self.settings_gui = SettingsGUI()
         self.settings_gui.show()
         
@@ -64,6 +59,11 @@ class WorkTracker:
         
     def quit_application(self, icon, item):
         """Quit the application"""
+        if self.tray_ticker:
+            self.tray_ticker.stop()
+        if self.http_server:
+            self.http_server.shutdown()
+            self.http_server.server_close()
         self.system_monitor.stop_monitoring()
         icon.stop()
         
@@ -86,15 +86,25 @@ class WorkTracker:
             menu
         )
         
-        # Set initial tooltip
-        try:
-            self.tray_icon.title = self.get_tray_tooltip()
-        except:
-            self.tray_icon.title = "Work Hours Tracker"
+        # Keep the tooltip live; it is refreshed from memory, not the database
+        self.tray_ticker = TrayTicker(self.tray_icon, self.system_monitor, self.db_ops)
+        self.tray_ticker.start()
+        self.start_http_api()
         
         # Run the tray icon
         self.tray_icon.run()
         
+    def start_http_api(self):
+        """Serve totals on localhost when WORK_HOURS_HTTP_PORT is set"""
+        port = os.environ.get('WORK_HOURS_HTTP_PORT')
+        if not port:
+            return
+        try:
+            from http_api import start_server
+            self.http_server = start_server(int(port))
+        except Exception as e:
+            print(f"Error starting HTTP API: {e}")
+        
     def start_monitoring(self):
         """Start system monitoring"""
         self.system_monitor.start_monitoring()
\ No newline at end of file